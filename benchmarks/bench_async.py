@@ -0,0 +1,96 @@
+"""
+Compares sync and async OutlookApp throughput against the local mock Graph server.
+
+Sync callers are threads sharing the app's httpx.Client; async callers are coroutines
+sharing its pooled AsyncClient. All calls go to one mock mailbox, so the per-mailbox
+concurrency limit is lifted to measure the clients rather than the limiter. Results
+are printed as JSON lines.
+
+    python -m benchmarks.bench_async --latency-ms 20 --calls 300
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+from loguru import logger
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.throttling import ThrottlingConfig
+
+from benchmarks.mock_graph import MockGraphServer
+
+
+def make_app(base_url: str) -> OutlookApp:
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "bench-token"}
+    app = OutlookApp(
+        integration=integration,
+        throttling=ThrottlingConfig(max_concurrent_per_mailbox=10_000),
+        max_connections=200,
+        max_keepalive_connections=200,
+    )
+    app.base_url = base_url
+    return app
+
+
+def run_sync(base_url: str, callers: int, calls: int) -> float:
+    app = make_app(base_url)
+    app.user_list_message(top=10)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        list(pool.map(lambda _: app.user_list_message(top=10), range(calls)))
+    return time.perf_counter() - started
+
+
+async def run_async(base_url: str, callers: int, calls: int) -> float:
+    app = make_app(base_url)
+    await app.user_list_message_async(top=10)
+    semaphore = asyncio.Semaphore(callers)
+
+    async def call() -> None:
+        async with semaphore:
+            await app.user_list_message_async(top=10)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(call() for _ in range(calls)))
+    elapsed = time.perf_counter() - started
+    await app.aclose()
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--calls", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 100])
+    args = parser.parse_args()
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    with MockGraphServer(latency=args.latency_ms / 1000) as server:
+        for callers in args.concurrency:
+            for mode in ("sync", "async"):
+                if mode == "sync":
+                    elapsed = run_sync(server.base_url, callers, args.calls)
+                else:
+                    elapsed = asyncio.run(run_async(server.base_url, callers, args.calls))
+                print(
+                    json.dumps(
+                        {
+                            "benchmark": "user_list_message",
+                            "mode": mode,
+                            "concurrency": callers,
+                            "calls": args.calls,
+                            "seconds": round(elapsed, 4),
+                            "calls_per_second": round(args.calls / elapsed, 1),
+                        }
+                    )
+                )
+
+
+if __name__ == "__main__":
+    main()
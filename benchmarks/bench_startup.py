@@ -0,0 +1,111 @@
+"""
+Measures MCP server cold start with `python -X importtime`.
+
+Each run imports universal_mcp_outlook.server in a fresh interpreter, which imports
+the framework, builds the app and registers its tools. The import tree is split into
+the framework (modules the server imports from universal_mcp, mcp and friends) and
+the package's own share: its modules, the stdlib they pull in and the work done at
+server import. Only the package share is under this repo's control, so the budget
+applies to it. Results are printed as JSON.
+
+    python -m benchmarks.bench_startup --runs 5 --budget-ms 300
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+ENTRY_POINT = "universal_mcp_outlook.server"
+BUDGET_MS = 300.0
+
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, int, str]]:
+    """
+    Returns (self us, cumulative us, depth, module) for each line of -X importtime output.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, module))
+    return rows
+
+
+def attribute(rows: list[tuple[int, int, int, str]], entry_point: str = ENTRY_POINT) -> dict[str, Any]:
+    """
+    Splits the entry point's import time into framework and package shares.
+
+    Children are printed before their parent, one level deeper, so the entry point's
+    direct imports are the depth-1 rows between it and the previous top-level row.
+    """
+    index = next(i for i, row in enumerate(rows) if row[2] == 0 and row[3] == entry_point)
+    start = index
+    while start > 0 and rows[start - 1][2] > 0:
+        start -= 1
+    children = [row for row in rows[start:index] if row[2] == 1]
+    framework = sum(row[1] for row in children if not row[3].startswith("universal_mcp_outlook"))
+    total = rows[index][1]
+    own = sorted(
+        (row for row in rows[start : index + 1] if row[3].startswith("universal_mcp_outlook")),
+        key=lambda row: -row[0],
+    )
+    return {
+        "total_ms": total / 1000,
+        "framework_ms": framework / 1000,
+        "package_ms": (total - framework) / 1000,
+        "server_module_ms": rows[index][0] / 1000,
+        "slowest_modules": {row[3]: row[0] / 1000 for row in own[:5]},
+    }
+
+
+def measure_startup(entry_point: str = ENTRY_POINT) -> dict[str, Any]:
+    """
+    Imports the entry point once in a fresh interpreter under -X importtime.
+    """
+    env = dict(os.environ)
+    # Installed wheels are byte-compiled, so let the warm-up run write .pyc files.
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {entry_point}"],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return attribute(parse_importtime(result.stderr), entry_point)
+
+
+def run(runs: int, entry_point: str = ENTRY_POINT) -> dict[str, Any]:
+    measure_startup(entry_point)
+    samples = [measure_startup(entry_point) for _ in range(runs)]
+    summary = {
+        key: round(statistics.median(sample[key] for sample in samples), 1)
+        for key in ("total_ms", "framework_ms", "package_ms", "server_module_ms")
+    }
+    summary["slowest_modules"] = samples[-1]["slowest_modules"]
+    return {"benchmark": "startup", "entry_point": entry_point, "runs": runs, **summary}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS)
+    args = parser.parse_args()
+
+    result = run(args.runs)
+    result["budget_ms"] = args.budget_ms
+    print(json.dumps(result))
+    if result["package_ms"] > args.budget_ms:
+        sys.exit(f"Package startup {result['package_ms']} ms exceeds the {args.budget_ms} ms budget")
+
+
+if __name__ == "__main__":
+    main()
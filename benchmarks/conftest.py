@@ -0,0 +1,122 @@
+"""
+Fixtures for the pytest-benchmark suite.
+
+Every benchmark runs OutlookApp against a local MockGraphServer and, besides the
+timings pytest-benchmark collects, stores in extra_info the Graph requests made per
+tool call, p50/p99 latency and peak Python memory of one call. Run with
+
+    pytest benchmarks --benchmark-json=benchmark.json
+
+to get the results as JSON for regression gating.
+"""
+
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable
+from unittest.mock import MagicMock
+
+import pytest
+from loguru import logger
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.stores import SQLiteStore
+from universal_mcp_outlook.throttling import ThrottlingConfig
+
+from benchmarks.mock_graph import MockGraphServer
+
+# Latency injected per mock request; small enough to keep the suite quick while still
+# making round trips, not local CPU, dominate.
+LATENCY = 0.002
+
+# Every benchmark talks to one mock mailbox, so the default limits (4 requests in flight
+# per mailbox) would make concurrent benchmarks measure the limiter instead of the client.
+UNTHROTTLED = ThrottlingConfig(
+    requests_per_window=10_000_000, max_concurrent_per_mailbox=10_000, backoff_base=0.0, jitter=0.0
+)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logs():
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+
+@pytest.fixture(scope="session")
+def graph():
+    with MockGraphServer(message_count=1000, latency=LATENCY) as server:
+        yield server
+
+
+@pytest.fixture(scope="session")
+def large_graph():
+    with MockGraphServer(message_count=10_000, latency=LATENCY) as server:
+        yield server
+
+
+def make_app(server: MockGraphServer, **kwargs: Any) -> OutlookApp:
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "bench-token"}
+    kwargs.setdefault("throttling", UNTHROTTLED)
+    app = OutlookApp(
+        integration=integration,
+        sync_store=SQLiteStore(":memory:"),
+        index_path=":memory:",
+        max_connections=200,
+        max_keepalive_connections=200,
+        **kwargs,
+    )
+    app.base_url = server.base_url
+    return app
+
+
+@pytest.fixture
+def app(graph):
+    graph.reset()
+    return make_app(graph)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+@pytest.fixture
+def measure(benchmark):
+    """
+    Benchmarks fn(n), where n counts calls from 0 so destructive tools can pick fresh
+    messages, and records requests per call, latency percentiles and peak memory.
+    """
+
+    def run(server: MockGraphServer, fn: Callable[[int], Any], rounds: int = 20) -> Any:
+        calls = iter(range(10**9))
+        fn(next(calls))
+        timings: list[float] = []
+
+        def timed() -> Any:
+            started = time.perf_counter()
+            result = fn(next(calls))
+            timings.append(time.perf_counter() - started)
+            return result
+
+        before = server.request_count
+        result = benchmark.pedantic(timed, rounds=rounds, iterations=1)
+        requests = server.request_count - before
+        tracemalloc.start()
+        try:
+            fn(next(calls))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        benchmark.extra_info.update(
+            {
+                "requests_per_call": round(requests / len(timings), 2),
+                "p50_ms": round(statistics.median(timings) * 1000, 3),
+                "p99_ms": round(percentile(timings, 0.99) * 1000, 3),
+                "peak_memory_kib": round(peak / 1024, 1),
+            }
+        )
+        return result
+
+    return run
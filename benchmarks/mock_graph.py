@@ -0,0 +1,309 @@
+"""
+A small in-process stand-in for Microsoft Graph used by the benchmarks.
+
+It serves just enough of the v1.0 mail API for OutlookApp's tools to run against it:
+/me, mail folders, sendMail, message listing with @odata.nextLink paging, folder
+delta queries, single messages (GET, PATCH, DELETE, move, reply, MIME $value), attachments and
+their raw contents, and JSON $batch. Latency and throttling (429 with Retry-After) can be injected to model network
+and server behaviour.
+"""
+
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Optional
+from urllib.parse import parse_qs, urlparse
+
+USER = "bench@contoso.com"
+
+MESSAGE_RE = re.compile(r"^/v1\.0/users/(?P<user>[^/]+)/messages/(?P<message>[^/]+)(?P<action>/move|/reply|/\$value)?$")
+MESSAGES_RE = re.compile(r"^/v1\.0/users/(?P<user>[^/]+)(?:/mailFolders/[^/]+)?/messages$")
+FOLDER_RE = re.compile(r"^/v1\.0/users/(?P<user>[^/]+)/mailFolders/(?P<folder>[^/]+)$")
+SEND_MAIL_RE = re.compile(r"^/v1\.0/users/(?P<user>[^/]+)/sendMail$")
+DELTA_RE = re.compile(r"^/v1\.0/users/(?P<user>[^/]+)/mailFolders/[^/]+/messages/delta$")
+ATTACHMENTS_RE = re.compile(
+    r"^/v1\.0/users/(?P<user>[^/]+)/messages/(?P<message>[^/]+)/attachments"
+    r"(?:/(?P<attachment>[^/]+)(?P<raw>/\$value)?)?$"
+)
+
+# Messages per delta page, like Graph's default odata.maxpagesize.
+DELTA_PAGE_SIZE = 100
+
+# Every Nth message has attachments.
+ATTACHMENT_EVERY = 5
+ATTACHMENTS_PER_MESSAGE = 2
+
+
+def make_message(index: int) -> dict[str, Any]:
+    return {
+        "@odata.etag": f'W/"etag-{index}"',
+        "id": f"msg-{index}",
+        "subject": f"Message {index}",
+        "bodyPreview": f"Preview of message {index}",
+        "receivedDateTime": f"2024-01-01T{index // 3600 % 24:02d}:{index // 60 % 60:02d}:{index % 60:02d}Z",
+        "from": {"emailAddress": {"name": "Sender", "address": "sender@contoso.com"}},
+        "toRecipients": [{"emailAddress": {"name": "Bench", "address": USER}}],
+        "conversationId": f"conv-{index // 4}",
+        "isRead": index % 2 == 0,
+        "hasAttachments": index % ATTACHMENT_EVERY == 0,
+        "body": {"contentType": "html", "content": f"<html><body><p>Body of message {index}</p></body></html>"},
+    }
+
+
+def make_mime(index: int) -> bytes:
+    message = make_message(index)
+    return (
+        f"From: Sender <sender@contoso.com>\r\nTo: Bench <{USER}>\r\n"
+        f"Subject: {message['subject']}\r\nMessage-ID: <{message['id']}@contoso.com>\r\n"
+        f"Content-Type: text/html; charset=utf-8\r\n\r\n{message['body']['content']}\r\n"
+    ).encode("utf-8")
+
+
+class MockGraphHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; without TCP_NODELAY each keep-alive
+    # response can stall on delayed ACKs and swamp the injected latency.
+    disable_nagle_algorithm = True
+    server: "MockGraphServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, status: int, body: Any = None, headers: Optional[dict[str, str]] = None) -> None:
+        if isinstance(body, bytes):
+            payload, content_type = body, "application/octet-stream"
+        else:
+            payload = json.dumps(body).encode("utf-8") if body is not None else b""
+            content_type = "application/json"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self, method: str) -> None:
+        self.server.record(method, self.path)
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        if self.server.should_throttle():
+            self._send(
+                429,
+                {"error": {"code": "ApplicationThrottled", "message": "Too many requests."}},
+                {"Retry-After": str(self.server.retry_after)},
+            )
+            return
+        parsed = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+        if method == "POST" and parsed.path == "/v1.0/$batch":
+            self._send(200, self.server.batch(body or {}))
+            return
+        status, response = self.server.dispatch(method, parsed.path, query, body)
+        self._send(status, response)
+
+    def do_GET(self) -> None:
+        self._route("GET")
+
+    def do_POST(self) -> None:
+        self._route("POST")
+
+    def do_PATCH(self) -> None:
+        self._route("PATCH")
+
+    def do_DELETE(self) -> None:
+        self._route("DELETE")
+
+
+class MockGraphServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server emulating /me and the mail endpoints of Graph v1.0.
+
+    Args:
+        message_count: Number of messages in the single mailbox.
+        latency: Seconds to sleep before answering each request.
+        throttle_every: Answer every Nth request with 429 (0 disables throttling).
+        retry_after: Retry-After seconds sent with injected 429s.
+        attachment_size: Size in bytes of every attachment.
+    """
+
+    daemon_threads = True
+    request_queue_size = 128
+
+    def __init__(
+        self,
+        message_count: int = 1000,
+        latency: float = 0.0,
+        throttle_every: int = 0,
+        retry_after: int = 0,
+        attachment_size: int = 64 * 1024,
+    ) -> None:
+        super().__init__(("127.0.0.1", 0), MockGraphHandler)
+        self.message_count = message_count
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.attachment_size = attachment_size
+        self.deleted: set[str] = set()
+        self.updated: dict[str, dict[str, Any]] = {}
+        self.requests: list[tuple[str, str]] = []
+        self.throttled = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1.0"
+
+    @property
+    def request_count(self) -> int:
+        with self._lock:
+            return len(self.requests)
+
+    def record(self, method: str, path: str) -> None:
+        with self._lock:
+            self.requests.append((method, path))
+
+    def should_throttle(self) -> bool:
+        if not self.throttle_every:
+            return False
+        with self._lock:
+            if len(self.requests) % self.throttle_every == 0:
+                self.throttled += 1
+                return True
+        return False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests.clear()
+            self.deleted.clear()
+            self.updated.clear()
+            self.throttled = 0
+
+    def _message(self, message_id: str) -> Optional[int]:
+        index = int(message_id.split("-")[-1]) if message_id.startswith("msg-") else -1
+        if not 0 <= index < self.message_count or message_id in self.deleted:
+            return None
+        return index
+
+    def dispatch(
+        self, method: str, path: str, query: dict[str, str], body: Any
+    ) -> tuple[int, Any]:
+        if path == "/v1.0/me":
+            return 200, {"userPrincipalName": USER}
+        if SEND_MAIL_RE.match(path) and method == "POST":
+            return 202, None
+        match = FOLDER_RE.match(path)
+        if match and method == "GET":
+            return 200, {
+                "id": match["folder"],
+                "displayName": match["folder"].title(),
+                "totalItemCount": self.message_count - len(self.deleted),
+                "unreadItemCount": self.message_count // 2,
+            }
+        match = MESSAGES_RE.match(path)
+        if match and method == "GET":
+            return 200, self._list_messages(path, query)
+        if DELTA_RE.match(path) and method == "GET":
+            return 200, self._delta(path, query)
+        match = ATTACHMENTS_RE.match(path)
+        if match and method == "GET":
+            return self._attachments(match)
+        match = MESSAGE_RE.match(path)
+        if match:
+            message_id = match["message"]
+            index = self._message(message_id)
+            if index is None:
+                return 404, {"error": {"code": "ErrorItemNotFound", "message": "Not found."}}
+            if match["action"] == "/reply":
+                return 202, None
+            if match["action"] == "/$value":
+                return 200, make_mime(index)
+            if method == "DELETE" or match["action"]:
+                with self._lock:
+                    self.deleted.add(message_id)
+                if method == "DELETE":
+                    return 204, None
+                return 201, {**make_message(index), "id": f"moved-{index}"}
+            if method == "PATCH":
+                with self._lock:
+                    self.updated.setdefault(message_id, {}).update(body or {})
+            return 200, {**make_message(index), **self.updated.get(message_id, {})}
+        return 404, {"error": {"code": "NotFound", "message": path}}
+
+    def batch(self, body: dict[str, Any]) -> dict[str, Any]:
+        responses = []
+        for request in body.get("requests", []):
+            parsed = urlparse("/v1.0" + request["url"])
+            query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+            status, response = self.dispatch(request["method"], parsed.path, query, request.get("body"))
+            item: dict[str, Any] = {"id": request["id"], "status": status, "headers": {}}
+            if response is not None:
+                item["body"] = response
+            responses.append(item)
+        return {"responses": responses}
+
+    def _list_messages(self, path: str, query: dict[str, str]) -> dict[str, Any]:
+        top = int(query.get("$top", 10))
+        start = int(query.get("$skiptoken", query.get("$skip", 0)))
+        end = min(start + top, self.message_count)
+        page: dict[str, Any] = {
+            "value": [make_message(i) for i in range(start, end) if f"msg-{i}" not in self.deleted]
+        }
+        if end < self.message_count:
+            page["@odata.nextLink"] = f"http://{self.server_address[0]}:{self.server_address[1]}{path}?%24top={top}&%24skiptoken={end}"
+        return page
+
+    def _delta(self, path: str, query: dict[str, str]) -> dict[str, Any]:
+        if "$deltatoken" in query:
+            start = end = self.message_count
+        else:
+            start = int(query.get("$skiptoken", 0))
+            end = min(start + DELTA_PAGE_SIZE, self.message_count)
+        page: dict[str, Any] = {"value": [make_message(i) for i in range(start, end)]}
+        link = f"http://{self.server_address[0]}:{self.server_address[1]}{path}"
+        if end < self.message_count:
+            page["@odata.nextLink"] = f"{link}?%24skiptoken={end}"
+        else:
+            page["@odata.deltaLink"] = f"{link}?%24deltatoken={self.message_count}"
+        return page
+
+    def _attachments(self, match: re.Match) -> tuple[int, Any]:
+        index = self._message(match["message"])
+        if index is None or index % ATTACHMENT_EVERY:
+            if index is None:
+                return 404, {"error": {"code": "ErrorItemNotFound", "message": "Not found."}}
+            return 200, {"value": []}
+        attachments = [
+            {
+                "@odata.type": "#microsoft.graph.fileAttachment",
+                "id": f"att-{index}-{n}",
+                "name": f"report-{index}-{n}.bin",
+                "contentType": "application/octet-stream",
+                "size": self.attachment_size,
+                "isInline": False,
+            }
+            for n in range(ATTACHMENTS_PER_MESSAGE)
+        ]
+        if match["attachment"] is None:
+            return 200, {"value": attachments}
+        attachment = next((a for a in attachments if a["id"] == match["attachment"]), None)
+        if attachment is None:
+            return 404, {"error": {"code": "ErrorItemNotFound", "message": "Not found."}}
+        if match["raw"]:
+            return 200, b"\0" * self.attachment_size
+        return 200, attachment
+
+    def __enter__(self) -> "MockGraphServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,126 @@
+"""
+Latency, request-count and memory benchmarks for OutlookApp tools.
+
+    pytest benchmarks --benchmark-json=benchmark.json
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from benchmarks.conftest import make_app
+from benchmarks.mock_graph import ATTACHMENT_EVERY, USER, MockGraphServer
+
+pytest.importorskip("pytest_benchmark")
+
+MESSAGE = {
+    "subject": "Benchmark",
+    "body": {"contentType": "Text", "content": "Hello"},
+    "toRecipients": [{"emailAddress": {"address": USER}}],
+}
+
+# (tool, call) pairs; n counts calls so destructive tools touch a fresh message each time.
+TOOL_CALLS = {
+    "get_user_id": lambda app, n: app.get_user_id(),
+    "user_list_message": lambda app, n: app.user_list_message(top=50),
+    "user_list_message_summary": lambda app, n: app.user_list_message(top=50, profile="summary"),
+    "user_get_message": lambda app, n: app.user_get_message(f"msg-{n % 1000}"),
+    "user_get_mail_folder": lambda app, n: app.user_get_mail_folder("inbox"),
+    "user_message_list_attachment": lambda app, n: app.user_message_list_attachment(
+        f"msg-{n * ATTACHMENT_EVERY % 1000}"
+    ),
+    "user_send_mail": lambda app, n: app.user_send_mail(MESSAGE),
+    "users_message_reply": lambda app, n: app.users_message_reply(f"msg-{n % 1000}", comment="Thanks"),
+    "user_delete_message": lambda app, n: app.user_delete_message(f"msg-{n}"),
+    "list_messages_page": lambda app, n: app.list_messages_page(top=100),
+    "batch_get_messages": lambda app, n: app.batch_get_messages([f"msg-{i}" for i in range(100)]),
+    "batch_list_attachments": lambda app, n: app.batch_list_attachments(
+        [f"msg-{i * ATTACHMENT_EVERY}" for i in range(40)]
+    ),
+    "get_conversation": lambda app, n: app.get_conversation(conversation_id=f"conv-{n}", max_messages=50),
+    "list_messages_across": lambda app, n: app.list_messages_across([f"shared{i}@contoso.com" for i in range(20)]),
+    "search_local_messages": lambda app, n: app.search_local_messages("Message"),
+}
+
+
+@pytest.mark.parametrize("tool", list(TOOL_CALLS))
+def test_tool(tool, app, graph, measure):
+    call = TOOL_CALLS[tool]
+    app.conversation_cache_ttl = 0
+    if tool == "search_local_messages":
+        app.index_mail_folder()
+    measure(graph, lambda n: call(app, n))
+
+
+def test_download_attachment(app, graph, measure, tmp_path):
+    measure(
+        graph,
+        lambda n: app.download_attachment(
+            f"msg-{n * ATTACHMENT_EVERY % 1000}",
+            f"att-{n * ATTACHMENT_EVERY % 1000}-0",
+            str(tmp_path / f"{n}.bin"),
+        ),
+    )
+
+
+def test_bulk_update_messages(app, graph, measure):
+    measure(graph, lambda n: app.bulk_update_messages("isRead eq false", is_read=True, max_messages=200), rounds=5)
+
+
+def test_index_mail_folder(app, graph, measure):
+    measure(graph, lambda n: app.index_mail_folder(reset=True), rounds=5)
+
+
+@pytest.mark.parametrize("format", ["jsonl", "eml"])
+def test_export_messages(app, graph, measure, tmp_path, format):
+    measure(
+        graph,
+        lambda n: app.export_messages(str(tmp_path / f"{n}-{format}"), format=format, max_messages=200),
+        rounds=5,
+    )
+
+
+def test_iter_messages_10k(large_graph, measure):
+    app = make_app(large_graph)
+
+    def scan(n):
+        count = sum(1 for _ in app.iter_messages(select=["id"], page_size=1000))
+        assert count == 10_000
+
+    measure(large_graph, scan, rounds=3)
+
+
+def test_iter_messages_10k_prefetch(large_graph, measure):
+    app = make_app(large_graph)
+    measure(large_graph, lambda n: sum(1 for _ in app.iter_messages(page_size=1000, prefetch=True)), rounds=3)
+
+
+@pytest.mark.parametrize("callers", [10, 50])
+def test_concurrent_sync_load(app, graph, measure, callers):
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        measure(graph, lambda n: list(pool.map(lambda _: app.user_list_message(top=10), range(callers))), rounds=5)
+
+
+@pytest.mark.parametrize("callers", [10, 100])
+def test_concurrent_async_load(graph, measure, callers):
+    graph.reset()
+    app = make_app(graph)
+    loop = asyncio.new_event_loop()
+
+    async def burst():
+        await asyncio.gather(*(app.user_list_message_async(top=10) for _ in range(callers)))
+
+    try:
+        measure(graph, lambda n: loop.run_until_complete(burst()), rounds=5)
+    finally:
+        loop.run_until_complete(app.aclose())
+        loop.close()
+
+
+def test_throttled_list(benchmark, measure):
+    with MockGraphServer(message_count=1000, throttle_every=4) as server:
+        app = make_app(server)
+        measure(server, lambda n: app.user_list_message(top=10))
+        benchmark.extra_info["throttled_responses"] = server.throttled
+        benchmark.extra_info["retries"] = app.throttling_metrics().get("retries")
@@ -0,0 +1,8 @@
+def main() -> None:
+    """
+    Runs the Outlook MCP server. The server module is imported here rather than at
+    package import so importing universal_mcp_outlook stays cheap.
+    """
+    from universal_mcp_outlook.server import mcp
+
+    mcp.run()
@@ -1,12 +1,472 @@
-from typing import Any, Optional, List
+import asyncio
+import base64
+import fnmatch
+import functools
+import hashlib
+import heapq
+import importlib.util
+import inspect
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import as_completed
+from itertools import islice
+from typing import Any, AsyncIterator, Callable, Iterator, Optional, List
+from urllib.parse import urlencode
+
+import httpx
+from loguru import logger
 from universal_mcp.applications import APIApplication
+from universal_mcp.exceptions import KeyNotFoundError
 from universal_mcp.integrations import Integration
+from universal_mcp.stores import BaseStore
+
+from universal_mcp_outlook.cache import (
+    READ_CACHE_MAX_BYTES,
+    READ_CACHE_MAX_ENTRIES,
+    CacheEntry,
+    ReadCache,
+    cache_key,
+)
+from universal_mcp_outlook.export import ExportPipeline, ExportStats, ItemGone
+from universal_mcp_outlook.index import MessageIndex
+from universal_mcp_outlook.instrumentation import (
+    PERFORMANCE_BUFFER_SIZE,
+    AsyncInstrumentedTransport,
+    ContextThreadPoolExecutor,
+    Instrumentation,
+    InstrumentedTransport,
+    LoggingSink,
+    RingBufferSink,
+    Sink,
+)
+from universal_mcp_outlook.query import Condition, build_query, compile_query, search_phrase
+from universal_mcp_outlook.projection import (
+    BODY_CHAR_LIMIT,
+    ProjectionStats,
+    dumps,
+    profile_select,
+    project,
+    project_conversation,
+)
+from universal_mcp_outlook.stores import SQLiteStore
+from universal_mcp_outlook.subscriptions import (
+    NotificationQueue,
+    NotificationReceiver,
+    SubscriptionManager,
+)
+from universal_mcp_outlook.uploads import (
+    INLINE_ATTACHMENT_LIMIT,
+    AttachmentSource,
+    ProgressCallback,
+    upload_in_chunks,
+)
+from universal_mcp_outlook.throttling import (
+    AsyncThrottlingTransport,
+    MailboxLimiter,
+    ThrottlingConfig,
+    ThrottlingStats,
+    ThrottlingTransport,
+)
 from urllib.parse import urlparse, parse_qs  # <-- THIS IS THE CRITICAL FIX
 
+# How long a resolved userPrincipalName is reused before /me is queried again.
+USER_ID_CACHE_TTL = 300.0
+
+# Largest $top Graph accepts for message and attachment collections.
+MAX_PAGE_SIZE = 1000
+
+# Number of outstanding pagination cursors remembered for list_messages_page.
+CURSOR_CACHE_SIZE = 256
+
+# Graph rejects JSON batches with more than 20 sub-requests.
+BATCH_SIZE = 20
+
+# Sub-request statuses that are retried individually after a batch round trip. Like the
+# transport, non-idempotent sub-requests such as a move are retried only on 429, since
+# after a 5xx Graph may already have acted on them.
+BATCH_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+BATCH_IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "PUT", "DELETE", "PATCH"})
+BATCH_MAX_RETRIES = 3
+BATCH_RETRY_BACKOFF = 1.0
+
+# Defaults for the filter-driven bulk tools.
+BULK_MAX_MESSAGES = 5000
+BULK_CONCURRENCY = 4
+BULK_ERROR_SAMPLE = 20
+
+# Properties fetched for each message of a conversation.
+CONVERSATION_SELECT = [
+    "id",
+    "subject",
+    "from",
+    "toRecipients",
+    "ccRecipients",
+    "receivedDateTime",
+    "isRead",
+    "hasAttachments",
+    "uniqueBody",
+]
+
+# How long a fetched conversation is reused, and how many are remembered.
+CONVERSATION_CACHE_TTL = 60.0
+CONVERSATION_CACHE_SIZE = 128
+
+# Mailboxes queried at once by the multi-mailbox tools. Requests to any one mailbox
+# are further limited by the throttling layer's per-mailbox concurrency.
+FANOUT_CONCURRENCY = 16
+
+# Properties requested by sync_mail_folder when the caller does not choose any.
+DELTA_DEFAULT_SELECT = [
+    "id",
+    "subject",
+    "from",
+    "receivedDateTime",
+    "isRead",
+    "bodyPreview",
+    "conversationId",
+]
+
+# Properties fetched when filling the local message index.
+INDEX_SELECT = DELTA_DEFAULT_SELECT + ["toRecipients", "ccRecipients", "parentFolderId"]
+
+# Attachment properties returned when listing without contents.
+ATTACHMENT_METADATA_SELECT = ["id", "name", "size", "contentType", "isInline", "lastModifiedDateTime"]
+
+# Bytes read from the network per write when streaming attachments to disk.
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+DOWNLOAD_CONCURRENCY = 4
+
+# export_messages: concurrent MIME downloads, items buffered between the listing and
+# the workers, and listing page sizes for JSONL (full messages) and .eml (ids only).
+EXPORT_CONCURRENCY = 8
+EXPORT_QUEUE_SIZE = 200
+EXPORT_PAGE_SIZE = 100
+EXPORT_ID_PAGE_SIZE = 1000
+
+# Connection pool defaults for the shared async client.
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+
+
 class OutlookApp(APIApplication):
-    def __init__(self, integration: Integration = None, **kwargs) -> None:
+    def __init__(
+        self,
+        integration: Integration = None,
+        user_id_cache_ttl: float = USER_ID_CACHE_TTL,
+        async_tools: bool = False,
+        max_connections: int = MAX_CONNECTIONS,
+        max_keepalive_connections: int = MAX_KEEPALIVE_CONNECTIONS,
+        http2: Optional[bool] = None,
+        async_client: Optional[httpx.AsyncClient] = None,
+        throttling: Optional[ThrottlingConfig] = None,
+        transport: Optional[httpx.BaseTransport] = None,
+        async_transport: Optional[httpx.AsyncBaseTransport] = None,
+        sync_store: Optional[BaseStore] = None,
+        index_path: Optional[str] = None,
+        index_max_age_days: Optional[float] = None,
+        index_max_messages: Optional[int] = None,
+        default_profile: Optional[str] = None,
+        body_char_limit: Optional[int] = BODY_CHAR_LIMIT,
+        measure_projection: bool = False,
+        read_cache_max_entries: int = READ_CACHE_MAX_ENTRIES,
+        read_cache_max_bytes: int = READ_CACHE_MAX_BYTES,
+        read_cache_fresh_seconds: float = 0.0,
+        conversation_cache_ttl: float = CONVERSATION_CACHE_TTL,
+        instrumentation_sinks: Optional[List[Sink]] = None,
+        performance_buffer_size: int = PERFORMANCE_BUFFER_SIZE,
+        notification_url: Optional[str] = None,
+        notification_host: str = "127.0.0.1",
+        notification_port: int = 0,
+        integration_factory: Optional[Callable[[], Integration]] = None,
+        **kwargs,
+    ) -> None:
+        # Builds the integration on first use when none is passed, so an MCP server can
+        # construct the app at startup without touching credentials.
+        self._integration_factory = integration_factory
+        self._integration_lock = threading.Lock()
         super().__init__(name="outlook", integration=integration, **kwargs)
         self.base_url = "https://graph.microsoft.com/v1.0"
+        self.user_id_cache_ttl = user_id_cache_ttl
+        # (credential fingerprint, userPrincipalName, expiry on the monotonic clock)
+        self._user_id_cache: Optional[tuple[str, str, float]] = None
+        self._user_id_lock = threading.Lock()
+        self.user_id_cache_hits = 0
+        self.user_id_cache_misses = 0
+        self._cursors: OrderedDict[str, str] = OrderedDict()
+        self._cursor_lock = threading.Lock()
+        # When set, list_tools exposes coroutine tools so an MCP server can run calls
+        # concurrently on its event loop instead of blocking it on network I/O.
+        self.async_tools = async_tools
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.http2 = importlib.util.find_spec("h2") is not None if http2 is None else http2
+        self._async_client: Optional[httpx.AsyncClient] = async_client
+        self._user_id_async_lock: Optional[asyncio.Lock] = None
+        # Retry/rate-limit layer installed under both HTTP clients. transport and
+        # async_transport replace the network transports beneath it (e.g. in tests).
+        self.throttling = throttling or ThrottlingConfig()
+        self.throttling_stats = ThrottlingStats()
+        self._limiter = MailboxLimiter(self.throttling)
+        self._transport = transport
+        self._async_transport = async_transport
+        # Per-tool request telemetry: tools returned by list_tools are tracked, and the
+        # instrumented transports beneath the throttling layer attribute each request
+        # attempt to the running tool. Records go to the in-memory buffer read by
+        # get_performance_stats, a debug log line, and any extra sinks.
+        self.performance_buffer = RingBufferSink(performance_buffer_size)
+        self.instrumentation = Instrumentation(
+            [self.performance_buffer, LoggingSink(), *(instrumentation_sinks or [])]
+        )
+        # Where sync_mail_folder persists delta links; a SQLite file unless overridden.
+        self._sync_store = sync_store
+        # Callbacks invoked as hook(event, user_id, message_ids) after a tool sends,
+        # replies to, deletes or moves mail; used to keep local state such as the
+        # message index consistent.
+        self.message_hooks: list[Callable[[str, str, list[str]], None]] = []
+        self.index_path = index_path
+        self.index_max_age_days = index_max_age_days
+        self.index_max_messages = index_max_messages
+        self._message_index: Optional[MessageIndex] = None
+        self._upload_client: Optional[httpx.Client] = None
+        # Projection profile applied by message read tools when the call doesn't name one.
+        if default_profile is not None:
+            profile_select(default_profile)
+        self.default_profile = default_profile
+        self.body_char_limit = body_char_limit
+        # Measuring the bytes a projection saves serialises the payload twice, so it is
+        # opt-in; otherwise projection_metrics only counts projected payloads.
+        self.measure_projection = measure_projection
+        self.projection_stats = ProjectionStats()
+        # Read-through cache for single messages and mail folders, revalidated with
+        # If-None-Match and invalidated through message_hooks when a tool changes a message.
+        self.read_cache = ReadCache(
+            max_entries=read_cache_max_entries,
+            max_bytes=read_cache_max_bytes,
+            fresh_seconds=read_cache_fresh_seconds,
+        )
+        self.message_hooks.append(self.read_cache.handle_event)
+        # Threads built by get_conversation, keyed by (user, conversation id, limit) and
+        # holding (expiry on the monotonic clock, thread).
+        self.conversation_cache_ttl = conversation_cache_ttl
+        self._conversations: OrderedDict[tuple[str, str, int], tuple[float, dict[str, Any]]] = OrderedDict()
+        self._conversation_lock = threading.Lock()
+        self.message_hooks.append(self._forget_conversations)
+        # Change notifications: subscribe_to_mail starts a local receiver that queues
+        # Graph's callbacks for wait_for_new_mail. notification_url is the public URL
+        # Graph should call when the receiver sits behind a tunnel or proxy.
+        self.notification_url = notification_url
+        self.notification_host = notification_host
+        self.notification_port = notification_port
+        self.notifications = NotificationQueue()
+        self.subscriptions = SubscriptionManager(lambda: self.client, self.base_url)
+        self._receiver: Optional[NotificationReceiver] = None
+
+    @property
+    def integration(self) -> Optional[Integration]:
+        if self._integration is None and self._integration_factory is not None:
+            with self._integration_lock:
+                if self._integration is None:
+                    self._integration = self._integration_factory()
+        return self._integration
+
+    @integration.setter
+    def integration(self, integration: Optional[Integration]) -> None:
+        self._integration = integration
+
+    @property
+    def client(self) -> httpx.Client:
+        """
+        HTTP client for the sync tools, with throttling-aware retries and per-mailbox
+        rate limiting applied beneath every request.
+        """
+        if not self._client:
+            self._client = httpx.Client(
+                base_url=self.base_url,
+                headers=self._get_headers(),
+                timeout=self.default_timeout,
+                transport=ThrottlingTransport(
+                    InstrumentedTransport(self._transport or httpx.HTTPTransport()),
+                    self._limiter,
+                    self.throttling_stats,
+                ),
+            )
+        return self._client
+
+    def _project(self, payload: Any, profile: Optional[str]) -> Any:
+        """
+        Applies the projection layer to a message payload, recording the bytes saved when
+        measure_projection is set.
+        """
+        if not profile:
+            return payload
+        projected = project(payload, self.body_char_limit)
+        if not self.measure_projection:
+            self.projection_stats.record()
+            return projected
+        before, after = len(dumps(payload)), len(dumps(projected))
+        self.projection_stats.record(before, after)
+        logger.debug(f"Projection '{profile}' reduced payload from {before} to {after} bytes")
+        return projected
+
+    def _cache_lookup(
+        self, user_id: str, url: str, params: dict[str, Any]
+    ) -> tuple[tuple, Optional[CacheEntry], dict[str, str]]:
+        key = cache_key(user_id, url[len(self.base_url):] if url.startswith(self.base_url) else url, params)
+        entry = self.read_cache.get(key) if self.read_cache.enabled else None
+        headers = {"If-None-Match": entry.etag} if entry is not None and entry.etag else {}
+        return key, entry, headers
+
+    def _cache_response(
+        self, key: tuple, entry: Optional[CacheEntry], response: httpx.Response
+    ) -> Any:
+        if response.status_code == 304 and entry is not None:
+            self.read_cache.record("revalidated")
+            self.read_cache.touch(key)
+            return entry.payload
+        self.read_cache.record("miss")
+        payload = self._handle_response(response)
+        if isinstance(payload, dict):
+            etag = payload.get("@odata.etag") or response.headers.get("ETag")
+            self.read_cache.put(key, etag, payload, len(response.content))
+        return payload
+
+    def _cached_get(self, user_id: str, url: str, params: dict[str, Any]) -> Any:
+        """
+        GETs a single resource through the read cache: fresh entries are returned
+        without a request, stale ones are revalidated with If-None-Match.
+        """
+        key, entry, headers = self._cache_lookup(user_id, url, params)
+        if entry is not None and self.read_cache.is_fresh(entry):
+            self.read_cache.record("hit")
+            return entry.payload
+        logger.debug(f"Making GET request to {url} with params: {params}, conditional: {bool(headers)}")
+        response = self.client.get(url, params=params, headers=headers)
+        return self._cache_response(key, entry, response)
+
+    async def _cached_get_async(self, user_id: str, url: str, params: dict[str, Any]) -> Any:
+        key, entry, headers = self._cache_lookup(user_id, url, params)
+        if entry is not None and self.read_cache.is_fresh(entry):
+            self.read_cache.record("hit")
+            return entry.payload
+        logger.debug(f"Making async GET request to {url} with params: {params}, conditional: {bool(headers)}")
+        response = await self.async_client.get(url, params=params, headers=headers)
+        return self._cache_response(key, entry, response)
+
+    def read_cache_metrics(self) -> dict[str, Any]:
+        """
+        Returns hit ratio, size and eviction counters of the read cache.
+        """
+        return self.read_cache.snapshot()
+
+    def query_metrics(self) -> dict[str, Any]:
+        """
+        Returns hit and miss counts of the compiled OData query cache.
+        """
+        info = compile_query.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max_size": info.maxsize}
+
+    def projection_metrics(self) -> dict[str, Any]:
+        """
+        Returns the number of projected payloads and, when the app was created with
+        measure_projection, their cumulative sizes before and after projection.
+        """
+        return self.projection_stats.snapshot()
+
+    def throttling_metrics(self) -> dict[str, Any]:
+        """
+        Returns retry and rate-limit counters for this app instance.
+        """
+        return self.throttling_stats.snapshot()
+
+    def get_performance_stats(
+        self,
+        tool: Optional[str] = None,
+        recent: int = 10,
+        include_requests: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Reports how recent tool calls performed: per-tool latency percentiles, Graph requests and retries per call, bytes transferred and where the time went (connect, TLS, send, server wait, download), plus throttling and cache counters. Use it to explain slow calls.
+
+        Args:
+            tool (string, optional): Only report this tool. Example: 'user_list_message'.
+            recent (integer): Number of most recent calls to list individually. Example: '10'.
+            include_requests (boolean): List the HTTP requests of the recent calls (the latest 64 per call), with their Graph request-ids and timings.
+
+        Returns:
+            dict[str, Any]: 'tools' with aggregated stats per tool, 'recent' with the latest calls, and 'throttling', 'read_cache' and 'projection' counters.
+
+        Tags:
+            diagnostics, performance
+        """
+        records = self.performance_buffer.records(tool)
+        return {
+            "tools": self.performance_buffer.stats(tool),
+            "recent": [record.to_dict(include_requests) for record in records[-recent:]] if recent > 0 else [],
+            "throttling": self.throttling_metrics(),
+            "read_cache": self.read_cache_metrics(),
+            "projection": self.projection_metrics(),
+        }
+
+    def _credential_fingerprint(self) -> str:
+        """
+        Returns a stable, non-reversible key for the integration's current credential,
+        so that a rotated token never reuses an identity resolved under the old one.
+        The HTTP clients keep the headers they were built with, so when the credential
+        has changed their headers are refreshed too and /me is asked with the new one.
+        """
+        headers = self._get_headers()
+        authorization = headers.get("Authorization", "")
+        for client in (self._client, self._async_client):
+            if client is not None and client.headers.get("Authorization", "") != authorization:
+                client.headers.update(headers)
+        return hashlib.sha256(authorization.encode("utf-8")).hexdigest()
+
+    def _cached_user_id(self, fingerprint: str) -> Optional[str]:
+        cached = self._user_id_cache
+        if cached and cached[0] == fingerprint and cached[2] > time.monotonic():
+            self.user_id_cache_hits += 1
+            return cached[1]
+        return None
+
+    def _store_user_id(self, fingerprint: str, user_info: dict[str, Any]) -> str:
+        self.user_id_cache_misses += 1
+        user_id = user_info.get('userPrincipalName')
+        if not user_id:
+            raise ValueError("Could not retrieve user ID from get_user_id response.")
+        self._user_id_cache = (
+            fingerprint,
+            user_id,
+            time.monotonic() + self.user_id_cache_ttl,
+        )
+        return user_id
+
+    def _resolve_user_id(self) -> str:
+        """
+        Returns the current user's principal name, querying /me at most once per TTL.
+
+        Concurrent callers that miss the cache wait on a single in-flight /me request
+        instead of each issuing their own.
+        """
+        fingerprint = self._credential_fingerprint()
+        user_id = self._cached_user_id(fingerprint)
+        if user_id:
+            return user_id
+        with self._user_id_lock:
+            user_id = self._cached_user_id(fingerprint)
+            if user_id:
+                return user_id
+            return self._store_user_id(fingerprint, self.get_user_id())
+
+    def clear_user_id_cache(self) -> None:
+        """
+        Drops the cached user principal name so the next call resolves it again.
+        """
+        with self._user_id_lock:
+            self._user_id_cache = None
 
     def users_message_reply(
         self,
@@ -35,10 +495,7 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         if message_id is None:
             raise ValueError("Missing required parameter 'message-id'.")
         request_body_data = None
@@ -57,7 +514,9 @@ class OutlookApp(APIApplication):
             params=query_params,
             content_type="application/json",
         )
-        return self._handle_response(response)
+        result = self._handle_response(response)
+        self._emit_message_event("replied", user_id, [message_id])
+        return result
 
     def user_send_mail(
         self,
@@ -84,10 +543,7 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         request_body_data = None
         request_body_data = {
             "message": message,
@@ -104,7 +560,9 @@ class OutlookApp(APIApplication):
             params=query_params,
             content_type="application/json",
         )
-        return self._handle_response(response)
+        result = self._handle_response(response)
+        self._emit_message_event("sent", user_id, [])
+        return result
 
     def user_get_mail_folder(
         self,
@@ -135,24 +593,14 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         if mailFolder_id is None:
             raise ValueError("Missing required parameter 'mailFolder-id'.")
         url = f"{self.base_url}/users/{user_id}/mailFolders/{mailFolder_id}"
-        query_params = {
-            k: v
-            for k, v in [
-                ("includeHiddenFolders", includeHiddenFolders),
-                ("$select", select),
-                ("$expand", expand),
-            ]
-            if v is not None
-        }
-        response = self._get(url, params=query_params)
-        return self._handle_response(response)
+        query_params = build_query("mailFolder", select=select, expand=expand)
+        if includeHiddenFolders is not None:
+            query_params["includeHiddenFolders"] = includeHiddenFolders
+        return self._cached_get(user_id, url, query_params)
 
     def user_list_message(
         self,
@@ -166,6 +614,10 @@ class OutlookApp(APIApplication):
         count: Optional[bool] = None,
         orderby: Optional[List[str]] = None,
         expand: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        where: Optional[List[dict[str, Any]]] = None,
+        received_after: Optional[str] = None,
+        received_before: Optional[str] = None,
     ) -> dict[str, Any]:
         """
         Retrieves a list of messages for a user, allowing optional filtering and sorting of results based on parameters such as includeHiddenMessages, search, filter, top, skip, orderby, select, and expand.
@@ -188,48 +640,38 @@ class OutlookApp(APIApplication):
             count (boolean): Include count of items
             orderby (array): Order items by property values
             expand (array): Expand related entities
+            profile (string, optional): Compact the response using a field profile: 'summary', 'triage' or 'full'. Requests the profile's properties (plus any in select), strips OData annotations, flattens recipients to 'Name <address>' and converts HTML bodies to truncated plain text. Omit for the raw Graph response.
+            where (array, optional): Typed conditions combined with 'and' and checked before the request is sent, each {'field': property, 'op': operator, 'value': value}. Operators are eq, ne, gt, ge, lt, le and startswith, depending on the property; categories and recipient lists match any member. Example: [{'field': 'isRead', 'op': 'eq', 'value': false}, {'field': 'from', 'op': 'eq', 'value': 'meganb@contoso.com'}].
+            received_after (string, optional): Only messages received at or after this ISO 8601 date or date-time. Example: '2024-05-01'.
+            received_before (string, optional): Only messages received before this ISO 8601 date or date-time. Example: '2024-06-01T12:00:00Z'.
 
         Returns:
             dict[str, Any]: Retrieved collection
 
         Raises:
             HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised before any request when the query is one Graph would reject, such as search combined with orderby or skip, an unknown property or an unsupported operator.
 
         Tags:
             users.message, important
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         
         url = f"{self.base_url}/users/{user_id}/messages"
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
         
-        # Handle list parameters by joining with commas
-        select_str = ",".join(select) if select else None
-        orderby_str = ",".join(orderby) if orderby else None
-        expand_str = ",".join(expand) if expand else None
-        
-        query_params = {
-            k: v
-            for k, v in [
-                ("includeHiddenMessages", includeHiddenMessages),
-                ("$top", top),
-                ("$skip", skip),
-                ("$search", search),
-                ("$filter", filter),
-                ("$count", count),
-                ("$orderby", orderby_str),
-                ("$select", select_str),
-                ("$expand", expand_str),
-            ]
-            if v is not None
-        }
-        
+        query_params = build_query(
+            select=select, expand=expand, where=where, filter=filter, search=search, orderby=orderby,
+            top=top, skip=skip, count=count, received_after=received_after, received_before=received_before,
+        )
+        if includeHiddenMessages is not None:
+            query_params["includeHiddenMessages"] = includeHiddenMessages
         response = self._get(url, params=query_params)
-        return self._handle_response(response)
+        return self._project(self._handle_response(response), profile)
 
     def user_get_message(
         self,
@@ -238,6 +680,7 @@ class OutlookApp(APIApplication):
         includeHiddenMessages: Optional[str] = None,
         select: Optional[List[str]] = None,
         expand: Optional[List[str]] = None,
+        profile: Optional[str] = None,
     ) -> Any:
         """
         Retrieves a specific message for a user, optionally including hidden messages, selecting specific fields, or expanding related data.
@@ -248,6 +691,7 @@ class OutlookApp(APIApplication):
             includeHiddenMessages (string): Include Hidden Messages
             select (array): Select properties to be returned
             expand (array): Expand related entities
+            profile (string, optional): Compact the response using a field profile: 'summary', 'triage' or 'full'. Requests the profile's properties (plus any in select), strips OData annotations, flattens recipients to 'Name <address>' and converts HTML bodies to truncated plain text. Omit for the raw Graph response.
 
         Returns:
             Any: Retrieved navigation property
@@ -260,24 +704,17 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         if message_id is None:
             raise ValueError("Missing required parameter 'message-id'.")
         url = f"{self.base_url}/users/{user_id}/messages/{message_id}"
-        query_params = {
-            k: v
-            for k, v in [
-                ("includeHiddenMessages", includeHiddenMessages),
-                ("$select", select),
-                ("$expand", expand),
-            ]
-            if v is not None
-        }
-        response = self._get(url, params=query_params)
-        return self._handle_response(response)
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
+        query_params = build_query(select=select, expand=expand)
+        if includeHiddenMessages is not None:
+            query_params["includeHiddenMessages"] = includeHiddenMessages
+        return self._project(self._cached_get(user_id, url, query_params), profile)
 
     def user_delete_message(self, message_id: str, user_id: Optional[str] = None) -> Any:
         """
@@ -298,16 +735,15 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         if message_id is None:
             raise ValueError("Missing required parameter 'message-id'.")
         url = f"{self.base_url}/users/{user_id}/messages/{message_id}"
         query_params = {}
         response = self._delete(url, params=query_params)
-        return self._handle_response(response)
+        result = self._handle_response(response)
+        self._emit_message_event("deleted", user_id, [message_id])
+        return result
 
     def user_message_list_attachment(
         self,
@@ -321,6 +757,7 @@ class OutlookApp(APIApplication):
         orderby: Optional[List[str]] = None,
         select: Optional[List[str]] = None,
         expand: Optional[List[str]] = None,
+        metadata_only: bool = True,
     ) -> dict[str, Any]:
         """
         Retrieves attachments associated with a specified user's message, supporting filtering, pagination, and field selection via query parameters.
@@ -336,6 +773,7 @@ class OutlookApp(APIApplication):
             orderby (array): Order items by property values
             select (array): Select properties to be returned
             expand (array): Expand related entities
+            metadata_only (boolean): When no select is given, return only id, name, size, contentType, isInline and lastModifiedDateTime instead of the base64 file contents. Use download_attachment to fetch contents. Defaults to true.
 
         Returns:
             dict[str, Any]: Retrieved collection
@@ -348,27 +786,16 @@ class OutlookApp(APIApplication):
         """
         # If user_id is not provided, get it automatically
         if user_id is None:
-            user_info = self.get_user_id()
-            user_id = user_info.get('userPrincipalName')
-            if not user_id:
-                raise ValueError("Could not retrieve user ID from get_user_id response.")
+            user_id = self._resolve_user_id()
         if message_id is None:
             raise ValueError("Missing required parameter 'message-id'.")
         url = f"{self.base_url}/users/{user_id}/messages/{message_id}/attachments"
-        query_params = {
-            k: v
-            for k, v in [
-                ("$top", top),
-                ("$skip", skip),
-                ("$search", search),
-                ("$filter", filter),
-                ("$count", count),
-                ("$orderby", orderby),
-                ("$select", select),
-                ("$expand", expand),
-            ]
-            if v is not None
-        }
+        if select is None and metadata_only:
+            select = ATTACHMENT_METADATA_SELECT
+        query_params = build_query(
+            "attachment", select=select, expand=expand, filter=filter, search=search, orderby=orderby,
+            top=top, skip=skip, count=count,
+        )
         response = self._get(url, params=query_params)
         return self._handle_response(response)
     
@@ -395,25 +822,2512 @@ class OutlookApp(APIApplication):
         response = self._get(url, params=query_params)
         return self._handle_response(response)
 
-    def get_from_url(self, url: str) -> dict[str, Any]:
+    def _fetch_page(self, url: str, params: Optional[dict[str, Any]] = None) -> dict[str, Any]:
         """
-        Makes a GET request to a full @odata.nextLink or @odata.deltaLink URL.
+        Fetches a single collection page. nextLink URLs are absolute and already carry
+        their query string, so they are requested as-is without being re-parsed.
         """
-        if not url:
-            raise ValueError("Missing required parameter 'url'.")
-        if not url.startswith(self.base_url):
-            raise ValueError(
-                f"The provided URL '{url}' does not start with the expected base URL '{self.base_url}'."
-            )
-        relative_part = url[len(self.base_url):]
-        parsed_relative = urlparse(relative_part)
-        path_only = parsed_relative.path
-        params = {k: v[0] for k, v in parse_qs(parsed_relative.query).items()}
-        response = self._get(path_only, params=params)
+        response = self._get(url, params=params)
         return self._handle_response(response)
 
+    def _iter_pages(
+        self,
+        url: str,
+        params: Optional[dict[str, Any]] = None,
+        max_pages: Optional[int] = None,
+        prefetch: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Yields collection pages one at a time, following @odata.nextLink lazily.
+
+        With prefetch enabled the next page is requested in a background thread while
+        the caller consumes the current one, so at most two pages are held in memory.
+        """
+        if max_pages is not None and max_pages < 1:
+            return
+        executor = ContextThreadPoolExecutor(max_workers=1) if prefetch else None
+        pending = None
+        try:
+            page = self._fetch_page(url, params)
+            pages = 0
+            while True:
+                pages += 1
+                next_link = page.get("@odata.nextLink")
+                has_more = next_link and (max_pages is None or pages < max_pages)
+                if has_more and executor:
+                    pending = executor.submit(self._fetch_page, next_link)
+                yield page
+                if not has_more:
+                    return
+                if pending is not None:
+                    page, pending = pending.result(), None
+                else:
+                    page = self._fetch_page(next_link)
+        finally:
+            if pending is not None:
+                pending.cancel()
+            if executor:
+                executor.shutdown(wait=False)
+
+    def _iter_items(
+        self,
+        url: str,
+        params: dict[str, Any],
+        max_items: Optional[int],
+        max_pages: Optional[int],
+        prefetch: bool,
+    ) -> Iterator[dict[str, Any]]:
+        if max_items is not None and max_items < 1:
+            return
+        yielded = 0
+        for page in self._iter_pages(url, params, max_pages=max_pages, prefetch=prefetch):
+            for item in page.get("value", []):
+                yield item
+                yielded += 1
+                if max_items is not None and yielded >= max_items:
+                    return
+
+    @staticmethod
+    def _page_size(page_size: int, max_items: Optional[int]) -> int:
+        if not 1 <= page_size <= MAX_PAGE_SIZE:
+            raise ValueError(f"page_size must be between 1 and {MAX_PAGE_SIZE}, got {page_size}.")
+        # Don't ask Graph for more rows than the caller is going to consume.
+        if max_items is not None and 0 < max_items < page_size:
+            return max_items
+        return page_size
+
+    def _message_list_request(
+        self,
+        user_id: Optional[str],
+        folder_id: Optional[str],
+        select: Optional[List[str]],
+        filter: Optional[str],
+        search: Optional[str],
+        orderby: Optional[List[str]],
+        top: Optional[int],
+        where: Optional[List[Condition | dict[str, Any]]] = None,
+        received_after: Optional[str] = None,
+        received_before: Optional[str] = None,
+    ) -> tuple[str, dict[str, Any]]:
+        """
+        Builds the URL and query parameters for listing messages of a user or folder.
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        if folder_id:
+            url = f"{self.base_url}/users/{user_id}/mailFolders/{folder_id}/messages"
+        else:
+            url = f"{self.base_url}/users/{user_id}/messages"
+        query_params = build_query(
+            select=select, where=where, filter=filter, search=search, orderby=orderby, top=top,
+            received_after=received_after, received_before=received_before,
+        )
+        return url, query_params
+
+    def iter_messages(
+        self,
+        user_id: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        filter: Optional[str] = None,
+        search: Optional[str] = None,
+        orderby: Optional[List[str]] = None,
+        page_size: int = 100,
+        max_items: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        prefetch: bool = False,
+        where: Optional[List[Condition | dict[str, Any]]] = None,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Lazily yields messages for a user, following @odata.nextLink until the collection,
+        max_items or max_pages is exhausted. Memory use is bounded by one page (two with
+        prefetch) regardless of mailbox size.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            folder_id (string, optional): Restrict to a mail folder id or well-known name such as 'inbox'.
+            select (array): Select properties to be returned
+            filter (string): Filter items by property values
+            search (string): Search items by search phrases
+            orderby (array): Order items by property values
+            page_size (integer): Items requested per page ($top), between 1 and 1000.
+            max_items (integer): Stop after yielding this many messages.
+            max_pages (integer): Stop after fetching this many pages.
+            prefetch (boolean): Fetch the next page while the current one is consumed.
+            where (array): Typed conditions (Condition or {'field', 'op', 'value'}) combined with filter.
+
+        Returns:
+            Iterator[dict[str, Any]]: Message resources
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+        """
+        url, query_params = self._message_list_request(
+            user_id, folder_id, select, filter, search, orderby,
+            self._page_size(page_size, max_items), where,
+        )
+        return self._iter_items(url, query_params, max_items, max_pages, prefetch)
+
+    def iter_attachments(
+        self,
+        message_id: str,
+        user_id: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        filter: Optional[str] = None,
+        page_size: int = 100,
+        max_items: Optional[int] = None,
+        max_pages: Optional[int] = None,
+        prefetch: bool = False,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Lazily yields the attachments of a message, following @odata.nextLink.
+
+        Args:
+            message_id (string): message-id
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            select (array): Select properties to be returned
+            filter (string): Filter items by property values
+            page_size (integer): Items requested per page ($top), between 1 and 1000.
+            max_items (integer): Stop after yielding this many attachments.
+            max_pages (integer): Stop after fetching this many pages.
+            prefetch (boolean): Fetch the next page while the current one is consumed.
+
+        Returns:
+            Iterator[dict[str, Any]]: Attachment resources
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+        """
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}/attachments"
+        query_params = build_query(
+            "attachment", select=select, filter=filter, top=self._page_size(page_size, max_items)
+        )
+        return self._iter_items(url, query_params, max_items, max_pages, prefetch)
+
+    def _store_cursor(self, next_link: Optional[str]) -> Optional[str]:
+        if not next_link:
+            return None
+        cursor = secrets.token_urlsafe(8)
+        with self._cursor_lock:
+            self._cursors[cursor] = next_link
+            while len(self._cursors) > CURSOR_CACHE_SIZE:
+                self._cursors.popitem(last=False)
+        return cursor
+
+    def _cursor_link(self, cursor: str) -> str:
+        # The cursor stays valid until its page has been fetched, so a failed fetch can be retried.
+        with self._cursor_lock:
+            next_link = self._cursors.get(cursor)
+        if next_link is None:
+            raise ValueError(f"Unknown or expired cursor '{cursor}'. Restart the listing without a cursor.")
+        return next_link
+
+    def _drop_cursor(self, cursor: str) -> None:
+        with self._cursor_lock:
+            self._cursors.pop(cursor, None)
+
+    def list_messages_page(
+        self,
+        cursor: Optional[str] = None,
+        user_id: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        select: list[str] = ["bodyPreview"],
+        filter: Optional[str] = None,
+        search: Optional[str] = None,
+        orderby: Optional[List[str]] = None,
+        top: int = 25,
+        profile: Optional[str] = None,
+        where: Optional[List[dict[str, Any]]] = None,
+        received_after: Optional[str] = None,
+        received_before: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Lists one page of messages and returns a short opaque cursor for the next page instead of the raw @odata.nextLink. Pass the cursor back to continue; the other arguments are ignored when a cursor is given. A cursor stays valid until its page is returned, so a call that fails can be retried with the same cursor.
+
+        Args:
+            cursor (string, optional): Cursor returned by a previous call. Omit to start a new listing.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            folder_id (string, optional): Restrict to a mail folder id or well-known name such as 'inbox'.
+            select (list): Select properties to be returned. Defaults to ['bodyPreview'].
+            filter (string): Filter items by property values
+            search (string): Search items by search phrases
+            orderby (array): Order items by property values
+            top (integer): Number of messages per page, between 1 and 1000. Example: '25'.
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'. Must be given again with each cursor.
+            where (array, optional): Typed conditions combined with 'and' and checked before the request is sent, each {'field': property, 'op': operator, 'value': value}. Operators are eq, ne, gt, ge, lt, le and startswith, depending on the property. Example: [{'field': 'importance', 'op': 'eq', 'value': 'high'}].
+            received_after (string, optional): Only messages received at or after this ISO 8601 date or date-time. Example: '2024-05-01'.
+            received_before (string, optional): Only messages received before this ISO 8601 date or date-time.
+
+        Returns:
+            dict[str, Any]: 'value' with the page of messages and 'cursor' for the next page (null when there are no more).
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised when the cursor is unknown or has expired, or before any request when the query is one Graph would reject, such as search combined with orderby.
+
+        Tags:
+            users.message, important
+        """
+        profile = profile or self.default_profile
+        if cursor:
+            page = self._fetch_page(self._cursor_link(cursor))
+            self._drop_cursor(cursor)
+        else:
+            if profile:
+                select = profile_select(profile, select)
+            url, query_params = self._message_list_request(
+                user_id, folder_id, select, filter, search, orderby,
+                self._page_size(top, None), where, received_after, received_before,
+            )
+            page = self._fetch_page(url, query_params)
+        return {
+            "value": self._project(page, profile).get("value", []),
+            "cursor": self._store_cursor(page.get("@odata.nextLink")),
+        }
+
+    @staticmethod
+    def _chunk_batch(requests: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+        """
+        Splits sub-requests into batches of at most BATCH_SIZE. Graph only resolves
+        dependsOn within a single batch, so each dependency chain is kept together.
+        """
+        parent = {request["id"]: request["id"] for request in requests}
+
+        def root(request_id: str) -> str:
+            while parent[request_id] != request_id:
+                parent[request_id] = parent[parent[request_id]]
+                request_id = parent[request_id]
+            return request_id
+
+        for request in requests:
+            for dependency in request.get("dependsOn", []):
+                if dependency not in parent:
+                    raise ValueError(
+                        f"Batch request '{request['id']}' depends on unknown request '{dependency}'."
+                    )
+                parent[root(request["id"])] = root(dependency)
+
+        groups: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        for request in requests:
+            groups.setdefault(root(request["id"]), []).append(request)
+
+        chunks: list[list[dict[str, Any]]] = []
+        current: list[dict[str, Any]] = []
+        for group in groups.values():
+            if len(group) > BATCH_SIZE:
+                raise ValueError(
+                    f"A dependsOn chain of {len(group)} requests exceeds the batch limit of {BATCH_SIZE}."
+                )
+            if len(current) + len(group) > BATCH_SIZE:
+                chunks.append(current)
+                current = []
+            current.extend(group)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    def _send_batch(self, requests: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        response = self._post(
+            f"{self.base_url}/$batch",
+            data={"requests": requests},
+            params={},
+            content_type="application/json",
+        )
+        payload = self._handle_response(response)
+        return {item["id"]: item for item in payload.get("responses", [])}
+
+    def _execute_batch(
+        self,
+        requests: list[dict[str, Any]],
+        max_concurrency: int = 1,
+    ) -> dict[str, dict[str, Any]]:
+        """
+        Runs Graph sub-requests through /$batch, BATCH_SIZE at a time, with up to
+        max_concurrency batches in flight.
+
+        Each request is a dict with 'id', 'method' and 'url' (relative to the API
+        version, e.g. '/users/{id}/messages/{id}') and optionally 'body', 'headers'
+        and 'dependsOn'. Sub-requests that come back throttled, or idempotent ones with
+        a transient server error, are re-sent on their own, together with any
+        dependents that failed because of them, honouring the largest Retry-After in
+        the round.
+
+        Returns:
+            dict[str, dict[str, Any]]: Sub-response ('status', 'headers', 'body') keyed by request id.
+        """
+        chunks = self._chunk_batch(requests)
+        results: dict[str, dict[str, Any]] = {}
+        if max_concurrency > 1 and len(chunks) > 1:
+            with ContextThreadPoolExecutor(max_workers=min(max_concurrency, len(chunks))) as executor:
+                for responses in executor.map(self._execute_batch_chunk, chunks):
+                    results.update(responses)
+        else:
+            for chunk in chunks:
+                results.update(self._execute_batch_chunk(chunk))
+        return results
+
+    def _execute_batch_chunk(self, chunk: list[dict[str, Any]]) -> dict[str, dict[str, Any]]:
+        results: dict[str, dict[str, Any]] = {}
+        pending = chunk
+        for attempt in range(BATCH_MAX_RETRIES + 1):
+            responses = self._send_batch(pending)
+            retry_ids = {
+                request["id"]
+                for request in pending
+                if self._batch_retryable(request, responses.get(request["id"], {}).get("status"))
+            }
+            # Dependents of a retried request fail with 424 and must go again with it.
+            for request in pending:
+                if responses.get(request["id"], {}).get("status") == 424 and retry_ids.intersection(
+                    request.get("dependsOn", [])
+                ):
+                    retry_ids.add(request["id"])
+            results.update(responses)
+            if not retry_ids or attempt == BATCH_MAX_RETRIES:
+                break
+            delay = BATCH_RETRY_BACKOFF * 2**attempt
+            for request_id in retry_ids:
+                retry_after = responses[request_id].get("headers", {}).get("Retry-After")
+                if retry_after is not None and str(retry_after).isdigit():
+                    delay = max(delay, float(retry_after))
+            time.sleep(delay)
+            retried = []
+            for request in pending:
+                if request["id"] not in retry_ids:
+                    continue
+                request = dict(request)
+                # Dependencies that already succeeded are not re-sent, so drop them.
+                depends_on = [d for d in request.pop("dependsOn", []) if d in retry_ids]
+                if depends_on:
+                    request["dependsOn"] = depends_on
+                retried.append(request)
+            pending = retried
+        return results
+
+    @staticmethod
+    def _batch_retryable(request: dict[str, Any], status: Optional[int]) -> bool:
+        if status == 429:
+            return True
+        return status in BATCH_RETRY_STATUSES and request["method"].upper() in BATCH_IDEMPOTENT_METHODS
+
+    @staticmethod
+    def _batch_error(item: dict[str, Any]) -> dict[str, Any]:
+        body = item.get("body") or {}
+        error = body.get("error", {}) if isinstance(body, dict) else {}
+        return {
+            "status": item.get("status"),
+            "code": error.get("code"),
+            "message": error.get("message"),
+        }
+
+    def _batch_by_message(
+        self,
+        message_ids: List[str],
+        build: Any,
+        max_concurrency: int = 1,
+    ) -> tuple[dict[str, dict[str, Any]], dict[str, dict[str, Any]]]:
+        """
+        Issues one sub-request per message id via build(index, message_id) and splits
+        the results into successes and errors keyed by message id.
+        """
+        if not message_ids:
+            raise ValueError("Missing required parameter 'message_ids'.")
+        requests = [build(str(index), message_id) for index, message_id in enumerate(message_ids)]
+        responses = self._execute_batch(requests, max_concurrency=max_concurrency)
+        succeeded: dict[str, dict[str, Any]] = {}
+        errors: dict[str, dict[str, Any]] = {}
+        for index, message_id in enumerate(message_ids):
+            item = responses.get(str(index), {"status": None, "body": None})
+            if item.get("status") is not None and 200 <= item["status"] < 300:
+                succeeded[message_id] = item
+            else:
+                errors[message_id] = self._batch_error(item)
+        return succeeded, errors
+
+    def batch_get_messages(
+        self,
+        message_ids: List[str],
+        user_id: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Retrieves many messages in as few HTTP requests as possible by combining up to 20 lookups per Graph $batch call.
+
+        Args:
+            message_ids (array): IDs of the messages to retrieve.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            select (array): Select properties to be returned for every message
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'.
+
+        Returns:
+            dict[str, Any]: 'value' with the retrieved messages in request order and 'errors' keyed by message id.
+
+        Raises:
+            HTTPStatusError: Raised when the $batch request itself fails.
+            ValueError: Raised before any request when select names a property Graph doesn't have.
+
+        Tags:
+            users.message, batch, important
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
+        params = build_query(select=select)
+        query = f"?{urlencode(params, safe='$,')}" if params else ""
+        succeeded, errors = self._batch_by_message(
+            message_ids,
+            lambda request_id, message_id: {
+                "id": request_id,
+                "method": "GET",
+                "url": f"/users/{user_id}/messages/{message_id}{query}",
+            },
+        )
+        return {
+            "value": [self._project(succeeded[m]["body"], profile) for m in message_ids if m in succeeded],
+            "errors": errors,
+        }
+
+    def batch_delete_messages(
+        self,
+        message_ids: List[str],
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Deletes many messages by combining up to 20 deletions per Graph $batch call.
+
+        Args:
+            message_ids (array): IDs of the messages to delete.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: 'deleted' with the ids that were removed and 'errors' keyed by message id.
+
+        Raises:
+            HTTPStatusError: Raised when the $batch request itself fails.
+
+        Tags:
+            users.message, batch, important
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        succeeded, errors = self._batch_by_message(
+            message_ids,
+            lambda request_id, message_id: {
+                "id": request_id,
+                "method": "DELETE",
+                "url": f"/users/{user_id}/messages/{message_id}",
+            },
+        )
+        deleted = [m for m in message_ids if m in succeeded]
+        self._emit_message_event("deleted", user_id, deleted)
+        return {"deleted": deleted, "errors": errors}
+
+    def batch_move_messages(
+        self,
+        message_ids: List[str],
+        destination_folder_id: str,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Moves many messages to another mail folder by combining up to 20 moves per Graph $batch call.
+
+        Args:
+            message_ids (array): IDs of the messages to move.
+            destination_folder_id (string): Destination mail folder id or well-known name such as 'archive' or 'deleteditems'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: 'moved' mapping each original id to the id of the moved message and 'errors' keyed by message id.
+
+        Raises:
+            HTTPStatusError: Raised when the $batch request itself fails.
+
+        Tags:
+            users.message, batch, important
+        """
+        if not destination_folder_id:
+            raise ValueError("Missing required parameter 'destination_folder_id'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        succeeded, errors = self._batch_by_message(
+            message_ids,
+            lambda request_id, message_id: {
+                "id": request_id,
+                "method": "POST",
+                "url": f"/users/{user_id}/messages/{message_id}/move",
+                "headers": {"Content-Type": "application/json"},
+                "body": {"destinationId": destination_folder_id},
+            },
+        )
+        moved = {m: (succeeded[m].get("body") or {}).get("id") for m in message_ids if m in succeeded}
+        self._emit_message_event("moved", user_id, list(moved))
+        return {"moved": moved, "errors": errors}
+
+    def batch_list_attachments(
+        self,
+        message_ids: List[str],
+        user_id: Optional[str] = None,
+        select: Optional[List[str]] = None,
+    ) -> dict[str, Any]:
+        """
+        Lists the attachments of many messages by combining up to 20 listings per Graph $batch call.
+
+        Args:
+            message_ids (array): IDs of the messages whose attachments should be listed.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            select (array): Select attachment properties to be returned, e.g. ['id', 'name', 'size', 'contentType'].
+
+        Returns:
+            dict[str, Any]: 'attachments' mapping each message id to its attachment list and 'errors' keyed by message id.
+
+        Raises:
+            HTTPStatusError: Raised when the $batch request itself fails.
+
+        Tags:
+            users.message, batch, important
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        params = build_query("attachment", select=select)
+        query = f"?{urlencode(params, safe='$,')}" if params else ""
+        succeeded, errors = self._batch_by_message(
+            message_ids,
+            lambda request_id, message_id: {
+                "id": request_id,
+                "method": "GET",
+                "url": f"/users/{user_id}/messages/{message_id}/attachments{query}",
+            },
+        )
+        return {
+            "attachments": {m: (succeeded[m].get("body") or {}).get("value", []) for m in message_ids if m in succeeded},
+            "errors": errors,
+        }
+
+    def _bulk_apply(
+        self,
+        filter: str,
+        folder_id: Optional[str],
+        user_id: Optional[str],
+        max_messages: int,
+        max_concurrency: int,
+        build: Callable[[str, str, str], dict[str, Any]],
+        event: str,
+    ) -> dict[str, Any]:
+        """
+        Collects the ids of messages matching filter, then applies one batched
+        sub-request per message built by build(request_id, user_id, message_id).
+        Ids are gathered before any change is made so that moves and deletes can't
+        shift the pages still being read.
+        """
+        if not filter:
+            raise ValueError("Missing required parameter 'filter'.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        message_ids = [
+            message["id"]
+            for message in self.iter_messages(
+                user_id=user_id,
+                folder_id=folder_id,
+                select=["id"],
+                filter=filter,
+                page_size=min(max_messages, MAX_PAGE_SIZE),
+                max_items=max_messages,
+            )
+        ]
+        summary = {
+            "matched": len(message_ids),
+            "succeeded": 0,
+            "failed": 0,
+            "errors": {},
+            "more_may_match": len(message_ids) >= max_messages,
+        }
+        if not message_ids:
+            return summary
+        succeeded, errors = self._batch_by_message(
+            message_ids,
+            lambda request_id, message_id: build(request_id, user_id, message_id),
+            max_concurrency=max_concurrency,
+        )
+        self._emit_message_event(event, user_id, list(succeeded))
+        summary.update(
+            succeeded=len(succeeded),
+            failed=len(errors),
+            errors=dict(list(errors.items())[:BULK_ERROR_SAMPLE]),
+        )
+        return summary
+
+    def bulk_update_messages(
+        self,
+        filter: str,
+        is_read: Optional[bool] = None,
+        categories: Optional[List[str]] = None,
+        flag_status: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        max_messages: int = BULK_MAX_MESSAGES,
+        max_concurrency: int = BULK_CONCURRENCY,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Marks read or unread, categorizes and/or flags every message matching an OData filter in a single call, updating them in batches of 20 and returning a compact summary.
+
+        Args:
+            filter (string): OData filter selecting the messages. Example: "from/emailAddress/address eq 'newsletter@contoso.com'".
+            is_read (boolean, optional): Set the read state.
+            categories (array, optional): Replace the categories with this list. Example: ['Newsletters'].
+            flag_status (string, optional): Set the follow-up flag: 'notFlagged', 'flagged' or 'complete'.
+            folder_id (string, optional): Only messages in this mail folder id or well-known name such as 'inbox'.
+            max_messages (integer): Maximum number of messages to update. Example: '5000'.
+            max_concurrency (integer): Maximum $batch requests in flight. Example: '4'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: Counts of matched, succeeded and failed messages, a sample of errors keyed by message id, and whether more messages may match beyond max_messages.
+
+        Raises:
+            HTTPStatusError: Raised when listing messages or a $batch request fails.
+            ValueError: Raised when no filter or no change is given.
+
+        Tags:
+            users.message, bulk, important
+        """
+        changes: dict[str, Any] = {}
+        if is_read is not None:
+            changes["isRead"] = is_read
+        if categories is not None:
+            changes["categories"] = categories
+        if flag_status is not None:
+            if flag_status not in ("notFlagged", "flagged", "complete"):
+                raise ValueError("flag_status must be 'notFlagged', 'flagged' or 'complete'.")
+            changes["flag"] = {"flagStatus": flag_status}
+        if not changes:
+            raise ValueError("Provide at least one of 'is_read', 'categories' or 'flag_status'.")
+        return self._bulk_apply(
+            filter,
+            folder_id,
+            user_id,
+            max_messages,
+            max_concurrency,
+            lambda request_id, user, message_id: {
+                "id": request_id,
+                "method": "PATCH",
+                "url": f"/users/{user}/messages/{message_id}",
+                "headers": {"Content-Type": "application/json"},
+                "body": changes,
+            },
+            "updated",
+        )
+
+    def bulk_move_messages(
+        self,
+        filter: str,
+        destination_folder_id: str,
+        folder_id: Optional[str] = None,
+        max_messages: int = BULK_MAX_MESSAGES,
+        max_concurrency: int = BULK_CONCURRENCY,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Moves every message matching an OData filter to another mail folder in a single call, in batches of 20, returning a compact summary.
+
+        Args:
+            filter (string): OData filter selecting the messages. Example: "receivedDateTime lt 2023-01-01T00:00:00Z".
+            destination_folder_id (string): Destination mail folder id or well-known name such as 'archive'.
+            folder_id (string, optional): Only messages in this mail folder id or well-known name such as 'inbox'.
+            max_messages (integer): Maximum number of messages to move. Example: '5000'.
+            max_concurrency (integer): Maximum $batch requests in flight. Example: '4'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: Counts of matched, succeeded and failed messages, a sample of errors keyed by message id, and whether more messages may match beyond max_messages.
+
+        Raises:
+            HTTPStatusError: Raised when listing messages or a $batch request fails.
+            ValueError: Raised when no filter or destination is given.
+
+        Tags:
+            users.message, bulk, important
+        """
+        if not destination_folder_id:
+            raise ValueError("Missing required parameter 'destination_folder_id'.")
+        return self._bulk_apply(
+            filter,
+            folder_id,
+            user_id,
+            max_messages,
+            max_concurrency,
+            lambda request_id, user, message_id: {
+                "id": request_id,
+                "method": "POST",
+                "url": f"/users/{user}/messages/{message_id}/move",
+                "headers": {"Content-Type": "application/json"},
+                "body": {"destinationId": destination_folder_id},
+            },
+            "moved",
+        )
+
+    def bulk_delete_messages(
+        self,
+        filter: str,
+        folder_id: Optional[str] = None,
+        max_messages: int = BULK_MAX_MESSAGES,
+        max_concurrency: int = BULK_CONCURRENCY,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Deletes every message matching an OData filter in a single call, in batches of 20, returning a compact summary. Deleted messages go to Deleted Items.
+
+        Args:
+            filter (string): OData filter selecting the messages. Example: "isRead eq true and receivedDateTime lt 2023-01-01T00:00:00Z".
+            folder_id (string, optional): Only messages in this mail folder id or well-known name such as 'inbox'.
+            max_messages (integer): Maximum number of messages to delete. Example: '5000'.
+            max_concurrency (integer): Maximum $batch requests in flight. Example: '4'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: Counts of matched, succeeded and failed messages, a sample of errors keyed by message id, and whether more messages may match beyond max_messages.
+
+        Raises:
+            HTTPStatusError: Raised when listing messages or a $batch request fails.
+            ValueError: Raised when no filter is given.
+
+        Tags:
+            users.message, bulk, important
+        """
+        return self._bulk_apply(
+            filter,
+            folder_id,
+            user_id,
+            max_messages,
+            max_concurrency,
+            lambda request_id, user, message_id: {
+                "id": request_id,
+                "method": "DELETE",
+                "url": f"/users/{user}/messages/{message_id}",
+            },
+            "deleted",
+        )
+
+    def _forget_conversations(self, event: str, user_id: str, message_ids: list[str]) -> None:
+        """
+        Message hook dropping memoized threads that contain a changed message.
+        """
+        changed = set(message_ids)
+        with self._conversation_lock:
+            for key in [
+                key
+                for key, (_, thread) in self._conversations.items()
+                if any(message["id"] in changed for message in thread["messages"])
+            ]:
+                del self._conversations[key]
+
+    def get_conversation(
+        self,
+        conversation_id: Optional[str] = None,
+        message_id: Optional[str] = None,
+        max_messages: int = 100,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Fetches a whole email thread in one call, given its conversation id or any message in it, and returns it compactly in chronological order with its participants. Each message carries only its own new text, without the quoted earlier replies.
+
+        Args:
+            conversation_id (string, optional): The conversationId of the thread.
+            message_id (string, optional): Any message in the thread; used when conversation_id is not given.
+            max_messages (integer): Maximum messages to return, oldest first. Example: '100'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: The conversation id, subject, participants, message count and messages (id, sender, recipients, received time, read state and body).
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised when neither conversation_id nor message_id is given.
+
+        Tags:
+            users.message, conversations, important
+        """
+        if not conversation_id and not message_id:
+            raise ValueError("Missing required parameter 'conversation_id' or 'message_id'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        if not conversation_id:
+            message = self._cached_get(
+                user_id,
+                f"{self.base_url}/users/{user_id}/messages/{message_id}",
+                {"$select": "conversationId"},
+            )
+            conversation_id = message["conversationId"]
+        key = (user_id.lower(), conversation_id, max_messages)
+        with self._conversation_lock:
+            cached = self._conversations.get(key)
+            if cached is not None and cached[0] > time.monotonic():
+                self._conversations.move_to_end(key)
+                return cached[1]
+        messages = list(
+            self.iter_messages(
+                user_id=user_id,
+                select=CONVERSATION_SELECT,
+                where=[Condition("conversationId", "eq", conversation_id)],
+                orderby=["receivedDateTime asc"],
+                page_size=min(max_messages, 50),
+                max_items=max_messages,
+            )
+        )
+        thread = {
+            "conversation_id": conversation_id,
+            **project_conversation(messages, self.body_char_limit),
+            "message_count": len(messages),
+        }
+        if self.conversation_cache_ttl > 0:
+            with self._conversation_lock:
+                self._conversations[key] = (time.monotonic() + self.conversation_cache_ttl, thread)
+                while len(self._conversations) > CONVERSATION_CACHE_SIZE:
+                    self._conversations.popitem(last=False)
+        return thread
+
+    def _fanout_request(
+        self,
+        user_id: str,
+        filter: Optional[str],
+        search: Optional[str],
+        select: Optional[List[str]],
+        top: int,
+    ) -> tuple[str, dict[str, Any]]:
+        # $search results can't be ordered by Graph; they are sorted locally instead.
+        orderby = None if search else ["receivedDateTime desc"]
+        if select and "receivedDateTime" not in select:
+            select = select + ["receivedDateTime"]
+        return self._message_list_request(user_id, None, select, filter, search, orderby, top)
+
+    def _mailbox_error(self, error: Exception) -> dict[str, Any]:
+        if isinstance(error, httpx.HTTPStatusError):
+            try:
+                body = error.response.json()
+            except ValueError:
+                body = None
+            return self._batch_error({"status": error.response.status_code, "body": body})
+        return {"status": None, "code": type(error).__name__, "message": str(error)}
+
+    def iter_mailboxes(
+        self,
+        user_ids: List[str],
+        filter: Optional[str] = None,
+        search: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        top: int = 25,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> Iterator[dict[str, Any]]:
+        """
+        Lists messages in several mailboxes concurrently, yielding each mailbox's result
+        as soon as it completes: {'mailbox', 'value'} on success or {'mailbox', 'error'}
+        when that mailbox failed. A failing mailbox does not affect the others.
+        """
+        if not user_ids:
+            raise ValueError("Missing required parameter 'user_ids'.")
+
+        def fetch(user_id: str) -> list[dict[str, Any]]:
+            url, params = self._fanout_request(user_id, filter, search, select, top)
+            return self._handle_response(self._get(url, params=params)).get("value", [])
+
+        with ContextThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(user_ids)))) as executor:
+            futures = {executor.submit(fetch, user_id): user_id for user_id in dict.fromkeys(user_ids)}
+            for future in as_completed(futures):
+                user_id = futures[future]
+                try:
+                    yield {"mailbox": user_id, "value": future.result()}
+                except httpx.HTTPError as e:
+                    logger.warning(f"Listing messages for mailbox {user_id} failed: {e}")
+                    yield {"mailbox": user_id, "error": self._mailbox_error(e)}
+
+    async def aiter_mailboxes(
+        self,
+        user_ids: List[str],
+        filter: Optional[str] = None,
+        search: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        top: int = 25,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> AsyncIterator[dict[str, Any]]:
+        """
+        Async counterpart of iter_mailboxes over the shared async client.
+        """
+        if not user_ids:
+            raise ValueError("Missing required parameter 'user_ids'.")
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def fetch(user_id: str) -> dict[str, Any]:
+            url, params = self._fanout_request(user_id, filter, search, select, top)
+            async with semaphore:
+                try:
+                    response = await self._aget(url, params=params)
+                    return {"mailbox": user_id, "value": self._handle_response(response).get("value", [])}
+                except httpx.HTTPError as e:
+                    logger.warning(f"Listing messages for mailbox {user_id} failed: {e}")
+                    return {"mailbox": user_id, "error": self._mailbox_error(e)}
+
+        for result in asyncio.as_completed([fetch(user_id) for user_id in dict.fromkeys(user_ids)]):
+            yield await result
+
+    @staticmethod
+    def _merge_mailboxes(results: list[dict[str, Any]], limit: int) -> dict[str, Any]:
+        """
+        k-way merges per-mailbox message lists on receivedDateTime, newest first, tagging
+        every message with its mailbox.
+        """
+
+        def received(message: dict[str, Any]) -> str:
+            return message.get("receivedDateTime") or ""
+
+        streams = [
+            sorted(({**message, "mailbox": result["mailbox"]} for message in result["value"]), key=received, reverse=True)
+            for result in results
+            if "value" in result
+        ]
+        merged = list(islice(heapq.merge(*streams, key=received, reverse=True), limit))
+        errors = {result["mailbox"]: result["error"] for result in results if "error" in result}
+        return {"value": merged, "errors": errors}
+
+    def _fanout_select(self, select: Optional[List[str]], profile: Optional[str]) -> tuple[Optional[List[str]], Optional[str]]:
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
+        return select, profile
+
+    def list_messages_across(
+        self,
+        user_ids: List[str],
+        filter: Optional[str] = None,
+        top: int = 25,
+        select: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """
+        Lists the newest messages across many mailboxes (e.g. shared or delegated mailboxes) in one call, querying them concurrently and merging the results by received time. A mailbox that fails is reported in 'errors' without affecting the others.
+
+        Args:
+            user_ids (array): User ids or userPrincipalNames of the mailboxes to query. Example: ['support@contoso.com', 'sales@contoso.com'].
+            filter (string, optional): OData filter applied in every mailbox. Example: 'isRead eq false'.
+            top (integer): Maximum messages per mailbox and in the merged result. Example: '25'.
+            select (array, optional): Select properties to be returned for every message.
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'.
+            max_concurrency (integer): Maximum mailboxes queried at once. Example: '16'.
+
+        Returns:
+            dict[str, Any]: 'value' with messages from all mailboxes, newest first, each tagged with its 'mailbox', and 'errors' keyed by mailbox.
+
+        Raises:
+            ValueError: Raised when no mailboxes are given.
+
+        Tags:
+            users.message, mailboxes, important
+        """
+        select, profile = self._fanout_select(select, profile)
+        results = list(self.iter_mailboxes(user_ids, filter=filter, select=select, top=top, max_concurrency=max_concurrency))
+        merged = self._merge_mailboxes(results, top)
+        return {**self._project({"value": merged["value"]}, profile), "errors": merged["errors"]}
+
+    def search_across(
+        self,
+        user_ids: List[str],
+        query: str,
+        top: int = 25,
+        select: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """
+        Searches many mailboxes for messages matching a query in one call, querying them concurrently and merging the hits by received time. A mailbox that fails is reported in 'errors' without affecting the others.
+
+        Args:
+            user_ids (array): User ids or userPrincipalNames of the mailboxes to search. Example: ['support@contoso.com', 'sales@contoso.com'].
+            query (string): Search text, matched against subject, body and addresses. Example: 'invoice overdue'.
+            top (integer): Maximum hits per mailbox and in the merged result. Example: '25'.
+            select (array, optional): Select properties to be returned for every message.
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'.
+            max_concurrency (integer): Maximum mailboxes searched at once. Example: '16'.
+
+        Returns:
+            dict[str, Any]: 'value' with hits from all mailboxes, newest first, each tagged with its 'mailbox', and 'errors' keyed by mailbox.
+
+        Raises:
+            ValueError: Raised when no mailboxes or no query are given.
+
+        Tags:
+            users.message, mailboxes, search, important
+        """
+        search = search_phrase(query)
+        select, profile = self._fanout_select(select, profile)
+        results = list(
+            self.iter_mailboxes(user_ids, search=search, select=select, top=top, max_concurrency=max_concurrency)
+        )
+        merged = self._merge_mailboxes(results, top)
+        return {**self._project({"value": merged["value"]}, profile), "errors": merged["errors"]}
+
+    @property
+    def sync_store(self) -> BaseStore:
+        if self._sync_store is None:
+            self._sync_store = SQLiteStore()
+        return self._sync_store
+
+    @staticmethod
+    def _sync_state_key(user_id: str, folder_id: str) -> str:
+        return f"outlook:delta:{user_id.lower()}:{folder_id}"
+
+    def _load_sync_state(self, key: str) -> Optional[dict[str, Any]]:
+        try:
+            return json.loads(self.sync_store.get(key))
+        except KeyNotFoundError:
+            return None
+
+    def sync_mail_folder(
+        self,
+        folder_id: str = "inbox",
+        user_id: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        max_pages: Optional[int] = None,
+        reset: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Incrementally syncs a mail folder using Graph delta queries and returns only the messages added, changed or removed since the previous sync. The first call (or a reset) enumerates the folder; later calls cost a single small request when nothing changed. Progress is saved only once the changes are returned, so a sync that fails part-way is fetched again rather than losing changes; use max_pages to take a large round in smaller steps.
+
+        Args:
+            folder_id (string): Mail folder id or well-known name. Defaults to 'inbox'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            select (array): Message properties to track. Only used when a new sync starts. Defaults to id, subject, from, receivedDateTime, isRead, bodyPreview and conversationId.
+            max_pages (integer): Stop after this many pages; the next call continues the same round.
+            reset (boolean): Discard the saved state and enumerate the folder from scratch.
+
+        Returns:
+            dict[str, Any]: 'changed' messages (new or updated), 'removed' message ids, and 'complete', which is false when more pages remain in this round.
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, sync, important
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        key = self._sync_state_key(user_id, folder_id)
+        return self._delta_sync(
+            user_id,
+            folder_id,
+            select or DELTA_DEFAULT_SELECT,
+            max_pages,
+            None if reset else self._load_sync_state(key),
+            lambda state: self.sync_store.set(key, json.dumps(state)),
+        )
+
+    def _delta_sync(
+        self,
+        user_id: str,
+        folder_id: str,
+        select: List[str],
+        max_pages: Optional[int],
+        state: Optional[dict[str, Any]],
+        save: Callable[[dict[str, Any]], Any],
+        consume: Optional[Callable[[dict[str, Any]], Any]] = None,
+    ) -> dict[str, Any]:
+        """
+        Runs one delta round for a folder, starting from state (a saved link, or None to
+        enumerate the folder), and passes save the link it stopped at. Separate consumers
+        keep separate state so they don't steal each other's changes. The link is saved
+        only after consume (if given) has taken the result, so a failure on a later page,
+        or in consume, leaves the round's starting link in place and the next call
+        fetches the same changes again instead of skipping them.
+        """
+        if state:
+            url, query_params = state["link"], None
+        else:
+            url = f"{self.base_url}/users/{user_id}/mailFolders/{folder_id}/messages/delta"
+            query_params = build_query(select=select)
+
+        changed: list[dict[str, Any]] = []
+        removed: list[str] = []
+        complete = False
+        link = None
+        for page in self._iter_pages(url, query_params, max_pages=max_pages):
+            for item in page.get("value", []):
+                if "@removed" in item:
+                    removed.append(item["id"])
+                else:
+                    changed.append(item)
+            delta_link = page.get("@odata.deltaLink")
+            complete = delta_link is not None
+            link = delta_link or page.get("@odata.nextLink") or link
+        result = {
+            "folder_id": folder_id,
+            "changed": changed,
+            "removed": removed,
+            "complete": complete,
+        }
+        if consume is not None:
+            consume(result)
+        if link:
+            save({"link": link, "complete": complete})
+        return result
+
+    def _emit_message_event(self, event: str, user_id: str, message_ids: list[str]) -> None:
+        for hook in self.message_hooks:
+            hook(event, user_id, message_ids)
+
+    @property
+    def message_index(self) -> MessageIndex:
+        """
+        Local SQLite message index, created on first use and kept current through
+        message_hooks.
+        """
+        if self._message_index is None:
+            self._message_index = MessageIndex(
+                self.index_path or ":memory:",
+                max_age_days=self.index_max_age_days,
+                max_messages=self.index_max_messages,
+            )
+            self.message_hooks.append(self._message_index.handle_event)
+        return self._message_index
+
+    def index_mail_folder(
+        self,
+        folder_id: str = "inbox",
+        user_id: Optional[str] = None,
+        max_pages: Optional[int] = None,
+        reset: bool = False,
+    ) -> dict[str, Any]:
+        """
+        Brings the local message index up to date for a mail folder using an incremental delta sync, so that search_local_messages can answer from it. The first call crawls the folder; later calls only fetch changes. Progress is kept in the index itself, so a fresh in-memory index crawls the folder again.
+
+        Args:
+            folder_id (string): Mail folder id or well-known name. Defaults to 'inbox'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            max_pages (integer): Stop after this many pages; the next call continues where this one stopped.
+            reset (boolean): Re-crawl the folder from scratch.
+
+        Returns:
+            dict[str, Any]: Counts of indexed, removed and evicted messages, whether the crawl is complete, and the total indexed.
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, index
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        index = self.message_index
+        counts: dict[str, int] = {}
+
+        def apply(result: dict[str, Any]) -> None:
+            counts["indexed"] = index.upsert(result["changed"], user_id, folder_id)
+            counts["removed"] = index.remove(result["removed"])
+
+        result = self._delta_sync(
+            user_id,
+            folder_id,
+            INDEX_SELECT,
+            max_pages,
+            None if reset else index.cursor(user_id, folder_id),
+            lambda state: index.save_cursor(user_id, folder_id, state),
+            apply,
+        )
+        evicted = index.evict()
+        if result["complete"]:
+            index.stale_folders.discard((user_id.lower(), folder_id))
+        return {
+            "folder_id": folder_id,
+            "indexed": counts["indexed"],
+            "removed": counts["removed"],
+            "evicted": evicted,
+            "complete": result["complete"],
+            "total": index.count(),
+        }
+
+    def search_local_messages(
+        self,
+        query: Optional[str] = None,
+        folder: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 25,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Searches the local message index built by index_mail_folder without calling Microsoft Graph, matching words in the subject, sender, recipients and body preview. Results are newest first and return in milliseconds, but only cover folders that have been indexed.
+
+        Args:
+            query (string, optional): Words that must all appear in the message. Example: 'invoice march'.
+            folder (string, optional): Only messages from this indexed folder, e.g. 'inbox'.
+            since (string, optional): Only messages received at or after this ISO 8601 time. Example: '2024-03-01T00:00:00Z'.
+            limit (integer): Maximum number of results. Example: '25'.
+            user_id (string, optional): Only messages indexed for this user.
+
+        Returns:
+            dict[str, Any]: 'value' with matching messages and 'stale_folders' listing folders changed since they were last indexed.
+
+        Tags:
+            users.message, index, important
+        """
+        index = self.message_index
+        return {
+            "value": index.search(query, user_id=user_id, folder_id=folder, since=since, limit=limit),
+            "stale_folders": sorted(f for u, f in index.stale_folders if not user_id or u == user_id.lower()),
+        }
+
+    @property
+    def upload_client(self) -> httpx.Client:
+        """
+        Client for pre-authorised upload session URLs. It deliberately carries no
+        Authorization header, but shares the throttling layer with the Graph client.
+        """
+        if self._upload_client is None:
+            self._upload_client = httpx.Client(
+                timeout=self.default_timeout,
+                transport=ThrottlingTransport(
+                    InstrumentedTransport(self._transport or httpx.HTTPTransport()),
+                    self._limiter,
+                    self.throttling_stats,
+                ),
+            )
+        return self._upload_client
+
+    @staticmethod
+    def _attachment_sources(files: List[Any]) -> list[AttachmentSource]:
+        return [f if isinstance(f, AttachmentSource) else AttachmentSource.from_path(f) for f in files]
+
+    @staticmethod
+    def _inline_attachment(source: AttachmentSource) -> dict[str, Any]:
+        return {
+            "@odata.type": "#microsoft.graph.fileAttachment",
+            "name": source.name,
+            "contentType": source.content_type,
+            "contentBytes": base64.b64encode(source.read_all()).decode("ascii"),
+        }
+
+    def _attach_to_draft(
+        self,
+        user_id: str,
+        draft_id: str,
+        source: AttachmentSource,
+        progress: Optional[ProgressCallback],
+    ) -> None:
+        url = f"{self.base_url}/users/{user_id}/messages/{draft_id}/attachments"
+        if source.size < INLINE_ATTACHMENT_LIMIT:
+            response = self._post(url, data=self._inline_attachment(source), params={})
+            self._handle_response(response)
+            if progress:
+                progress(source.name, source.size, source.size)
+            return
+        response = self._post(
+            f"{url}/createUploadSession",
+            data={
+                "AttachmentItem": {
+                    "attachmentType": "file",
+                    "name": source.name,
+                    "size": source.size,
+                    "contentType": source.content_type,
+                }
+            },
+            params={},
+        )
+        session = self._handle_response(response)
+        upload_in_chunks(self.upload_client, session["uploadUrl"], source, progress=progress)
+
+    def _send_draft_with_attachments(
+        self,
+        user_id: str,
+        draft_id: str,
+        sources: list[AttachmentSource],
+        progress: Optional[ProgressCallback],
+    ) -> Any:
+        """
+        Attaches every source to a draft and sends it. If anything fails before the
+        send, the draft is deleted so no half-built message is left behind.
+        """
+        try:
+            for source in sources:
+                self._attach_to_draft(user_id, draft_id, source, progress)
+        except Exception:
+            self._delete(f"{self.base_url}/users/{user_id}/messages/{draft_id}")
+            raise
+        response = self._post(
+            f"{self.base_url}/users/{user_id}/messages/{draft_id}/send", data=None, params={}
+        )
+        return self._handle_response(response)
+
+    def send_mail_with_files(
+        self,
+        message: dict[str, Any],
+        files: List[Any],
+        user_id: Optional[str] = None,
+        save_to_sent_items: Optional[bool] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Any:
+        """
+        Sends a message with file attachments given as paths or AttachmentSource objects.
+
+        Attachments totalling less than 3 MB are sent inline through sendMail. Otherwise
+        the message is created as a draft, large files are streamed through upload
+        sessions in fixed-size ranges, and the draft is sent; save_to_sent_items does not
+        apply to this path, as sent drafts are always saved.
+        progress(name, bytes_uploaded, total_bytes) is called as attachments are uploaded.
+        """
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        sources = self._attachment_sources(files)
+        if sum(source.size for source in sources) < INLINE_ATTACHMENT_LIMIT:
+            message = {
+                **message,
+                "attachments": list(message.get("attachments") or [])
+                + [self._inline_attachment(source) for source in sources],
+            }
+            result = self.user_send_mail(message, user_id=user_id, saveToSentItems=save_to_sent_items)
+            if progress:
+                for source in sources:
+                    progress(source.name, source.size, source.size)
+            return result
+        response = self._post(f"{self.base_url}/users/{user_id}/messages", data=message, params={})
+        draft = self._handle_response(response)
+        result = self._send_draft_with_attachments(user_id, draft["id"], sources, progress)
+        self._emit_message_event("sent", user_id, [])
+        return result
+
+    def reply_with_files(
+        self,
+        message_id: str,
+        files: List[Any],
+        comment: Optional[str] = None,
+        user_id: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None,
+    ) -> Any:
+        """
+        Replies to a message with file attachments given as paths or AttachmentSource
+        objects, using upload sessions for large files like send_mail_with_files.
+        """
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        sources = self._attachment_sources(files)
+        if sum(source.size for source in sources) < INLINE_ATTACHMENT_LIMIT:
+            result = self.users_message_reply(
+                message_id,
+                user_id=user_id,
+                comment=comment,
+                message={"attachments": [self._inline_attachment(source) for source in sources]},
+            )
+            if progress:
+                for source in sources:
+                    progress(source.name, source.size, source.size)
+            return result
+        response = self._post(
+            f"{self.base_url}/users/{user_id}/messages/{message_id}/createReply",
+            data={"comment": comment} if comment is not None else {},
+            params={},
+        )
+        draft = self._handle_response(response)
+        result = self._send_draft_with_attachments(user_id, draft["id"], sources, progress)
+        self._emit_message_event("replied", user_id, [message_id])
+        return result
+
+    def user_send_mail_with_attachments(
+        self,
+        message: dict[str, Any],
+        attachment_paths: List[str],
+        user_id: Optional[str] = None,
+        saveToSentItems: Optional[bool] = None,
+    ) -> Any:
+        """
+        Sends an email with files from the local disk attached, including files larger than the 3 MB inline limit, which are uploaded in chunks without loading them into memory.
+
+        Args:
+            message (object): message Example: {'subject': 'Quarterly report', 'body': {'contentType': 'Text', 'content': 'Report attached.'}, 'toRecipients': [{'emailAddress': {'address': 'frannis@contoso.com'}}]}.
+            attachment_paths (array): Paths of local files to attach. Example: ['/tmp/report.pdf'].
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            saveToSentItems (boolean): saveToSentItems, honoured when all attachments fit inline. Example: 'False'.
+
+        Returns:
+            Any: Success
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised when an attachment path does not exist.
+
+        Tags:
+            users.user.Actions, important
+        """
+        return self.send_mail_with_files(
+            message, attachment_paths, user_id=user_id, save_to_sent_items=saveToSentItems
+        )
+
+    def users_message_reply_with_attachments(
+        self,
+        message_id: str,
+        attachment_paths: List[str],
+        comment: Optional[str] = None,
+        user_id: Optional[str] = None,
+    ) -> Any:
+        """
+        Replies to a message with files from the local disk attached, including files larger than the 3 MB inline limit, which are uploaded in chunks without loading them into memory.
+
+        Args:
+            message_id (string): message-id
+            attachment_paths (array): Paths of local files to attach. Example: ['/tmp/agenda.pdf'].
+            comment (string): A comment to include in the reply. Example: 'Agenda attached.'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            Any: Success
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised when an attachment path does not exist.
+
+        Tags:
+            users.message, important
+        """
+        return self.reply_with_files(message_id, attachment_paths, comment=comment, user_id=user_id)
+
+    @staticmethod
+    def _safe_filename(name: Optional[str], fallback: str) -> str:
+        name = os.path.basename((name or "").replace("\\", "/")).strip()
+        return name if name not in ("", ".", "..") else fallback
+
+    def _stream_value(self, url: str, path: str) -> tuple[int, Optional[str]]:
+        """
+        Streams a $value response (attachment contents or a message's MIME) to path via
+        a temporary file so readers never see a partial download. Returns the number of bytes written and the content type.
+        """
+        partial = f"{path}.part"
+        size = 0
+        try:
+            with self.client.stream("GET", url) as response:
+                response.raise_for_status()
+                content_type = response.headers.get("Content-Type")
+                with open(partial, "wb") as file:
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        file.write(chunk)
+                        size += len(chunk)
+        except BaseException:
+            if os.path.exists(partial):
+                os.remove(partial)
+            raise
+        os.replace(partial, path)
+        return size, content_type
+
+    def download_attachment(
+        self,
+        message_id: str,
+        attachment_id: str,
+        dest: str,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Downloads a message attachment straight to a local file, streaming its raw contents in chunks so memory use stays flat regardless of attachment size and the contents never enter the conversation.
+
+        Args:
+            message_id (string): message-id
+            attachment_id (string): attachment-id
+            dest (string): Destination file path, or an existing directory to save the attachment under its own name. Example: '/tmp/downloads'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: The saved 'path', its 'size' in bytes and the 'contentType'.
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, attachments, important
+        """
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        if attachment_id is None:
+            raise ValueError("Missing required parameter 'attachment-id'.")
+        if not dest:
+            raise ValueError("Missing required parameter 'dest'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}/attachments/{attachment_id}"
+        path = dest
+        if os.path.isdir(dest):
+            response = self._get(url, params={"$select": "name"})
+            metadata = self._handle_response(response)
+            path = os.path.join(dest, self._safe_filename(metadata.get("name"), attachment_id))
+        size, content_type = self._stream_value(f"{url}/$value", path)
+        return {"path": path, "size": size, "contentType": content_type}
+
+    def download_attachments(
+        self,
+        dest_dir: str,
+        message_ids: Optional[List[str]] = None,
+        filter: Optional[str] = None,
+        name_pattern: Optional[str] = None,
+        content_type: Optional[str] = None,
+        max_messages: int = 100,
+        max_concurrency: int = DOWNLOAD_CONCURRENCY,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Downloads every attachment matching the given criteria to a local directory, streaming several files concurrently. Messages come from message_ids or, if omitted, from messages with attachments matching the OData filter.
+
+        Args:
+            dest_dir (string): Directory to save the files in; created if missing. Example: '/tmp/downloads'.
+            message_ids (array, optional): Messages whose attachments to download.
+            filter (string, optional): OData filter selecting messages when message_ids is not given. Example: "receivedDateTime ge 2024-03-01T00:00:00Z".
+            name_pattern (string, optional): Shell-style pattern attachment names must match. Example: '*.pdf'.
+            content_type (string, optional): Only attachments whose content type starts with this. Example: 'image/'.
+            max_messages (integer): Maximum number of messages to inspect when using filter. Example: '100'.
+            max_concurrency (integer): Maximum simultaneous downloads. Example: '4'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: 'downloaded' files with message id, attachment id, path and size, and 'errors' for attachments that failed.
+
+        Raises:
+            HTTPStatusError: Raised when listing messages or attachments fails.
+
+        Tags:
+            users.message, attachments, important
+        """
+        if not dest_dir:
+            raise ValueError("Missing required parameter 'dest_dir'.")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        os.makedirs(dest_dir, exist_ok=True)
+        if message_ids is None:
+            message_filter = "hasAttachments eq true" + (f" and ({filter})" if filter else "")
+            message_ids = [
+                message["id"]
+                for message in self.iter_messages(
+                    user_id=user_id,
+                    select=["id"],
+                    filter=message_filter,
+                    page_size=min(max_messages, MAX_PAGE_SIZE),
+                    max_items=max_messages,
+                )
+            ]
+
+        taken: set[str] = set()
+
+        def claim_path(name: str) -> str:
+            stem, extension = os.path.splitext(name)
+            candidate, counter = name, 1
+            while candidate in taken or os.path.exists(os.path.join(dest_dir, candidate)):
+                candidate = f"{stem} ({counter}){extension}"
+                counter += 1
+            taken.add(candidate)
+            return os.path.join(dest_dir, candidate)
+
+        jobs = []
+        for message_id in message_ids:
+            for attachment in self.iter_attachments(
+                message_id, user_id=user_id, select=ATTACHMENT_METADATA_SELECT
+            ):
+                name = attachment.get("name") or ""
+                if name_pattern and not fnmatch.fnmatch(name.lower(), name_pattern.lower()):
+                    continue
+                if content_type and not (attachment.get("contentType") or "").startswith(content_type):
+                    continue
+                path = claim_path(self._safe_filename(name, attachment["id"]))
+                jobs.append((message_id, attachment["id"], path))
+
+        def download(job: tuple[str, str, str]) -> dict[str, Any]:
+            message_id, attachment_id, path = job
+            url = f"{self.base_url}/users/{user_id}/messages/{message_id}/attachments/{attachment_id}/$value"
+            size, _ = self._stream_value(url, path)
+            return {"message_id": message_id, "attachment_id": attachment_id, "path": path, "size": size}
+
+        downloaded, errors = [], []
+        with ContextThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = [(job, executor.submit(download, job)) for job in jobs]
+            for job, future in futures:
+                try:
+                    downloaded.append(future.result())
+                except (httpx.HTTPError, OSError) as e:
+                    errors.append({"message_id": job[0], "attachment_id": job[1], "error": str(e)})
+        return {"downloaded": downloaded, "errors": errors}
+
+    @staticmethod
+    def _export_key(user_id: str, dest: str, format: str, url: str, params: dict[str, Any]) -> str:
+        job = json.dumps([os.path.abspath(dest), format, url, params], sort_keys=True, default=str)
+        return f"outlook:export:{user_id.lower()}:{hashlib.sha256(job.encode()).hexdigest()[:16]}"
+
+    @staticmethod
+    def _eml_name(message_id: str) -> str:
+        # Graph ids are base64; the URL-safe alphabet keeps them valid, reversible file names.
+        return message_id.translate(str.maketrans("/+", "_-")) + ".eml"
+
+    def export_messages(
+        self,
+        dest: str,
+        format: str = "jsonl",
+        folder_id: Optional[str] = None,
+        filter: Optional[str] = None,
+        where: Optional[List[dict[str, Any]]] = None,
+        received_after: Optional[str] = None,
+        received_before: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        max_messages: Optional[int] = None,
+        max_concurrency: int = EXPORT_CONCURRENCY,
+        max_messages_per_second: Optional[float] = None,
+        restart: bool = False,
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Exports a mail folder or query to a JSONL file or a directory of .eml files for backups and compliance, streaming messages through a bounded pipeline so memory stays flat for any mailbox size. Progress is checkpointed after every page: calling again with the same arguments resumes an interrupted or partial export and retries messages that failed, and a finished export returns immediately.
+
+        Args:
+            dest (string): JSONL file to write, or directory to save .eml files in; created if missing. Example: '/backups/inbox.jsonl'.
+            format (string): 'jsonl' writes each listed message as one JSON line; 'eml' saves each message's MIME content from /messages/{id}/$value as <id>.eml. Defaults to 'jsonl'.
+            folder_id (string, optional): Mail folder id or well-known name such as 'inbox'. Omit to export the whole mailbox.
+            filter (string, optional): OData filter selecting the messages. Example: 'hasAttachments eq true'.
+            where (array, optional): Typed conditions combined with 'and', each {'field': property, 'op': operator, 'value': value}. Example: [{'field': 'from', 'op': 'eq', 'value': 'meganb@contoso.com'}].
+            received_after (string, optional): Only messages received at or after this ISO 8601 date or date-time. Example: '2024-01-01'.
+            received_before (string, optional): Only messages received before this ISO 8601 date or date-time.
+            select (array, optional): Properties written per message in 'jsonl' format. Omit for Graph's default set, which includes the body.
+            max_messages (integer, optional): Stop at the end of the page on which this call reaches this many messages and report complete=false; call again to continue. Omit to export everything.
+            max_concurrency (integer): MIME downloads run at once in 'eml' format; JSONL is written by a single writer. Defaults to 8.
+            max_messages_per_second (number, optional): Cap on messages exported per second, to leave Graph quota for other work.
+            restart (boolean): Discard saved progress and export from the first message again. Existing .eml files are kept and skipped. Defaults to false.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: 'path' and 'format'; this call's 'exported', 'skipped' (already on disk), 'missing' (deleted since listed), 'failed' and 'bytes' counts with a sample of 'errors'; 'total_exported' across calls; 'pending_retries', the failed messages the next call retries; and 'complete', which stays false while any remain.
+
+        Raises:
+            HTTPStatusError: Raised when listing messages fails; progress up to the last completed page is kept for the next call.
+            ValueError: Raised when format is unknown, the JSONL file changed since the last checkpoint, or the query is one Graph would reject.
+
+        Tags:
+            users.message, export, important
+        """
+        if format not in ("jsonl", "eml"):
+            raise ValueError(f"Unknown export format '{format}'. Expected 'jsonl' or 'eml'.")
+        if not dest:
+            raise ValueError("Missing required parameter 'dest'.")
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        eml = format == "eml"
+        url, query_params = self._message_list_request(
+            user_id, folder_id, ["id"] if eml else select, filter, None, None,
+            EXPORT_ID_PAGE_SIZE if eml else EXPORT_PAGE_SIZE, where, received_after, received_before,
+        )
+        key = self._export_key(user_id, dest, format, url, query_params)
+        # link: where listing resumes; listed: every page has been listed; failed: ids
+        # of messages that failed and are retried first by the next call.
+        state = (None if restart else self._load_sync_state(key)) or {
+            "link": None,
+            "offset": 0,
+            "total_exported": 0,
+            "listed": False,
+            "failed": [],
+            "complete": False,
+        }
+
+        def summary(stats: ExportStats) -> dict[str, Any]:
+            return {
+                "path": dest,
+                "format": format,
+                **stats.to_dict(),
+                "total_exported": state["total_exported"],
+                "pending_retries": len(state["failed"]),
+                "complete": state["complete"],
+            }
+
+        if state["complete"]:
+            return summary(ExportStats())
+        retry = [{"id": message_id} for message_id in state["failed"]]
+
+        def pages() -> Iterator[tuple[list[dict[str, Any]], Optional[str]]]:
+            # Failed messages go first, as a page that leaves the listing position as is.
+            if retry:
+                yield retry, None if state["listed"] else state["link"]
+            if state["listed"]:
+                return
+            resume_from = (state["link"], None) if state["link"] else (url, query_params)
+            for page in self._iter_pages(*resume_from, prefetch=True):
+                yield page.get("value", []), page.get("@odata.nextLink")
+
+        exported_before = state["total_exported"]
+        retry_pending = [bool(retry)]
+
+        def save(next_link: Optional[str], completed: int, failed: list[str], offset: int = 0) -> None:
+            if retry_pending[0]:
+                # The retry page replaces the earlier failures with those still failing.
+                state["failed"] = list(failed)
+                retry_pending[0] = False
+            else:
+                state["failed"] = state["failed"] + failed
+            state.update(
+                link=next_link,
+                offset=offset,
+                total_exported=exported_before + completed,
+                listed=next_link is None,
+                complete=next_link is None and not state["failed"],
+            )
+            self.sync_store.set(key, json.dumps(state))
+
+        if eml:
+            os.makedirs(dest, exist_ok=True)
+
+            def handle(item: dict[str, Any]) -> Optional[int]:
+                path = os.path.join(dest, self._eml_name(item["id"]))
+                if os.path.exists(path):
+                    return None
+                mime_url = f"{self.base_url}/users/{user_id}/messages/{item['id']}/$value"
+                try:
+                    return self._stream_value(mime_url, path)[0]
+                except httpx.HTTPStatusError as e:
+                    if e.response.status_code == 404:
+                        raise ItemGone(item["id"]) from e
+                    raise
+
+            pipeline = ExportPipeline(
+                handle,
+                save,
+                concurrency=max_concurrency,
+                queue_size=EXPORT_QUEUE_SIZE,
+                items_per_second=max_messages_per_second,
+                recoverable=(httpx.HTTPStatusError,),
+                item_id=lambda item: item["id"],
+            )
+            return summary(pipeline.run(pages(), max_messages))
+
+        directory = os.path.dirname(os.path.abspath(dest))
+        os.makedirs(directory, exist_ok=True)
+        if state["link"] and (not os.path.exists(dest) or os.path.getsize(dest) < state["offset"]):
+            raise ValueError(f"'{dest}' changed since the last checkpoint; pass restart=true to export again.")
+        with open(dest, "r+b" if state["link"] else "wb") as file:
+            # Lines past the checkpoint belong to a page that didn't finish; it is redone.
+            file.seek(state["offset"])
+            file.truncate()
+
+            def write(item: dict[str, Any]) -> int:
+                line = dumps(item) + b"\n"
+                file.write(line)
+                return len(line)
+
+            def checkpoint(next_link: Optional[str], completed: int, failed: list[str]) -> None:
+                file.flush()
+                os.fsync(file.fileno())
+                save(next_link, completed, failed, file.tell())
+
+            pipeline = ExportPipeline(
+                write,
+                checkpoint,
+                queue_size=EXPORT_QUEUE_SIZE,
+                items_per_second=max_messages_per_second,
+                item_id=lambda item: item.get("id"),
+            )
+            return summary(pipeline.run(pages(), max_messages))
+
+    def start_notifications(self) -> NotificationReceiver:
+        """
+        Starts the local change-notification receiver and the subscription renewer,
+        if they are not already running.
+        """
+        if self._receiver is None:
+            self._receiver = NotificationReceiver(
+                self.subscriptions.client_state,
+                self.notifications,
+                host=self.notification_host,
+                port=self.notification_port,
+            ).start()
+            self.subscriptions.start_auto_renew()
+        return self._receiver
+
+    def stop_notifications(self) -> None:
+        """
+        Stops the receiver and the renewer. Subscriptions are left to expire unless
+        removed with unsubscribe_from_mail.
+        """
+        self.subscriptions.stop_auto_renew()
+        if self._receiver is not None:
+            self._receiver.stop()
+            self._receiver = None
+
+    def subscribe_to_mail(
+        self,
+        folder_id: Optional[str] = None,
+        change_type: str = "created",
+        user_id: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Subscribes to change notifications for a mailbox or mail folder so new mail can be awaited with wait_for_new_mail instead of polling. The subscription is renewed automatically while the app runs.
+
+        Args:
+            folder_id (string, optional): Mail folder id or well-known name such as 'inbox'. If not provided, all messages in the mailbox are watched.
+            change_type (string): Comma-separated changes to report: 'created', 'updated' and/or 'deleted'. Example: 'created'.
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+
+        Returns:
+            dict[str, Any]: The subscription id, watched resource, change type and expiration time.
+
+        Raises:
+            HTTPStatusError: Raised when Graph rejects the subscription, e.g. because the notification URL failed validation.
+            ValueError: Raised when the app has no public HTTPS notification_url for Graph to call.
+
+        Tags:
+            subscriptions, notifications, important
+        """
+        if not change_type:
+            raise ValueError("Missing required parameter 'change_type'.")
+        # Graph only calls public HTTPS endpoints, never the receiver's local address.
+        if not self.notification_url or not self.notification_url.lower().startswith("https://"):
+            raise ValueError(
+                "Change notifications need notification_url set to a public HTTPS URL that "
+                "forwards to the local receiver (see notification_host and notification_port)."
+            )
+        if user_id is None:
+            user_id = self._resolve_user_id()
+        resource = f"users/{user_id}/mailFolders('{folder_id}')/messages" if folder_id else f"users/{user_id}/messages"
+        self.start_notifications()
+        try:
+            subscription = self.subscriptions.create(resource, self.notification_url, change_type)
+        except BaseException:
+            if not self.subscriptions.subscriptions:
+                self.stop_notifications()
+            raise
+        return {
+            "id": subscription["id"],
+            "resource": subscription.get("resource", resource),
+            "change_type": subscription.get("changeType", change_type),
+            "expiration": subscription.get("expirationDateTime"),
+        }
+
+    def unsubscribe_from_mail(self, subscription_id: str) -> dict[str, Any]:
+        """
+        Deletes a change-notification subscription created with subscribe_to_mail.
+
+        Args:
+            subscription_id (string): The subscription id.
+
+        Returns:
+            dict[str, Any]: The deleted subscription id.
+
+        Raises:
+            HTTPStatusError: Raised when Graph fails to delete the subscription.
+
+        Tags:
+            subscriptions, notifications
+        """
+        if not subscription_id:
+            raise ValueError("Missing required parameter 'subscription_id'.")
+        self.subscriptions.delete(subscription_id)
+        return {"deleted": subscription_id}
+
+    def wait_for_new_mail(self, timeout: float = 30.0, max_notifications: int = 50) -> dict[str, Any]:
+        """
+        Waits for change notifications from subscriptions created with subscribe_to_mail and returns them as soon as any arrive, or an empty list when the timeout elapses.
+
+        Args:
+            timeout (number): Seconds to wait for a notification. Example: '30'.
+            max_notifications (integer): Maximum notifications to return. Example: '50'.
+
+        Returns:
+            dict[str, Any]: 'value' with the notifications (subscription id, change type, resource and message id) and 'pending' with the number still queued.
+
+        Tags:
+            subscriptions, notifications, important
+        """
+        notifications = self.notifications.get(timeout, max_notifications)
+        return {"value": notifications, "pending": len(self.notifications)}
+
+    def get_from_url(self, url: str, profile: Optional[str] = None) -> dict[str, Any]:
+        """
+        Makes a GET request to a full @odata.nextLink or @odata.deltaLink URL.
+
+        Args:
+            url (string): The @odata.nextLink or @odata.deltaLink URL.
+            profile (string, optional): Compact message results using a field profile: 'summary', 'triage' or 'full'. Note that the properties returned are fixed by the original request.
+        """
+        if not url:
+            raise ValueError("Missing required parameter 'url'.")
+        if not url.startswith(self.base_url):
+            raise ValueError(
+                f"The provided URL '{url}' does not start with the expected base URL '{self.base_url}'."
+            )
+        relative_part = url[len(self.base_url):]
+        parsed_relative = urlparse(relative_part)
+        path_only = parsed_relative.path
+        params = {k: v[0] for k, v in parse_qs(parsed_relative.query).items()}
+        response = self._get(path_only, params=params)
+        return self._project(self._handle_response(response), profile or self.default_profile)
+
+    # ------------------------------------------------------------------
+    # Async variants
+    # ------------------------------------------------------------------
+
+    @property
+    def async_client(self) -> httpx.AsyncClient:
+        """
+        Long-lived pooled async HTTP client shared by all *_async tools. Connections are
+        kept alive between calls and HTTP/2 is negotiated when the h2 package is installed.
+        The client is bound to the event loop it is first used on.
+        """
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self._get_headers(),
+                timeout=self.default_timeout,
+                transport=AsyncThrottlingTransport(
+                    AsyncInstrumentedTransport(
+                        self._async_transport
+                        or httpx.AsyncHTTPTransport(
+                            http2=self.http2,
+                            limits=httpx.Limits(
+                                max_connections=self.max_connections,
+                                max_keepalive_connections=self.max_keepalive_connections,
+                            ),
+                        )
+                    ),
+                    self._limiter,
+                    self.throttling_stats,
+                ),
+            )
+        return self._async_client
+
+    async def aclose(self) -> None:
+        """
+        Closes the pooled async client, if one was created.
+        """
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    async def _aget(self, url: str, params: dict[str, Any] | None = None) -> httpx.Response:
+        logger.debug(f"Making async GET request to {url} with params: {params}")
+        response = await self.async_client.get(url, params=params)
+        logger.debug(f"Async GET request completed with status code: {response.status_code}")
+        return response
+
+    async def _apost(
+        self,
+        url: str,
+        data: Any,
+        params: dict[str, Any] | None = None,
+        content_type: str = "application/json",
+    ) -> httpx.Response:
+        logger.debug(f"Making async POST request to {url} with params: {params}, content_type={content_type}")
+        headers = {"Content-Type": content_type}
+        if content_type == "application/json":
+            response = await self.async_client.post(url, headers=headers, json=data, params=params)
+        else:
+            response = await self.async_client.post(url, headers=headers, content=data, params=params)
+        logger.debug(f"Async POST request completed with status code: {response.status_code}")
+        return response
+
+    async def _adelete(self, url: str, params: dict[str, Any] | None = None) -> httpx.Response:
+        logger.debug(f"Making async DELETE request to {url} with params: {params}")
+        response = await self.async_client.delete(url, params=params)
+        logger.debug(f"Async DELETE request completed with status code: {response.status_code}")
+        return response
+
+    async def _resolve_user_id_async(self) -> str:
+        """
+        Async counterpart of _resolve_user_id sharing the same cache; concurrent
+        coroutines on a cache miss await a single /me request.
+        """
+        fingerprint = self._credential_fingerprint()
+        user_id = self._cached_user_id(fingerprint)
+        if user_id:
+            return user_id
+        if self._user_id_async_lock is None:
+            self._user_id_async_lock = asyncio.Lock()
+        async with self._user_id_async_lock:
+            user_id = self._cached_user_id(fingerprint)
+            if user_id:
+                return user_id
+            return self._store_user_id(fingerprint, await self.get_user_id_async())
+
+    async def users_message_reply_async(
+        self,
+        message_id: str,
+        user_id: Optional[str] = None,
+        comment: Optional[str] = None,
+        message: Optional[dict[str, Any]] = None,
+    ) -> Any:
+        """
+        Async counterpart of users_message_reply: replies to a specific message for a user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            message_id (string): message-id
+            comment (string): A comment to include in the reply. Example: 'Thank you for your email. Here is my reply.'.
+            message (object): A message object to specify additional properties for the reply, such as attachments.
+
+        Returns:
+            Any: Success
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        request_body_data = {
+            k: v for k, v in {"comment": comment, "message": message}.items() if v is not None
+        }
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}/reply"
+        response = await self._apost(url, data=request_body_data, params={})
+        result = self._handle_response(response)
+        self._emit_message_event("replied", user_id, [message_id])
+        return result
+
+    async def user_send_mail_async(
+        self,
+        message: dict[str, Any],
+        user_id: Optional[str] = None,
+        saveToSentItems: Optional[bool] = None,
+    ) -> Any:
+        """
+        Async counterpart of user_send_mail: sends an email on behalf of the specified user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            message (object): message
+            saveToSentItems (boolean): saveToSentItems Example: 'False'.
+
+        Returns:
+            Any: Success
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.user.Actions, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        request_body_data = {
+            k: v
+            for k, v in {"message": message, "saveToSentItems": saveToSentItems}.items()
+            if v is not None
+        }
+        url = f"{self.base_url}/users/{user_id}/sendMail"
+        response = await self._apost(url, data=request_body_data, params={})
+        result = self._handle_response(response)
+        self._emit_message_event("sent", user_id, [])
+        return result
+
+    async def user_get_mail_folder_async(
+        self,
+        mailFolder_id: str,
+        user_id: Optional[str] = None,
+        includeHiddenFolders: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None,
+    ) -> Any:
+        """
+        Async counterpart of user_get_mail_folder: retrieves a specific mail folder for a user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            mailFolder_id (string): mailFolder-id
+            includeHiddenFolders (string): Include Hidden Folders
+            select (array): Select properties to be returned
+            expand (array): Expand related entities
+
+        Returns:
+            Any: Retrieved navigation property
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.mailFolder, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        if mailFolder_id is None:
+            raise ValueError("Missing required parameter 'mailFolder-id'.")
+        url = f"{self.base_url}/users/{user_id}/mailFolders/{mailFolder_id}"
+        query_params = build_query("mailFolder", select=select, expand=expand)
+        if includeHiddenFolders is not None:
+            query_params["includeHiddenFolders"] = includeHiddenFolders
+        return await self._cached_get_async(user_id, url, query_params)
+
+    async def user_list_message_async(
+        self,
+        user_id: Optional[str] = None,
+        select: list[str] = ["bodyPreview"],
+        includeHiddenMessages: Optional[bool] = None,
+        top: Optional[int] = None,
+        skip: Optional[int] = None,
+        search: Optional[str] = None,
+        filter: Optional[str] = None,
+        count: Optional[bool] = None,
+        orderby: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        where: Optional[List[dict[str, Any]]] = None,
+        received_after: Optional[str] = None,
+        received_before: Optional[str] = None,
+    ) -> dict[str, Any]:
+        """
+        Async counterpart of user_list_message: retrieves a list of messages for a user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            select (list): Select properties to be returned. Defaults to ['bodyPreview'].
+            includeHiddenMessages (boolean): Include Hidden Messages
+            top (integer): Specify the number of items to be included in the result Example: '50'.
+            skip (integer): Specify the number of items to skip in the result Example: '10'.
+            search (string): Search items by search phrases
+            filter (string): Filter items by property values
+            count (boolean): Include count of items
+            orderby (array): Order items by property values
+            expand (array): Expand related entities
+            profile (string, optional): Compact the response using a field profile: 'summary', 'triage' or 'full'. Requests the profile's properties (plus any in select), strips OData annotations, flattens recipients to 'Name <address>' and converts HTML bodies to truncated plain text. Omit for the raw Graph response.
+            where (array, optional): Typed conditions combined with 'and' and checked before the request is sent, each {'field': property, 'op': operator, 'value': value}. Operators are eq, ne, gt, ge, lt, le and startswith, depending on the property; categories and recipient lists match any member. Example: [{'field': 'isRead', 'op': 'eq', 'value': false}, {'field': 'from', 'op': 'eq', 'value': 'meganb@contoso.com'}].
+            received_after (string, optional): Only messages received at or after this ISO 8601 date or date-time. Example: '2024-05-01'.
+            received_before (string, optional): Only messages received before this ISO 8601 date or date-time. Example: '2024-06-01T12:00:00Z'.
+
+        Returns:
+            dict[str, Any]: Retrieved collection
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+            ValueError: Raised before any request when the query is one Graph would reject, such as search combined with orderby or skip, an unknown property or an unsupported operator.
+
+        Tags:
+            users.message, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        url = f"{self.base_url}/users/{user_id}/messages"
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
+        query_params = build_query(
+            select=select, expand=expand, where=where, filter=filter, search=search, orderby=orderby,
+            top=top, skip=skip, count=count, received_after=received_after, received_before=received_before,
+        )
+        if includeHiddenMessages is not None:
+            query_params["includeHiddenMessages"] = includeHiddenMessages
+        response = await self._aget(url, params=query_params)
+        return self._project(self._handle_response(response), profile)
+
+    async def user_get_message_async(
+        self,
+        message_id: str,
+        user_id: Optional[str] = None,
+        includeHiddenMessages: Optional[str] = None,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+    ) -> Any:
+        """
+        Async counterpart of user_get_message: retrieves a specific message for a user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            message_id (string): message-id
+            includeHiddenMessages (string): Include Hidden Messages
+            select (array): Select properties to be returned
+            expand (array): Expand related entities
+            profile (string, optional): Compact the response using a field profile: 'summary', 'triage' or 'full'. Requests the profile's properties (plus any in select), strips OData annotations, flattens recipients to 'Name <address>' and converts HTML bodies to truncated plain text. Omit for the raw Graph response.
+
+        Returns:
+            Any: Retrieved navigation property
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}"
+        profile = profile or self.default_profile
+        if profile:
+            select = profile_select(profile, select)
+        query_params = build_query(select=select, expand=expand)
+        if includeHiddenMessages is not None:
+            query_params["includeHiddenMessages"] = includeHiddenMessages
+        return self._project(await self._cached_get_async(user_id, url, query_params), profile)
+
+    async def user_delete_message_async(self, message_id: str, user_id: Optional[str] = None) -> Any:
+        """
+        Async counterpart of user_delete_message: deletes a specific message for a given user.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            message_id (string): message-id
+
+        Returns:
+            Any: Success
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}"
+        response = await self._adelete(url, params={})
+        result = self._handle_response(response)
+        self._emit_message_event("deleted", user_id, [message_id])
+        return result
+
+    async def user_message_list_attachment_async(
+        self,
+        message_id: str,
+        user_id: Optional[str] = None,
+        top: Optional[int] = None,
+        skip: Optional[int] = None,
+        search: Optional[str] = None,
+        filter: Optional[str] = None,
+        count: Optional[bool] = None,
+        orderby: Optional[List[str]] = None,
+        select: Optional[List[str]] = None,
+        expand: Optional[List[str]] = None,
+        metadata_only: bool = True,
+    ) -> dict[str, Any]:
+        """
+        Async counterpart of user_message_list_attachment: retrieves attachments of a user's message.
+
+        Args:
+            user_id (string, optional): user-id. If not provided, will automatically get the current user's ID.
+            message_id (string): message-id
+            top (integer): Show only the first n items Example: '50'.
+            skip (integer): Skip the first n items
+            search (string): Search items by search phrases
+            filter (string): Filter items by property values
+            count (boolean): Include count of items
+            orderby (array): Order items by property values
+            select (array): Select properties to be returned
+            expand (array): Expand related entities
+            metadata_only (boolean): When no select is given, return only id, name, size, contentType, isInline and lastModifiedDateTime instead of the base64 file contents. Use download_attachment to fetch contents. Defaults to true.
+
+        Returns:
+            dict[str, Any]: Retrieved collection
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            users.message, async
+        """
+        if user_id is None:
+            user_id = await self._resolve_user_id_async()
+        if message_id is None:
+            raise ValueError("Missing required parameter 'message-id'.")
+        url = f"{self.base_url}/users/{user_id}/messages/{message_id}/attachments"
+        if select is None and metadata_only:
+            select = ATTACHMENT_METADATA_SELECT
+        query_params = build_query(
+            "attachment", select=select, expand=expand, filter=filter, search=search, orderby=orderby,
+            top=top, skip=skip, count=count,
+        )
+        response = await self._aget(url, params=query_params)
+        return self._handle_response(response)
+
+    async def get_user_id_async(self) -> dict[str, Any]:
+        """
+        Async counterpart of get_user_id: retrieves the current user.
+
+        Returns:
+            dict[str, Any]: Current user information
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            me, async
+        """
+        url = f"{self.base_url}/me"
+        response = await self._aget(url, params={"$select": "userPrincipalName"})
+        return self._handle_response(response)
+
+    async def get_from_url_async(self, url: str, profile: Optional[str] = None) -> dict[str, Any]:
+        """
+        Async counterpart of get_from_url: makes a GET request to a full @odata.nextLink or @odata.deltaLink URL.
+
+        Args:
+            url (string): The @odata.nextLink or @odata.deltaLink URL.
+            profile (string, optional): Compact message results using a field profile: 'summary', 'triage' or 'full'.
+
+        Returns:
+            dict[str, Any]: Retrieved collection page
+
+        Raises:
+            HTTPStatusError: Raised when the API request fails with detailed error information including status code and response body.
+
+        Tags:
+            async
+        """
+        if not url:
+            raise ValueError("Missing required parameter 'url'.")
+        if not url.startswith(self.base_url):
+            raise ValueError(
+                f"The provided URL '{url}' does not start with the expected base URL '{self.base_url}'."
+            )
+        response = await self._aget(url)
+        return self._project(self._handle_response(response), profile or self.default_profile)
+
+    async def list_messages_across_async(
+        self,
+        user_ids: List[str],
+        filter: Optional[str] = None,
+        top: int = 25,
+        select: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """
+        Async counterpart of list_messages_across: lists the newest messages across many mailboxes concurrently and merges them by received time.
+
+        Args:
+            user_ids (array): User ids or userPrincipalNames of the mailboxes to query. Example: ['support@contoso.com', 'sales@contoso.com'].
+            filter (string, optional): OData filter applied in every mailbox. Example: 'isRead eq false'.
+            top (integer): Maximum messages per mailbox and in the merged result. Example: '25'.
+            select (array, optional): Select properties to be returned for every message.
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'.
+            max_concurrency (integer): Maximum mailboxes queried at once. Example: '16'.
+
+        Returns:
+            dict[str, Any]: 'value' with messages from all mailboxes, newest first, each tagged with its 'mailbox', and 'errors' keyed by mailbox.
+
+        Raises:
+            ValueError: Raised when no mailboxes are given.
+
+        Tags:
+            users.message, mailboxes, async
+        """
+        select, profile = self._fanout_select(select, profile)
+        results = [
+            result
+            async for result in self.aiter_mailboxes(
+                user_ids, filter=filter, select=select, top=top, max_concurrency=max_concurrency
+            )
+        ]
+        merged = self._merge_mailboxes(results, top)
+        return {**self._project({"value": merged["value"]}, profile), "errors": merged["errors"]}
+
+    async def search_across_async(
+        self,
+        user_ids: List[str],
+        query: str,
+        top: int = 25,
+        select: Optional[List[str]] = None,
+        profile: Optional[str] = None,
+        max_concurrency: int = FANOUT_CONCURRENCY,
+    ) -> dict[str, Any]:
+        """
+        Async counterpart of search_across: searches many mailboxes concurrently and merges the hits by received time.
+
+        Args:
+            user_ids (array): User ids or userPrincipalNames of the mailboxes to search. Example: ['support@contoso.com', 'sales@contoso.com'].
+            query (string): Search text, matched against subject, body and addresses. Example: 'invoice overdue'.
+            top (integer): Maximum hits per mailbox and in the merged result. Example: '25'.
+            select (array, optional): Select properties to be returned for every message.
+            profile (string, optional): Compact the messages using a field profile: 'summary', 'triage' or 'full'.
+            max_concurrency (integer): Maximum mailboxes searched at once. Example: '16'.
+
+        Returns:
+            dict[str, Any]: 'value' with hits from all mailboxes, newest first, each tagged with its 'mailbox', and 'errors' keyed by mailbox.
+
+        Raises:
+            ValueError: Raised when no mailboxes or no query are given.
+
+        Tags:
+            users.message, mailboxes, search, async
+        """
+        search = search_phrase(query)
+        select, profile = self._fanout_select(select, profile)
+        results = [
+            result
+            async for result in self.aiter_mailboxes(
+                user_ids, search=search, select=select, top=top, max_concurrency=max_concurrency
+            )
+        ]
+        merged = self._merge_mailboxes(results, top)
+        return {**self._project({"value": merged["value"]}, profile), "errors": merged["errors"]}
+
+    async def wait_for_new_mail_async(self, timeout: float = 30.0, max_notifications: int = 50) -> dict[str, Any]:
+        """
+        Async counterpart of wait_for_new_mail: waits for change notifications without occupying a thread.
+
+        Args:
+            timeout (number): Seconds to wait for a notification. Example: '30'.
+            max_notifications (integer): Maximum notifications to return. Example: '50'.
+
+        Returns:
+            dict[str, Any]: 'value' with the notifications (subscription id, change type, resource and message id) and 'pending' with the number still queued.
+
+        Tags:
+            subscriptions, notifications, important
+        """
+        notifications = await self.notifications.get_async(timeout, max_notifications)
+        return {"value": notifications, "pending": len(self.notifications)}
+
+    def _async_tool(self, name: str, tool: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps a tool as a coroutine that awaits its async counterpart (or, when there is
+        none, runs the sync tool in a worker thread). The wrapper keeps the sync tool's
+        name, signature, docstring and tags, so switching to async tools does not change
+        what agents see; counterparts take the same arguments.
+        """
+        counterpart = getattr(self, f"{name}_async", None)
+        if counterpart is not None:
+
+            @functools.wraps(tool)
+            async def async_tool(*args: Any, **kwargs: Any) -> Any:
+                return await counterpart(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(tool)
+            async def async_tool(*args: Any, **kwargs: Any) -> Any:
+                return await asyncio.to_thread(tool, *args, **kwargs)
+
+        return async_tool
+
+    def _tracked_tool(self, tool: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wraps a tool so each call is recorded by the instrumentation layer.
+        """
+        name = tool.__name__
+        if inspect.iscoroutinefunction(tool):
+
+            @functools.wraps(tool)
+            async def tracked(*args: Any, **kwargs: Any) -> Any:
+                with self.instrumentation.track(name):
+                    return await tool(*args, **kwargs)
+
+        else:
+
+            @functools.wraps(tool)
+            def tracked(*args: Any, **kwargs: Any) -> Any:
+                with self.instrumentation.track(name):
+                    return tool(*args, **kwargs)
+
+        return tracked
+
     def list_tools(self):
-        return [
+        tools = [
             self.users_message_reply,
             self.user_send_mail,
             self.user_get_mail_folder,
@@ -423,4 +3337,30 @@ class OutlookApp(APIApplication):
             self.user_message_list_attachment,
             self.get_user_id,
             self.get_from_url,
+            self.list_messages_page,
+            self.batch_get_messages,
+            self.batch_delete_messages,
+            self.batch_move_messages,
+            self.batch_list_attachments,
+            self.bulk_update_messages,
+            self.bulk_move_messages,
+            self.bulk_delete_messages,
+            self.list_messages_across,
+            self.search_across,
+            self.get_conversation,
+            self.sync_mail_folder,
+            self.index_mail_folder,
+            self.search_local_messages,
+            self.user_send_mail_with_attachments,
+            self.users_message_reply_with_attachments,
+            self.download_attachment,
+            self.download_attachments,
+            self.export_messages,
+            self.subscribe_to_mail,
+            self.unsubscribe_from_mail,
+            self.wait_for_new_mail,
+            self.get_performance_stats,
         ]
+        if self.async_tools:
+            tools = [self._async_tool(tool.__name__, tool) for tool in tools]
+        return [self._tracked_tool(tool) for tool in tools]
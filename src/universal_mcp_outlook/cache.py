@@ -0,0 +1,164 @@
+"""
+Bounded LRU cache for Graph reads, revalidated with ETags.
+
+Entries are keyed by user, resource path and normalised query options. The cache is
+bounded both by entry count and by the total size of the cached response bodies.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, Optional
+
+READ_CACHE_MAX_ENTRIES = 512
+READ_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+# Query options whose values are comma-separated property lists, so order is irrelevant.
+LIST_OPTIONS = frozenset({"$select", "$expand"})
+
+
+@dataclass
+class CacheEntry:
+    etag: Optional[str]
+    payload: Any
+    size: int
+    stored_at: float
+
+
+def _normalise(name: str, value: Any) -> Any:
+    if isinstance(value, (list, tuple)):
+        value = ",".join(str(v) for v in value)
+    if name in LIST_OPTIONS and isinstance(value, str):
+        return ",".join(sorted({part.strip() for part in value.split(",") if part.strip()}))
+    return str(value)
+
+
+def cache_key(user_id: str, path: str, params: Optional[dict[str, Any]] = None) -> tuple:
+    """
+    Builds a key for a read so that equivalent $select/$expand orderings coincide.
+    """
+    options = tuple(sorted((k, _normalise(k, v)) for k, v in (params or {}).items() if v is not None))
+    return (user_id.lower(), path.rstrip("/"), options)
+
+
+class ReadCache:
+    """
+    Thread-safe LRU of Graph read responses.
+
+    Args:
+        max_entries: Maximum number of cached responses; 0 disables caching.
+        max_bytes: Maximum total size of cached response bodies.
+        fresh_seconds: Entries younger than this are served without contacting Graph;
+            older ones are revalidated with If-None-Match.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = READ_CACHE_MAX_ENTRIES,
+        max_bytes: int = READ_CACHE_MAX_BYTES,
+        fresh_seconds: float = 0.0,
+    ) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.fresh_seconds = fresh_seconds
+        self._entries: OrderedDict[Hashable, CacheEntry] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: Hashable) -> Optional[CacheEntry]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        return time.monotonic() - entry.stored_at < self.fresh_seconds
+
+    def record(self, outcome: str) -> None:
+        """
+        Counts a lookup outcome: 'hit' (served without a request), 'revalidated'
+        (served after a 304) or 'miss'.
+        """
+        with self._lock:
+            if outcome == "hit":
+                self.hits += 1
+            elif outcome == "revalidated":
+                self.revalidated += 1
+            else:
+                self.misses += 1
+
+    def touch(self, key: Hashable) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.stored_at = time.monotonic()
+
+    def put(self, key: Hashable, etag: Optional[str], payload: Any, size: int) -> None:
+        if not self.enabled or size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous.size
+            self._entries[key] = CacheEntry(etag, payload, size, time.monotonic())
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.size
+                self.evictions += 1
+
+    def invalidate(self, user_id: str, path_suffix: str) -> int:
+        """
+        Drops every cached read of a resource (any query options) for a user, including
+        reads of its sub-resources. Returns the number of entries removed.
+        """
+        user = user_id.lower()
+        suffix = path_suffix.rstrip("/")
+        with self._lock:
+            doomed = [
+                key
+                for key in self._entries
+                if key[0] == user and (key[1].endswith(suffix) or f"{suffix}/" in key[1])
+            ]
+            for key in doomed:
+                self._bytes -= self._entries.pop(key).size
+            self.invalidations += len(doomed)
+            return len(doomed)
+
+    def handle_event(self, event: str, user_id: str, message_ids: list[str]) -> None:
+        """
+        Message hook: any change made through the app to a message evicts its reads.
+        """
+        if event in ("deleted", "moved", "replied", "updated"):
+            for message_id in message_ids:
+                self.invalidate(user_id, f"/messages/{message_id}")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.revalidated + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "revalidated": self.revalidated,
+                "misses": self.misses,
+                "hit_ratio": round((self.hits + self.revalidated) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
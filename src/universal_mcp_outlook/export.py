@@ -0,0 +1,211 @@
+"""
+Bounded producer/consumer pipeline behind export_messages.
+
+The producer walks collection pages and feeds their items through a bounded queue to
+worker threads, so memory holds at most a couple of pages plus the queue however large
+the export. Pages complete out of order when workers run concurrently; the pipeline
+tracks the lowest page whose items are all handled and checkpoints the link to the
+page after it, together with the items of that page that failed so the caller can
+retry them. A job that stops for any reason resumes from that link and redoes at most
+the pages that were in flight, which handlers make idempotent.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterator, Optional
+
+from universal_mcp_outlook.instrumentation import ContextThreadPoolExecutor
+from universal_mcp_outlook.throttling import TokenBucket
+
+EXPORT_ERROR_SAMPLE = 20
+
+_DONE = object()
+
+
+class ItemGone(Exception):
+    """
+    Raised by a handler when its item no longer exists, e.g. a message deleted after it
+    was listed. The item is counted as missing rather than failed and is not retried.
+    """
+
+
+@dataclass
+class ExportStats:
+    exported: int = 0
+    skipped: int = 0
+    missing: int = 0
+    failed: int = 0
+    bytes: int = 0
+    errors: list[dict[str, Any]] = field(default_factory=list)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "exported": self.exported,
+            "skipped": self.skipped,
+            "missing": self.missing,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "errors": self.errors,
+        }
+
+
+class ExportPipeline:
+    """
+    Runs handle(item) for every item of a paged collection on concurrency workers.
+
+    Args:
+        handle: Exports one item and returns the bytes written, or None when the item
+            was already exported by an earlier run. Raises ItemGone for an item that
+            no longer exists.
+        checkpoint: Called as checkpoint(next_link, completed, failed) each time every
+            item up to the end of a page is handled, in page order; next_link is None
+            after the last page, completed counts the items of finished pages that were
+            exported or skipped, and failed lists the ids of that page's items that
+            failed with a recoverable error. Runs on the thread that completed the
+            page, under the pipeline lock, so handlers are paused while it records
+            progress.
+        concurrency: Worker threads.
+        queue_size: Items buffered between the producer and the workers.
+        items_per_second: Optional throughput limit across all workers.
+        recoverable: Exceptions from handle that fail only that item; anything else
+            stops the pipeline after the in-flight items finish and is re-raised.
+            When fetching pages fails instead, the items already queued are still
+            handled before the error is re-raised.
+        item_id: Names an item in error reports and in failed.
+    """
+
+    def __init__(
+        self,
+        handle: Callable[[Any], Optional[int]],
+        checkpoint: Callable[[Optional[str], int, list[Any]], None],
+        concurrency: int = 1,
+        queue_size: int = 100,
+        items_per_second: Optional[float] = None,
+        recoverable: tuple[type[BaseException], ...] = (),
+        item_id: Callable[[Any], Any] = lambda item: item,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}.")
+        if items_per_second is not None and items_per_second <= 0:
+            raise ValueError(f"items_per_second must be positive, got {items_per_second}.")
+        self.handle = handle
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.recoverable = recoverable
+        self.item_id = item_id
+        self.stats = ExportStats()
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, queue_size))
+        self._bucket = None
+        if items_per_second is not None:
+            burst = max(1, int(items_per_second))
+            self._bucket = TokenBucket(burst, burst / items_per_second)
+        self._lock = threading.Lock()
+        # page number -> [items not yet handled, link to the next page, fully enqueued,
+        # items exported or skipped, ids of failed items]
+        self._pages: dict[int, list[Any]] = {}
+        self._watermark = 0
+        self.completed = 0
+        # Set when a handler fails fatally; workers then drop the items still queued.
+        self._fatal = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def _advance(self) -> None:
+        while self._watermark in self._pages:
+            remaining, next_link, enqueued, succeeded, failed = self._pages[self._watermark]
+            if remaining or not enqueued:
+                return
+            del self._pages[self._watermark]
+            self._watermark += 1
+            self.completed += succeeded
+            self.checkpoint(next_link, self.completed, failed)
+
+    def _finish(self, page: int, written: Optional[int], error: Optional[BaseException], item: Any) -> None:
+        with self._lock:
+            if isinstance(error, ItemGone):
+                self.stats.missing += 1
+            elif error is not None:
+                self.stats.failed += 1
+                self._pages[page][4].append(self.item_id(item))
+                if len(self.stats.errors) < EXPORT_ERROR_SAMPLE:
+                    self.stats.errors.append({"id": self.item_id(item), "error": str(error)})
+            elif written is None:
+                self.stats.skipped += 1
+                self._pages[page][3] += 1
+            else:
+                self.stats.exported += 1
+                self.stats.bytes += written
+                self._pages[page][3] += 1
+            self._pages[page][0] -= 1
+            self._advance()
+
+    def _worker(self) -> None:
+        while True:
+            entry = self._queue.get()
+            if entry is _DONE:
+                return
+            if self._fatal.is_set():
+                continue
+            page, item = entry
+            if self._bucket is not None:
+                wait = self._bucket.reserve()
+                if wait:
+                    time.sleep(wait)
+            try:
+                try:
+                    written = self.handle(item)
+                except (ItemGone, *self.recoverable) as e:
+                    self._finish(page, None, e, item)
+                else:
+                    self._finish(page, written, None, item)
+            except BaseException as e:
+                # A handler or checkpoint failure stops the pipeline.
+                with self._lock:
+                    self._error = self._error or e
+                self._fatal.set()
+
+    def _put(self, entry: Any) -> bool:
+        # Blocks while the queue is full, giving up once a worker has failed.
+        while not self._fatal.is_set():
+            try:
+                self._queue.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def run(self, pages: Iterator[tuple[list[Any], Optional[str]]], max_items: Optional[int] = None) -> ExportStats:
+        """
+        Exports the items of pages, each given as (items, link to the next page), until
+        they run out or the page that brings the count to max_items is finished. Whole
+        pages keep every run's progress on a checkpoint, however small max_items is.
+        Returns the run's statistics.
+        """
+        queued = 0
+        with ContextThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            workers = [executor.submit(self._worker) for _ in range(self.concurrency)]
+            try:
+                for number, (items, next_link) in enumerate(pages):
+                    with self._lock:
+                        self._pages[number] = [len(items), next_link, False, 0, []]
+                    for item in items:
+                        if not self._put((number, item)):
+                            break
+                        queued += 1
+                    if self._fatal.is_set():
+                        break
+                    with self._lock:
+                        self._pages[number][2] = True
+                        self._advance()
+                    if max_items is not None and queued >= max_items:
+                        break
+            finally:
+                # Workers finish the items already queued, unless a handler failed fatally.
+                for _ in workers:
+                    self._queue.put(_DONE)
+                for worker in workers:
+                    worker.result()
+        if self._error is not None:
+            raise self._error
+        return self.stats
@@ -0,0 +1,298 @@
+"""
+Local SQLite index of message metadata for offline search.
+
+Messages are stored with their subject, sender, recipients and bodyPreview in a regular
+table, next to the delta link each indexed folder was last synced to. Text search goes through an external-content FTS5 table keyed by the messages
+rowid and kept in step by triggers, or falls back to LIKE matching on SQLite builds
+without FTS5. The index is bounded by message age and/or count.
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Optional
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    folder_id TEXT,
+    conversation_id TEXT,
+    subject TEXT,
+    sender TEXT,
+    recipients TEXT,
+    body_preview TEXT,
+    received TEXT,
+    is_read INTEGER,
+    indexed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_received ON messages (received);
+CREATE INDEX IF NOT EXISTS messages_user_folder ON messages (user_id, folder_id);
+CREATE TABLE IF NOT EXISTS cursors (
+    user_id TEXT NOT NULL,
+    folder_id TEXT NOT NULL,
+    state TEXT NOT NULL,
+    PRIMARY KEY (user_id, folder_id)
+);
+"""
+
+# Upserts keep a message's rowid, so its FTS row can be replaced by rowid rather than
+# found by a scan. Read-state changes don't touch the text columns and skip the FTS table.
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    subject, sender, recipients, body_preview, content='messages', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, subject, sender, recipients, body_preview)
+    VALUES (new.rowid, new.subject, new.sender, new.recipients, new.body_preview);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, recipients, body_preview)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.recipients, old.body_preview);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update
+AFTER UPDATE OF subject, sender, recipients, body_preview ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, subject, sender, recipients, body_preview)
+    VALUES ('delete', old.rowid, old.subject, old.sender, old.recipients, old.body_preview);
+    INSERT INTO messages_fts (rowid, subject, sender, recipients, body_preview)
+    VALUES (new.rowid, new.subject, new.sender, new.recipients, new.body_preview);
+END;
+"""
+
+UPSERT = """
+INSERT INTO messages VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+    user_id = excluded.user_id,
+    folder_id = excluded.folder_id,
+    conversation_id = excluded.conversation_id,
+    subject = excluded.subject,
+    sender = excluded.sender,
+    recipients = excluded.recipients,
+    body_preview = excluded.body_preview,
+    received = excluded.received,
+    is_read = excluded.is_read,
+    indexed_at = excluded.indexed_at
+"""
+
+RESULT_COLUMNS = (
+    "id",
+    "user_id",
+    "folder_id",
+    "conversation_id",
+    "subject",
+    "sender",
+    "recipients",
+    "body_preview",
+    "received",
+    "is_read",
+)
+
+
+def _address(recipient: Optional[dict[str, Any]]) -> str:
+    email = (recipient or {}).get("emailAddress") or {}
+    name, address = email.get("name"), email.get("address")
+    if name and address and name != address:
+        return f"{name} <{address}>"
+    return address or name or ""
+
+
+def _fts_query(query: str) -> str:
+    # Quote every term so user input can't be parsed as FTS5 syntax; terms are ANDed.
+    return " ".join('"' + term.replace('"', '""') + '"' for term in query.split())
+
+
+class MessageIndex:
+    """
+    Thread-safe SQLite message index.
+
+    Args:
+        path: Database file, or ':memory:' for a per-process index.
+        max_age_days: Drop messages received longer ago than this.
+        max_messages: Keep at most this many messages, dropping the oldest first.
+    """
+
+    def __init__(
+        self,
+        path: str = ":memory:",
+        max_age_days: Optional[float] = None,
+        max_messages: Optional[int] = None,
+    ) -> None:
+        self.path = path
+        self.max_age_days = max_age_days
+        self.max_messages = max_messages
+        # Folders changed by tools since they were last indexed, keyed by user.
+        self.stale_folders: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript(SCHEMA)
+            try:
+                self._create_fts()
+                self.fts = True
+            except sqlite3.OperationalError:
+                self.fts = False
+
+    def _create_fts(self) -> None:
+        row = self._conn.execute("SELECT sql FROM sqlite_master WHERE name = 'messages_fts'").fetchone()
+        # Indexes written before the FTS table referenced messages kept their own id column.
+        outdated = row is not None and "content=" not in row[0]
+        if outdated:
+            self._conn.execute("DROP TABLE messages_fts")
+        self._conn.executescript(FTS_SCHEMA)
+        if outdated:
+            self._conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+
+    def upsert(self, messages: Iterable[dict[str, Any]], user_id: str, folder_id: Optional[str] = None) -> int:
+        """
+        Adds or replaces messages as returned by Graph. Returns the number written.
+        """
+        rows = [
+            (
+                message["id"],
+                user_id.lower(),
+                folder_id or message.get("parentFolderId"),
+                message.get("conversationId"),
+                message.get("subject"),
+                _address(message.get("from") or message.get("sender")),
+                ", ".join(
+                    _address(r)
+                    for r in (message.get("toRecipients") or []) + (message.get("ccRecipients") or [])
+                ),
+                message.get("bodyPreview"),
+                message.get("receivedDateTime"),
+                None if message.get("isRead") is None else int(message["isRead"]),
+                time.time(),
+            )
+            for message in messages
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(UPSERT, rows)
+        return len(rows)
+
+    def remove(self, message_ids: Iterable[str]) -> int:
+        params = [(message_id,) for message_id in message_ids]
+        if not params:
+            return 0
+        with self._lock, self._conn:
+            removed = self._conn.executemany("DELETE FROM messages WHERE id = ?", params).rowcount
+        return removed
+
+    def evict(self) -> int:
+        """
+        Applies the age and size bounds. Returns the number of messages dropped.
+        """
+        doomed: list[str] = []
+        with self._lock:
+            if self.max_age_days is not None:
+                cutoff = datetime.now(timezone.utc) - timedelta(days=self.max_age_days)
+                doomed += [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT id FROM messages WHERE received < ?",
+                        (cutoff.strftime("%Y-%m-%dT%H:%M:%SZ"),),
+                    )
+                ]
+            if self.max_messages is not None:
+                doomed += [
+                    row[0]
+                    for row in self._conn.execute(
+                        "SELECT id FROM messages ORDER BY received DESC LIMIT -1 OFFSET ?",
+                        (self.max_messages,),
+                    )
+                ]
+        return self.remove(set(doomed))
+
+    def search(
+        self,
+        query: Optional[str] = None,
+        user_id: Optional[str] = None,
+        folder_id: Optional[str] = None,
+        since: Optional[str] = None,
+        limit: int = 25,
+    ) -> list[dict[str, Any]]:
+        """
+        Returns indexed messages matching all given criteria, newest first.
+        """
+        clauses, params = [], []
+        if query and query.strip():
+            if self.fts:
+                clauses.append("m.rowid IN (SELECT rowid FROM messages_fts WHERE messages_fts MATCH ?)")
+                params.append(_fts_query(query))
+            else:
+                for term in query.split():
+                    clauses.append(
+                        "(m.subject LIKE ? OR m.sender LIKE ? OR m.recipients LIKE ? OR m.body_preview LIKE ?)"
+                    )
+                    params += [f"%{term}%"] * 4
+        if user_id:
+            clauses.append("m.user_id = ?")
+            params.append(user_id.lower())
+        if folder_id:
+            clauses.append("m.folder_id = ?")
+            params.append(folder_id)
+        if since:
+            clauses.append("m.received >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT {', '.join('m.' + c for c in RESULT_COLUMNS)} FROM messages m {where} ORDER BY m.received DESC LIMIT ?"
+        with self._lock:
+            rows = self._conn.execute(sql, (*params, limit)).fetchall()
+        results = []
+        for row in rows:
+            result = dict(zip(RESULT_COLUMNS, row))
+            result["is_read"] = None if result["is_read"] is None else bool(result["is_read"])
+            results.append(result)
+        return results
+
+    def cursor(self, user_id: str, folder_id: str) -> Optional[dict[str, Any]]:
+        """
+        Returns the delta state saved for a folder, or None if it hasn't been indexed.
+        It lives next to the messages so that it can't outlive them.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state FROM cursors WHERE user_id = ? AND folder_id = ?", (user_id.lower(), folder_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_cursor(self, user_id: str, folder_id: str, state: dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO cursors VALUES (?, ?, ?) ON CONFLICT (user_id, folder_id) DO UPDATE SET state = excluded.state",
+                (user_id.lower(), folder_id, json.dumps(state)),
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+
+    def handle_event(self, event: str, user_id: str, message_ids: list[str]) -> None:
+        """
+        Message hook keeping the index in step with mutating tools: deleted or moved
+        messages are dropped, sends or replies mark the user's Sent Items as stale, and
+        updated messages (read state, flags, categories) mark their folders as stale so
+        the next index_mail_folder round fetches their new values.
+        """
+        if event in ("deleted", "moved"):
+            self.remove(message_ids)
+        elif event in ("sent", "replied"):
+            self.stale_folders.add((user_id.lower(), "sentitems"))
+        elif event == "updated":
+            self.stale_folders.update((user_id.lower(), folder) for folder in self.folders_of(message_ids))
+
+    def folders_of(self, message_ids: Iterable[str]) -> set[str]:
+        """
+        Returns the folders holding the given indexed messages.
+        """
+        params = [(message_id,) for message_id in message_ids]
+        folders: set[str] = set()
+        with self._lock:
+            for param in params:
+                row = self._conn.execute("SELECT folder_id FROM messages WHERE id = ?", param).fetchone()
+                if row and row[0]:
+                    folders.add(row[0])
+        return folders
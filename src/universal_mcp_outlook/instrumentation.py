@@ -0,0 +1,479 @@
+"""
+Per-tool request instrumentation.
+
+Tool calls are tracked with Instrumentation.track. Every HTTP request made while a
+tool runs, including retries and hidden lookups such as the /me call that resolves the
+user id, is measured by an instrumented transport installed beneath the throttling
+layer and attributed to that tool. Each request is recorded with:
+
+- method, path, status and Graph request-id;
+- bytes sent and received on the wire;
+- a latency breakdown taken from httpcore's trace events: connect (DNS resolution and
+  TCP connect, which httpcore does not separate), tls, send, server_wait (time to
+  response headers) and receive (body download).
+
+A ToolRecord keeps running totals for all of a call's requests but only the latest
+TOOL_REQUEST_LOG_SIZE RequestRecords, so long calls that page through a whole mailbox
+stay within a fixed amount of memory. When the tool returns, its ToolRecord is passed
+to every sink: a RingBufferSink kept for get_performance_stats, LoggingSink,
+OpenTelemetrySink or any callable.
+"""
+
+import contextvars
+import statistics
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Iterator, Optional
+
+import httpx
+from loguru import logger
+
+PERFORMANCE_BUFFER_SIZE = 256
+TOOL_REQUEST_LOG_SIZE = 64
+
+# httpcore trace steps and the latency phase each one counts towards.
+TRACE_PHASES = {
+    "connect_tcp": "connect",
+    "start_tls": "tls",
+    "send_request_headers": "send",
+    "send_request_body": "send",
+    "receive_response_headers": "server_wait",
+    "receive_response_body": "receive",
+}
+
+# Request extensions used to count attempts of the same request across retries and to
+# keep any trace callback the caller set, which the phase timer chains to.
+ATTEMPT_EXTENSION = "outlook.attempt"
+TRACE_EXTENSION = "outlook.trace"
+
+
+@dataclass
+class RequestRecord:
+    method: str
+    path: str
+    started_at: float
+    attempt: int = 0
+    status: Optional[int] = None
+    request_id: Optional[str] = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    duration: float = 0.0
+    phases: dict[str, float] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "method": self.method,
+            "path": self.path,
+            "status": self.status,
+            "request_id": self.request_id,
+            "attempt": self.attempt,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+            "duration_ms": round(self.duration * 1000, 3),
+            "phases_ms": {name: round(value * 1000, 3) for name, value in self.phases.items()},
+            "error": self.error,
+        }
+
+
+@dataclass
+class ToolRecord:
+    """
+    One tool call. The counters cover every request; requests holds the latest
+    TOOL_REQUEST_LOG_SIZE of them.
+    """
+
+    tool: str
+    started_at: float
+    duration: float = 0.0
+    error: Optional[str] = None
+    requests: deque[RequestRecord] = field(default_factory=lambda: deque(maxlen=TOOL_REQUEST_LOG_SIZE))
+    request_count: int = 0
+    retries: int = 0
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    phases: dict[str, float] = field(default_factory=lambda: defaultdict(float))
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, request: RequestRecord) -> None:
+        with self._lock:
+            self.requests.append(request)
+            self.request_count += 1
+            self.retries += 1 if request.attempt else 0
+            self.bytes_sent += request.bytes_sent
+            self.bytes_received += request.bytes_received
+            for name, value in request.phases.items():
+                self.phases[name] += value
+
+    def to_dict(self, include_requests: bool = False) -> dict[str, Any]:
+        with self._lock:
+            requests = list(self.requests)
+            summary = {
+                "tool": self.tool,
+                "started_at": self.started_at,
+                "duration_ms": round(self.duration * 1000, 3),
+                "error": self.error,
+                "requests": self.request_count,
+                "retries": self.retries,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "phases_ms": {name: round(value * 1000, 3) for name, value in self.phases.items()},
+                "request_ids": [r.request_id for r in requests if r.request_id],
+            }
+        if include_requests:
+            summary["request_log"] = [r.to_dict() for r in requests]
+        return summary
+
+
+Sink = Callable[[ToolRecord], None]
+
+_current_tool: contextvars.ContextVar[Optional[ToolRecord]] = contextvars.ContextVar(
+    "outlook_current_tool", default=None
+)
+
+
+class Instrumentation:
+    """
+    Tracks tool calls and fans finished ToolRecords out to sinks.
+    """
+
+    def __init__(self, sinks: Optional[list[Sink]] = None) -> None:
+        self.sinks: list[Sink] = list(sinks or [])
+
+    @contextmanager
+    def track(self, tool: str) -> Iterator[ToolRecord]:
+        """
+        Attributes every request made in this context, including worker threads
+        started through ContextThreadPoolExecutor or asyncio.to_thread, to tool.
+        Nested tracking (a tool calling another tool) stays attributed to the outer one.
+        """
+        parent = _current_tool.get()
+        if parent is not None:
+            yield parent
+            return
+        record = ToolRecord(tool, time.time())
+        token = _current_tool.set(record)
+        started = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.duration = time.perf_counter() - started
+            _current_tool.reset(token)
+            self.emit(record)
+
+    def emit(self, record: ToolRecord) -> None:
+        for sink in self.sinks:
+            try:
+                sink(record)
+            except Exception as e:
+                logger.warning(f"Instrumentation sink {sink!r} failed: {e}")
+
+    @staticmethod
+    def start_request(request: httpx.Request) -> tuple[Optional[ToolRecord], RequestRecord, "_PhaseTimer"]:
+        attempt = request.extensions.get(ATTEMPT_EXTENSION, -1) + 1
+        request.extensions[ATTEMPT_EXTENSION] = attempt
+        record = RequestRecord(
+            method=request.method,
+            path=request.url.path,
+            started_at=time.time(),
+            attempt=attempt,
+            bytes_sent=int(request.headers.get("Content-Length") or 0),
+        )
+        if TRACE_EXTENSION not in request.extensions:
+            request.extensions[TRACE_EXTENSION] = request.extensions.get("trace")
+        timer = _PhaseTimer(request.extensions[TRACE_EXTENSION])
+        request.extensions["trace"] = timer
+        return _current_tool.get(), record, timer
+
+
+class _PhaseTimer:
+    """
+    httpcore trace callback accumulating time per latency phase. Chains to any trace
+    callback that was already set on the request.
+    """
+
+    def __init__(self, chained: Optional[Callable[..., Any]] = None) -> None:
+        self.phases: dict[str, float] = defaultdict(float)
+        self._started: dict[str, float] = {}
+        self._chained = chained
+        self._started_at = time.perf_counter()
+
+    def observe(self, name: str) -> None:
+        step, _, state = name.partition(".")[2].rpartition(".")
+        phase = TRACE_PHASES.get(step)
+        if phase is None:
+            return
+        if state == "started":
+            self._started[step] = time.perf_counter()
+        elif step in self._started:
+            self.phases[phase] += time.perf_counter() - self._started.pop(step)
+
+    def __call__(self, name: str, info: dict[str, Any]) -> None:
+        self.observe(name)
+        if self._chained is not None:
+            self._chained(name, info)
+
+    async def atrace(self, name: str, info: dict[str, Any]) -> None:
+        self.observe(name)
+        if self._chained is not None:
+            await self._chained(name, info)
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._started_at
+
+
+def _finish(
+    tool: Optional[ToolRecord],
+    record: RequestRecord,
+    timer: _PhaseTimer,
+    received: int,
+    error: Optional[BaseException] = None,
+) -> None:
+    record.duration = timer.elapsed
+    record.phases = dict(timer.phases)
+    record.bytes_received = received
+    if error is not None:
+        record.error = f"{type(error).__name__}: {error}"
+    if tool is not None:
+        tool.add(record)
+
+
+class _MeteredStream(httpx.SyncByteStream):
+    def __init__(self, stream: httpx.SyncByteStream, on_close: Callable[[int], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+        self._received = 0
+        self._closed = False
+
+    def __iter__(self) -> Iterator[bytes]:
+        for chunk in self._stream:
+            self._received += len(chunk)
+            yield chunk
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._received)
+
+
+class _AsyncMeteredStream(httpx.AsyncByteStream):
+    def __init__(self, stream: httpx.AsyncByteStream, on_close: Callable[[int], None]) -> None:
+        self._stream = stream
+        self._on_close = on_close
+        self._received = 0
+        self._closed = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for chunk in self._stream:
+            self._received += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._closed:
+                self._closed = True
+                self._on_close(self._received)
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """
+    Sync transport wrapper recording every request attempt for the current tool. The
+    record is completed when the response body has been read and closed.
+    """
+
+    def __init__(self, transport: httpx.BaseTransport) -> None:
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        tool, record, timer = Instrumentation.start_request(request)
+        try:
+            response = self._transport.handle_request(request)
+        except BaseException as e:
+            _finish(tool, record, timer, 0, e)
+            raise
+        record.status = response.status_code
+        record.request_id = response.headers.get("request-id")
+        if response.is_stream_consumed:
+            # Responses built with their content (e.g. by mock transports) are already read.
+            _finish(tool, record, timer, len(response.content))
+        else:
+            response.stream = _MeteredStream(response.stream, lambda received: _finish(tool, record, timer, received))
+        return response
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncInstrumentedTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of InstrumentedTransport.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport) -> None:
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        tool, record, timer = Instrumentation.start_request(request)
+        request.extensions["trace"] = timer.atrace
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException as e:
+            _finish(tool, record, timer, 0, e)
+            raise
+        record.status = response.status_code
+        record.request_id = response.headers.get("request-id")
+        if response.is_stream_consumed:
+            _finish(tool, record, timer, len(response.content))
+        else:
+            response.stream = _AsyncMeteredStream(
+                response.stream, lambda received: _finish(tool, record, timer, received)
+            )
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+class ContextThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor running each task in a copy of the submitter's context, so
+    requests made by worker threads are attributed to the tool that started them.
+    """
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        context = contextvars.copy_context()
+        return super().submit(context.run, fn, *args, **kwargs)
+
+
+class RingBufferSink:
+    """
+    Keeps the most recent ToolRecords in memory and aggregates them per tool.
+    """
+
+    def __init__(self, size: int = PERFORMANCE_BUFFER_SIZE) -> None:
+        self._records: deque[ToolRecord] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __call__(self, record: ToolRecord) -> None:
+        with self._lock:
+            self._records.append(record)
+
+    def records(self, tool: Optional[str] = None) -> list[ToolRecord]:
+        with self._lock:
+            return [record for record in self._records if tool is None or record.tool == tool]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._records.clear()
+
+    def stats(self, tool: Optional[str] = None) -> dict[str, dict[str, Any]]:
+        by_tool: dict[str, list[ToolRecord]] = defaultdict(list)
+        for record in self.records(tool):
+            by_tool[record.tool].append(record)
+        stats = {}
+        for name, records in by_tool.items():
+            durations = sorted(record.duration * 1000 for record in records)
+            summaries = [record.to_dict() for record in records]
+            phases: dict[str, float] = defaultdict(float)
+            for summary in summaries:
+                for phase, value in summary["phases_ms"].items():
+                    phases[phase] += value
+            stats[name] = {
+                "calls": len(records),
+                "errors": sum(1 for record in records if record.error),
+                "p50_ms": round(statistics.median(durations), 3),
+                "p95_ms": round(durations[min(len(durations) - 1, int(0.95 * (len(durations) - 1) + 0.5))], 3),
+                "max_ms": round(durations[-1], 3),
+                "requests_per_call": round(sum(s["requests"] for s in summaries) / len(records), 2),
+                "retries": sum(s["retries"] for s in summaries),
+                "bytes_sent": sum(s["bytes_sent"] for s in summaries),
+                "bytes_received": sum(s["bytes_received"] for s in summaries),
+                "avg_phases_ms": {phase: round(value / len(records), 3) for phase, value in phases.items()},
+            }
+        return stats
+
+
+class LoggingSink:
+    """
+    Logs a one-line summary of every tool call.
+    """
+
+    def __init__(self, level: str = "DEBUG") -> None:
+        self.level = level
+
+    def __call__(self, record: ToolRecord) -> None:
+        summary = record.to_dict()
+        phases = " ".join(f"{name}={value:.1f}ms" for name, value in summary["phases_ms"].items())
+        logger.log(
+            self.level,
+            f"Tool {record.tool} took {summary['duration_ms']:.1f}ms: {summary['requests']} requests, "
+            f"{summary['retries']} retries, {summary['bytes_sent']}B sent, {summary['bytes_received']}B received"
+            + (f", {phases}" if phases else "")
+            + (f", error: {record.error}" if record.error else ""),
+        )
+
+
+class OpenTelemetrySink:
+    """
+    Exports each tool call as a span with one child span per HTTP request. Requires the
+    opentelemetry-api package; spans go to whatever tracer provider is configured.
+    """
+
+    def __init__(self, tracer: Any = None) -> None:
+        try:
+            from opentelemetry import trace
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetrySink requires opentelemetry-api: pip install 'universal-mcp-outlook[otel]'"
+            ) from e
+        self._trace = trace
+        self._tracer = tracer or trace.get_tracer("universal_mcp_outlook")
+
+    def __call__(self, record: ToolRecord) -> None:
+        summary = record.to_dict()
+        span = self._tracer.start_span(
+            f"outlook.{record.tool}",
+            start_time=int(record.started_at * 1e9),
+            attributes={
+                "outlook.tool": record.tool,
+                "outlook.requests": summary["requests"],
+                "outlook.retries": summary["retries"],
+                "outlook.bytes_sent": summary["bytes_sent"],
+                "outlook.bytes_received": summary["bytes_received"],
+            },
+        )
+        context = self._trace.set_span_in_context(span)
+        for request in list(record.requests):
+            attributes = {
+                "http.request.method": request.method,
+                "url.path": request.path,
+                "outlook.attempt": request.attempt,
+                **{f"outlook.phase.{name}_ms": value * 1000 for name, value in request.phases.items()},
+            }
+            if request.status is not None:
+                attributes["http.response.status_code"] = request.status
+            if request.request_id:
+                attributes["graph.request_id"] = request.request_id
+            child = self._tracer.start_span(
+                f"{request.method} {request.path}",
+                context=context,
+                start_time=int(request.started_at * 1e9),
+                attributes=attributes,
+            )
+            child.end(end_time=int((request.started_at + request.duration) * 1e9))
+        if record.error:
+            span.set_status(self._trace.Status(self._trace.StatusCode.ERROR, record.error))
+        span.end(end_time=int((record.started_at + record.duration) * 1e9))
@@ -0,0 +1,231 @@
+"""
+Compact projections of Graph message payloads for tool responses.
+
+Raw Graph JSON carries OData annotations, nested emailAddress wrappers and full HTML
+bodies, none of which help an agent. A projection profile picks the properties to
+request and the transforms below reshape the response:
+
+- @odata.* annotations are dropped, except the paging links;
+- recipients are flattened to "Name <address>" strings;
+- HTML bodies are converted to plain text and truncated.
+"""
+
+import json
+import re
+import threading
+from html import unescape
+from html.parser import HTMLParser
+from typing import Any, Optional
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# Properties requested for each profile. None means Graph's default property set.
+PROFILES: dict[str, Optional[list[str]]] = {
+    "summary": ["id", "subject", "from", "receivedDateTime", "isRead", "hasAttachments", "bodyPreview"],
+    "triage": [
+        "id",
+        "subject",
+        "from",
+        "toRecipients",
+        "ccRecipients",
+        "receivedDateTime",
+        "importance",
+        "isRead",
+        "flag",
+        "categories",
+        "hasAttachments",
+        "conversationId",
+        "bodyPreview",
+    ],
+    "full": None,
+}
+
+BODY_CHAR_LIMIT = 4000
+
+KEPT_ANNOTATIONS = frozenset({"@odata.nextLink", "@odata.deltaLink", "@odata.count"})
+RECIPIENT_FIELDS = frozenset({"from", "sender"})
+RECIPIENT_LIST_FIELDS = frozenset({"toRecipients", "ccRecipients", "bccRecipients", "replyTo"})
+BODY_FIELDS = frozenset({"body", "uniqueBody"})
+BLOCK_TAGS = frozenset({"br", "p", "div", "li", "tr", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "hr"})
+
+
+def dumps(payload: Any) -> bytes:
+    """
+    Serialises a payload to JSON bytes, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def profile_select(profile: str, select: Optional[list[str]] = None) -> Optional[list[str]]:
+    """
+    Returns the $select list for a profile, extended with any extra properties.
+    """
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile '{profile}'. Expected one of: {', '.join(PROFILES)}.")
+    fields = PROFILES[profile]
+    if fields is None:
+        return select
+    return fields + [field for field in select or [] if field not in fields]
+
+
+class _TextExtractor(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__(convert_charrefs=True)
+        self.parts: list[str] = []
+        self._skip = 0
+
+    def handle_starttag(self, tag: str, attrs: Any) -> None:
+        if tag in ("script", "style", "head"):
+            self._skip += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in ("script", "style", "head"):
+            self._skip = max(0, self._skip - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append("\n")
+
+    def handle_data(self, data: str) -> None:
+        if not self._skip:
+            self.parts.append(data)
+
+
+def html_to_text(html: str) -> str:
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+    text = unescape("".join(parser.parts)).replace("\xa0", " ")
+    text = re.sub(r"[ \t\r\f\v]+", " ", text)
+    text = re.sub(r" *\n[ \n]*", "\n", text)
+    return text.strip()
+
+
+def truncate(text: str, limit: Optional[int]) -> str:
+    if limit is None or len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + "…"
+
+
+def flatten_recipient(recipient: Optional[dict[str, Any]]) -> Optional[str]:
+    if not recipient:
+        return None
+    email = recipient.get("emailAddress") or {}
+    name, address = email.get("name"), email.get("address")
+    if name and address and name != address:
+        return f"{name} <{address}>"
+    return address or name
+
+
+def project_message(message: dict[str, Any], body_limit: Optional[int] = BODY_CHAR_LIMIT) -> dict[str, Any]:
+    projected: dict[str, Any] = {}
+    for key, value in message.items():
+        if key.startswith("@odata.") or key.endswith("@odata.navigationLink"):
+            continue
+        if key in RECIPIENT_FIELDS and isinstance(value, dict):
+            value = flatten_recipient(value)
+        elif key in RECIPIENT_LIST_FIELDS and isinstance(value, list):
+            value = [flatten_recipient(r) for r in value]
+        elif key in BODY_FIELDS and isinstance(value, dict):
+            content = value.get("content") or ""
+            if (value.get("contentType") or "").lower() == "html":
+                content = html_to_text(content)
+            value = truncate(content, body_limit)
+        elif key == "flag" and isinstance(value, dict):
+            value = value.get("flagStatus")
+        elif isinstance(value, dict):
+            value = strip_annotations(value)
+        projected[key] = value
+    return projected
+
+
+def project_conversation(messages: list[dict[str, Any]], body_limit: Optional[int] = BODY_CHAR_LIMIT) -> dict[str, Any]:
+    """
+    Builds a compact thread from messages in chronological order. Each message keeps only
+    its uniqueBody, the part not quoted from earlier messages, as 'body'; participants are
+    listed in order of first appearance.
+    """
+    participants: dict[str, None] = {}
+    thread = []
+    for message in messages:
+        projected = project_message({k: v for k, v in message.items() if k != "body"}, body_limit)
+        if "uniqueBody" in projected:
+            projected["body"] = projected.pop("uniqueBody")
+        for field in ("from", "toRecipients", "ccRecipients"):
+            value = projected.get(field)
+            for participant in value if isinstance(value, list) else [value]:
+                if participant:
+                    participants.setdefault(participant)
+        thread.append(projected)
+    return {
+        "subject": next((m.get("subject") for m in messages if m.get("subject")), None),
+        "participants": list(participants),
+        "messages": thread,
+    }
+
+
+def strip_annotations(payload: Any) -> Any:
+    """
+    Recursively removes @odata.* annotations other than paging links.
+    """
+    if isinstance(payload, dict):
+        return {
+            k: strip_annotations(v)
+            for k, v in payload.items()
+            if not (k.startswith("@odata.") and k not in KEPT_ANNOTATIONS)
+        }
+    if isinstance(payload, list):
+        return [strip_annotations(item) for item in payload]
+    return payload
+
+
+def project(payload: Any, body_limit: Optional[int] = BODY_CHAR_LIMIT) -> Any:
+    """
+    Projects a single message or a collection of messages.
+    """
+    if not isinstance(payload, dict):
+        return payload
+    if isinstance(payload.get("value"), list):
+        collection = strip_annotations({k: v for k, v in payload.items() if k != "value"})
+        collection["value"] = [
+            project_message(item, body_limit) if isinstance(item, dict) else item for item in payload["value"]
+        ]
+        return collection
+    return project_message(payload, body_limit)
+
+
+class ProjectionStats:
+    """
+    Running count of projected payloads and, for those that were measured, totals of
+    their serialised sizes before and after projection.
+    """
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.measured = 0
+        self.bytes_before = 0
+        self.bytes_after = 0
+        self._lock = threading.Lock()
+
+    def record(self, before: Optional[int] = None, after: Optional[int] = None) -> None:
+        with self._lock:
+            self.calls += 1
+            if before is not None and after is not None:
+                self.measured += 1
+                self.bytes_before += before
+                self.bytes_after += after
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "measured": self.measured,
+                "bytes_before": self.bytes_before,
+                "bytes_after": self.bytes_after,
+                "bytes_saved": self.bytes_before - self.bytes_after,
+            }
@@ -0,0 +1,400 @@
+"""
+Compiles and validates OData query options before they reach Graph.
+
+Tools describe a query as an ODataQuery: lists of properties, typed conditions and
+date ranges alongside the raw $filter/$search strings agents already pass. Compiling
+joins lists, formats literals, and rejects what Graph would answer with a 400, such
+as $search combined with $orderby or $skip, unknown message properties, or
+operators a property does not support. Graph's rule that $orderby properties must
+lead the $filter is applied for the caller: typed conditions are reordered and
+date properties get an always-true bound. Compiled queries are cached, since tools
+repeat the same few shapes.
+"""
+
+import difflib
+import functools
+import re
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Any, Iterable, Optional, Union
+
+QUERY_CACHE_SIZE = 256
+
+# Graph rejects $top above this on message collections.
+MAX_TOP = 1000
+
+# Message properties and their types, used to check $select, $orderby and $filter.
+MESSAGE_FIELDS: dict[str, str] = {
+    "id": "string",
+    "createdDateTime": "datetime",
+    "lastModifiedDateTime": "datetime",
+    "changeKey": "string",
+    "categories": "strings",
+    "receivedDateTime": "datetime",
+    "sentDateTime": "datetime",
+    "hasAttachments": "boolean",
+    "internetMessageId": "string",
+    "subject": "string",
+    "body": "complex",
+    "bodyPreview": "string",
+    "uniqueBody": "complex",
+    "importance": "importance",
+    "parentFolderId": "string",
+    "conversationId": "string",
+    "conversationIndex": "binary",
+    "isDeliveryReceiptRequested": "boolean",
+    "isReadReceiptRequested": "boolean",
+    "isRead": "boolean",
+    "isDraft": "boolean",
+    "webLink": "string",
+    "inferenceClassification": "inferenceClassification",
+    "sender": "recipient",
+    "from": "recipient",
+    "toRecipients": "recipients",
+    "ccRecipients": "recipients",
+    "bccRecipients": "recipients",
+    "replyTo": "recipients",
+    "flag": "flag",
+    "internetMessageHeaders": "complex",
+    "mentionsPreview": "complex",
+    "attachments": "navigation",
+    "extensions": "navigation",
+    "mentions": "navigation",
+    "singleValueExtendedProperties": "navigation",
+    "multiValueExtendedProperties": "navigation",
+}
+
+MESSAGE_EXPANDS = frozenset(
+    {"attachments", "extensions", "mentions", "singleValueExtendedProperties", "multiValueExtendedProperties"}
+)
+
+ENUM_VALUES: dict[str, tuple[str, ...]] = {
+    "importance": ("low", "normal", "high"),
+    "inferenceClassification": ("focused", "other"),
+    "flag": ("notFlagged", "complete", "flagged"),
+}
+
+# Operators Graph accepts per property type. Collection types match any member.
+OPERATORS: dict[str, frozenset[str]] = {
+    "string": frozenset({"eq", "ne", "startswith"}),
+    "datetime": frozenset({"eq", "ne", "gt", "ge", "lt", "le"}),
+    "boolean": frozenset({"eq", "ne"}),
+    "importance": frozenset({"eq", "ne"}),
+    "inferenceClassification": frozenset({"eq", "ne"}),
+    "flag": frozenset({"eq", "ne"}),
+    "recipient": frozenset({"eq", "ne"}),
+    "recipients": frozenset({"eq"}),
+    "strings": frozenset({"eq"}),
+}
+
+SORTABLE_TYPES = frozenset(
+    {"string", "datetime", "boolean", "importance", "inferenceClassification", "recipient", "flag"}
+)
+
+# Lower bound that matches every message, used to put a date property at the front of
+# a $filter when it is only needed there for $orderby.
+ALWAYS_TRUE_SINCE = "1900-01-01T00:00:00Z"
+
+_QUOTED = re.compile(r"'(?:[^']|'')*'")
+_COMPARISON = re.compile(r"\b([A-Za-z_]\w*(?:/\w+)*)\s+(?:eq|ne|gt|ge|lt|le)\b")
+_FUNCTION = re.compile(r"\b(?:startswith|endswith|contains)\(\s*([A-Za-z_]\w*(?:/\w+)*)")
+_LAMBDA = re.compile(r"/any\(\s*(\w+)\s*:", re.IGNORECASE)
+_ANY = re.compile(r"\b([A-Za-z_]\w*)/any\(", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class Condition:
+    """
+    One typed $filter comparison, e.g. Condition("isRead", "eq", False).
+
+    Collection properties (categories and the recipient lists) match when any member
+    equals the value; from and sender compare the email address.
+    """
+
+    field: str
+    op: str
+    value: Any
+
+    @classmethod
+    def from_dict(cls, condition: Union["Condition", dict[str, Any]]) -> "Condition":
+        if isinstance(condition, Condition):
+            return condition
+        if not isinstance(condition, dict) or not {"field", "op"} <= condition.keys():
+            raise ValueError(f"Each condition needs 'field', 'op' and 'value', got {condition!r}.")
+        return cls(condition["field"], condition["op"], condition.get("value"))
+
+
+@dataclass(frozen=True)
+class ODataQuery:
+    """
+    The OData options of one Graph request. resource selects which property catalog
+    validates the query; only messages are checked property by property.
+    """
+
+    resource: str = "message"
+    select: tuple[str, ...] = ()
+    expand: tuple[str, ...] = ()
+    where: tuple[Condition, ...] = ()
+    filter: Optional[str] = None
+    search: Optional[str] = None
+    orderby: tuple[str, ...] = ()
+    top: Optional[int] = None
+    skip: Optional[int] = None
+    count: Optional[bool] = None
+
+    def params(self) -> dict[str, Any]:
+        return dict(compile_query(self))
+
+
+def _unknown(kind: str, name: str, known: Iterable[str]) -> ValueError:
+    close = difflib.get_close_matches(name, list(known), n=1)
+    hint = f" Did you mean '{close[0]}'?" if close else ""
+    return ValueError(f"Unknown message property '{name}' in {kind}.{hint}")
+
+
+def _field_type(name: str, kind: str) -> str:
+    root = name.split("/", 1)[0]
+    if root not in MESSAGE_FIELDS:
+        raise _unknown(kind, root, MESSAGE_FIELDS)
+    return MESSAGE_FIELDS[root]
+
+
+def search_phrase(text: str) -> str:
+    """
+    Wraps a $search value in double quotes, which Graph requires for anything but a
+    single word.
+    """
+    if not text:
+        raise ValueError("Missing required parameter 'query'.")
+    return text if text.startswith('"') else '"' + text.replace('"', '\\"') + '"'
+
+
+def _datetime_literal(value: Any, field: str) -> str:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value)
+        except ValueError:
+            raise ValueError(f"'{field}' needs an ISO 8601 date or date-time, got {value!r}.") from None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if not isinstance(value, datetime):
+        raise ValueError(f"'{field}' needs an ISO 8601 date or date-time, got {value!r}.")
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _string_literal(value: Any, field: str) -> str:
+    if not isinstance(value, str):
+        raise ValueError(f"'{field}' needs a string value, got {value!r}.")
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _compile_condition(condition: Condition) -> str:
+    field, op, value = condition.field, condition.op.lower(), condition.value
+    kind = _field_type(field, "filter")
+    allowed = OPERATORS.get(kind)
+    if allowed is None:
+        raise ValueError(f"Graph cannot filter messages on '{field}'.")
+    if op not in allowed:
+        hint = " Use search for substring matches." if op == "contains" else ""
+        raise ValueError(
+            f"Operator '{condition.op}' is not supported for '{field}'; use one of {', '.join(sorted(allowed))}.{hint}"
+        )
+    if value is None:
+        raise ValueError(f"Condition on '{field}' needs a value.")
+    if kind == "datetime":
+        literal = _datetime_literal(value, field)
+    elif kind == "boolean":
+        if isinstance(value, str) and value.lower() in ("true", "false"):
+            value = value.lower() == "true"
+        if not isinstance(value, bool):
+            raise ValueError(f"'{field}' needs true or false, got {value!r}.")
+        literal = "true" if value else "false"
+    else:
+        literal = _string_literal(value, field)
+        if kind in ENUM_VALUES and value not in ENUM_VALUES[kind]:
+            raise ValueError(f"'{field}' must be one of {', '.join(ENUM_VALUES[kind])}, got {value!r}.")
+    if kind == "flag":
+        field = "flag/flagStatus"
+    elif kind == "recipient" and "/" not in field:
+        field = f"{field}/emailAddress/address"
+    elif kind == "recipients":
+        return f"{field}/any(r:r/emailAddress/address eq {literal})"
+    elif kind == "strings":
+        return f"{field}/any(c:c eq {literal})"
+    if op == "startswith":
+        return f"startswith({field},{literal})"
+    return f"{field} {op} {literal}"
+
+
+def filter_fields(filter: str) -> list[str]:
+    """
+    Returns the properties a raw $filter compares, in order of first appearance, after
+    checking that its quotes and parentheses balance.
+    """
+    bare = _QUOTED.sub("''", filter)
+    if "'" in bare.replace("''", ""):
+        raise ValueError(f"Unbalanced quote in filter: {filter}")
+    depth = 0
+    for char in bare:
+        depth += {"(": 1, ")": -1}.get(char, 0)
+        if depth < 0:
+            break
+    if depth:
+        raise ValueError(f"Unbalanced parentheses in filter: {filter}")
+    variables = {match.group(1) for match in _LAMBDA.finditer(bare)}
+    found = sorted(
+        [(m.start(), m.group(1)) for pattern in (_COMPARISON, _FUNCTION, _ANY) for m in pattern.finditer(bare)]
+    )
+    fields: list[str] = []
+    for _, name in found:
+        root = name.split("/", 1)[0]
+        if root not in variables and root not in fields:
+            fields.append(root)
+    return fields
+
+
+def _orderby_fields(orderby: tuple[str, ...]) -> list[str]:
+    fields = []
+    for entry in orderby:
+        parts = entry.split()
+        if not parts or len(parts) > 2 or (len(parts) == 2 and parts[1].lower() not in ("asc", "desc")):
+            raise ValueError(f"Invalid orderby entry '{entry}'; expected '<property> [asc|desc]'.")
+        if _field_type(parts[0], "orderby") not in SORTABLE_TYPES:
+            raise ValueError(f"Graph cannot order messages by '{parts[0]}'.")
+        fields.append(parts[0].split("/", 1)[0])
+    return fields
+
+
+def _message_filter(query: ODataQuery, ordered: list[str]) -> Optional[str]:
+    """
+    Joins typed conditions and the raw filter so that $orderby properties lead, as
+    Graph requires whenever both options are present.
+    """
+    rank = {field: index for index, field in enumerate(ordered)}
+    conditions = sorted(query.where, key=lambda c: rank.get(c.field.split("/", 1)[0], len(rank)))
+    clauses = [_compile_condition(condition) for condition in conditions]
+    fields = [condition.field.split("/", 1)[0] for condition in conditions]
+    if query.filter:
+        raw_fields = filter_fields(query.filter)
+        for name in raw_fields:
+            _field_type(name, "filter")
+        clauses.append(f"({query.filter})" if clauses else query.filter)
+        fields += raw_fields
+    if not clauses:
+        return None
+    if ordered and fields[: len(ordered)] != ordered:
+        undated = [field for field in ordered if MESSAGE_FIELDS[field] != "datetime"]
+        if undated:
+            raise ValueError(
+                f"Graph only orders a filtered message list by properties the filter starts with; "
+                f"add a condition on {', '.join(undated)} first or drop orderby."
+            )
+        if not query.where:
+            # A lone raw filter may contain 'or', so it is parenthesised like it would
+            # be next to typed conditions.
+            clauses = [f"({query.filter})"]
+        clauses = [f"{field} ge {ALWAYS_TRUE_SINCE}" for field in ordered] + clauses
+    return " and ".join(clauses)
+
+
+@functools.lru_cache(maxsize=QUERY_CACHE_SIZE)
+def compile_query(query: ODataQuery) -> tuple[tuple[str, Any], ...]:
+    """
+    Validates a query and compiles it to OData parameters, raising ValueError for
+    combinations Graph would reject.
+    """
+    if query.search and query.orderby:
+        raise ValueError("Graph does not support orderby with search; search results are already newest first.")
+    if query.search and query.skip:
+        raise ValueError("Graph does not support skip with search; page through results with the next link instead.")
+    if query.top is not None and query.top < 1:
+        raise ValueError(f"top must be at least 1, got {query.top}.")
+    if query.skip is not None and query.skip < 0:
+        raise ValueError(f"skip cannot be negative, got {query.skip}.")
+
+    if query.resource == "message":
+        if query.top is not None and query.top > MAX_TOP:
+            raise ValueError(f"top must be at most {MAX_TOP} for messages, got {query.top}.")
+        for name in query.select:
+            if name not in MESSAGE_FIELDS:
+                raise _unknown("select", name, MESSAGE_FIELDS)
+        for name in query.expand:
+            if name.split("(", 1)[0] not in MESSAGE_EXPANDS:
+                raise _unknown("expand", name.split("(", 1)[0], MESSAGE_EXPANDS)
+        ordered = _orderby_fields(query.orderby)
+        filter = _message_filter(query, ordered)
+    else:
+        if query.where:
+            raise ValueError(f"Typed conditions are only supported for messages, not {query.resource}.")
+        if query.filter:
+            filter_fields(query.filter)
+        filter = query.filter
+
+    options = [
+        ("$top", query.top),
+        ("$skip", query.skip),
+        ("$search", search_phrase(query.search) if query.search else None),
+        ("$filter", filter),
+        ("$count", None if query.count is None else str(bool(query.count)).lower()),
+        ("$orderby", ",".join(query.orderby) or None),
+        ("$select", ",".join(query.select) or None),
+        ("$expand", ",".join(query.expand) or None),
+    ]
+    return tuple((name, value) for name, value in options if value is not None)
+
+
+def _names(value: Union[None, str, Iterable[str]]) -> tuple[str, ...]:
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(part.strip() for part in value if part and part.strip())
+
+
+def build_query(
+    resource: str = "message",
+    select: Union[None, str, Iterable[str]] = None,
+    expand: Union[None, str, Iterable[str]] = None,
+    where: Optional[Iterable[Union[Condition, dict[str, Any]]]] = None,
+    filter: Optional[str] = None,
+    search: Optional[str] = None,
+    orderby: Union[None, str, Iterable[str]] = None,
+    top: Optional[int] = None,
+    skip: Optional[int] = None,
+    count: Optional[bool] = None,
+    received_after: Any = None,
+    received_before: Any = None,
+) -> dict[str, Any]:
+    """
+    Builds, validates and compiles the OData parameters for a request. received_after
+    and received_before add an inclusive lower and exclusive upper receivedDateTime
+    bound.
+    """
+    conditions = [Condition.from_dict(condition) for condition in where or []]
+    if received_after is not None:
+        conditions.append(Condition("receivedDateTime", "ge", received_after))
+    if received_before is not None:
+        conditions.append(Condition("receivedDateTime", "lt", received_before))
+    if received_after is not None and received_before is not None:
+        after = _datetime_literal(received_after, "received_after")
+        before = _datetime_literal(received_before, "received_before")
+        if after >= before:
+            raise ValueError(f"received_after ({after}) must be earlier than received_before ({before}).")
+    for condition in conditions:
+        if isinstance(condition.value, (list, dict, set)):
+            raise ValueError(f"Condition on '{condition.field}' needs a single value, got {condition.value!r}.")
+    query = ODataQuery(
+        resource=resource,
+        select=_names(select),
+        expand=_names(expand),
+        where=tuple(conditions),
+        filter=filter or None,
+        search=search or None,
+        orderby=_names(orderby),
+        top=top,
+        skip=skip,
+        count=count,
+    )
+    return query.params()
@@ -1,19 +1,20 @@
-
 from universal_mcp.servers import SingleMCPServer
 from universal_mcp.integrations import AgentRIntegration
 from universal_mcp.stores import EnvironmentStore
 
 from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.tool_manifest import ManifestToolManager
 
-env_store = EnvironmentStore()
-integration_instance = AgentRIntegration(name="outlook", store=env_store, api_key="", base_url="")
-app_instance = OutlookApp(integration=integration_instance)
 
-mcp = SingleMCPServer(
-    app_instance=app_instance,
-)
+def create_integration() -> AgentRIntegration:
+    return AgentRIntegration(name="outlook", store=EnvironmentStore(), api_key="", base_url="")
 
-if __name__ == "__main__":
-    mcp.run()
 
+# The integration and HTTP clients are built on the first tool call, and tools are
+# registered from the precomputed manifest, so starting the server only pays for imports.
+app_instance = OutlookApp(integration_factory=create_integration, async_tools=True)
 
+mcp = SingleMCPServer(app_instance=app_instance, tool_manager=ManifestToolManager())
+
+if __name__ == "__main__":
+    mcp.run()
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any
+
+from universal_mcp.exceptions import KeyNotFoundError, StoreError
+from universal_mcp.stores import BaseStore
+
+DEFAULT_STATE_PATH = Path.home() / ".universal-mcp" / "outlook" / "state.db"
+
+
+class SQLiteStore(BaseStore):
+    """
+    Key-value store persisted in a single SQLite file.
+    Used for state that must survive restarts, such as delta sync links.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_STATE_PATH):
+        """
+        Open (or create) the database at the given path.
+
+        Args:
+            path (str | Path): Database file, or ':memory:' for a throwaway store
+        """
+        self.path = str(path)
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        try:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            with self._conn:
+                self._conn.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        except sqlite3.Error as e:
+            raise StoreError(f"Could not open SQLite store at '{self.path}': {e}") from e
+
+    def get(self, key: str) -> Any:
+        """
+        Retrieve a value from the SQLite store by key.
+
+        Args:
+            key (str): The key to look up
+
+        Returns:
+            Any: The stored value
+
+        Raises:
+            KeyNotFoundError: If the key is not found in the store
+            StoreError: If there is an error accessing the store
+        """
+        try:
+            with self._lock:
+                row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        except sqlite3.Error as e:
+            raise StoreError(f"Error reading key '{key}' from SQLite store: {e}") from e
+        if row is None:
+            raise KeyNotFoundError(f"Key '{key}' not found in SQLite store")
+        return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """
+        Store a value in the SQLite store with the given key.
+
+        Args:
+            key (str): The key to store the value under
+            value (str): The value to store
+
+        Raises:
+            StoreError: If there is an error storing the value
+        """
+        try:
+            with self._lock, self._conn:
+                self._conn.execute(
+                    "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                    (key, value),
+                )
+        except sqlite3.Error as e:
+            raise StoreError(f"Error writing key '{key}' to SQLite store: {e}") from e
+
+    def delete(self, key: str) -> None:
+        """
+        Delete a value from the SQLite store by key.
+
+        Args:
+            key (str): The key to delete
+
+        Raises:
+            KeyNotFoundError: If the key is not found in the store
+            StoreError: If there is an error deleting the value
+        """
+        try:
+            with self._lock, self._conn:
+                deleted = self._conn.execute("DELETE FROM kv WHERE key = ?", (key,)).rowcount
+        except sqlite3.Error as e:
+            raise StoreError(f"Error deleting key '{key}' from SQLite store: {e}") from e
+        if not deleted:
+            raise KeyNotFoundError(f"Key '{key}' not found in SQLite store")
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}(path={self.path!r})"
@@ -0,0 +1,351 @@
+"""
+Graph change notifications for mail, as an alternative to polling.
+
+SubscriptionManager creates /subscriptions for message resources and keeps them alive
+by renewing them before they expire. NotificationReceiver is a small local HTTP
+endpoint for Graph to call: it answers the validationToken handshake, checks each
+notification's clientState and queues the accepted ones on a NotificationQueue that
+both threads and coroutines can wait on.
+
+Graph only delivers to a public HTTPS URL, so in production the receiver normally sits
+behind a tunnel or reverse proxy whose URL is passed as notification_url.
+"""
+
+import asyncio
+import hmac
+import json
+import secrets
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Optional
+from urllib.parse import parse_qs, urlparse
+
+from loguru import logger
+
+# Lifetime requested for new subscriptions; Graph caps message subscriptions just
+# under 7 days.
+SUBSCRIPTION_LIFETIME = timedelta(days=3)
+
+# Subscriptions expiring within this window are renewed by renew_due.
+RENEW_BEFORE = timedelta(hours=12)
+
+# How often the background renewer checks for subscriptions that are due.
+RENEW_INTERVAL = 15 * 60.0
+
+# Notifications kept while nobody is consuming them; the oldest are dropped first.
+NOTIFICATION_QUEUE_SIZE = 10000
+
+
+def _graph_time(moment: datetime) -> str:
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.0000000Z")
+
+
+def _parse_graph_time(value: str) -> datetime:
+    # Graph returns up to 7 fractional digits, more than fromisoformat accepts before 3.11.
+    value = value.rstrip("Z")
+    if "." in value:
+        whole, fraction = value.split(".", 1)
+        value = f"{whole}.{fraction[:6]}"
+    return datetime.fromisoformat(value).replace(tzinfo=timezone.utc)
+
+
+class NotificationQueue:
+    """
+    Bounded FIFO of change notifications that can be awaited from any thread or
+    event loop.
+    """
+
+    def __init__(self, maxsize: int = NOTIFICATION_QUEUE_SIZE) -> None:
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: deque[dict[str, Any]] = deque()
+        self._condition = threading.Condition()
+        self._waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._items)
+
+    def put(self, item: dict[str, Any]) -> None:
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify_all()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def drain(self, limit: Optional[int] = None) -> list[dict[str, Any]]:
+        with self._condition:
+            count = len(self._items) if limit is None else min(limit, len(self._items))
+            return [self._items.popleft() for _ in range(count)]
+
+    def get(self, timeout: Optional[float] = None, limit: Optional[int] = None) -> list[dict[str, Any]]:
+        """
+        Blocks until at least one notification is queued or timeout elapses, then
+        returns up to limit of them (an empty list on timeout).
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._items, timeout)
+        return self.drain(limit)
+
+    async def get_async(self, timeout: Optional[float] = None, limit: Optional[int] = None) -> list[dict[str, Any]]:
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            with self._condition:
+                if self._items:
+                    break
+                future = loop.create_future()
+                self._waiters.append((loop, future))
+            remaining = None if deadline is None else deadline - loop.time()
+            if remaining is not None and remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                break
+            finally:
+                with self._condition:
+                    if (loop, future) in self._waiters:
+                        self._waiters.remove((loop, future))
+        return self.drain(limit)
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _NotificationHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: "_ReceiverServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, body: bytes = b"", content_type: str = "text/plain") -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self) -> None:
+        receiver = self.server.receiver
+        parsed = urlparse(self.path)
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length) if length else b""
+        if parsed.path.rstrip("/") != receiver.path.rstrip("/"):
+            self._reply(404)
+            return
+        # Subscription validation: echo the (URL-decoded) token back as plain text.
+        token = parse_qs(parsed.query).get("validationToken")
+        if token:
+            self._reply(200, token[0].encode("utf-8"))
+            return
+        try:
+            notifications = json.loads(payload).get("value") or []
+        except (ValueError, AttributeError):
+            self._reply(400)
+            return
+        receiver.accept(notifications)
+        self._reply(202)
+
+
+class _ReceiverServer(ThreadingHTTPServer):
+    daemon_threads = True
+    receiver: "NotificationReceiver"
+
+
+class NotificationReceiver:
+    """
+    Local HTTP endpoint for Graph change notifications.
+
+    Args:
+        client_state: Secret echoed by Graph in every notification; notifications
+            carrying any other value are rejected.
+        queue: Where accepted notifications are put.
+        host: Interface to listen on.
+        port: Port to listen on; 0 picks a free one.
+        path: URL path notifications are POSTed to.
+    """
+
+    def __init__(
+        self,
+        client_state: str,
+        queue: NotificationQueue,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        path: str = "/notifications",
+    ) -> None:
+        self.client_state = client_state
+        self.queue = queue
+        self.host = host
+        self.port = port
+        self.path = path
+        self.accepted = 0
+        self.rejected = 0
+        self._server: Optional[_ReceiverServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.path}"
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    def start(self) -> "NotificationReceiver":
+        if self._server is None:
+            self._server = _ReceiverServer((self.host, self.port), _NotificationHandler)
+            self._server.receiver = self
+            self.port = self._server.server_address[1]
+            self._thread = threading.Thread(target=self._server.serve_forever, name="outlook-notifications", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            self._thread = None
+
+    def accept(self, notifications: list[dict[str, Any]]) -> int:
+        """
+        Queues notifications whose clientState matches. Returns the number accepted.
+        """
+        accepted = 0
+        for notification in notifications:
+            state = notification.get("clientState") or ""
+            if not hmac.compare_digest(state.encode("utf-8"), self.client_state.encode("utf-8")):
+                self.rejected += 1
+                logger.warning(f"Rejected change notification for subscription {notification.get('subscriptionId')}")
+                continue
+            resource_data = notification.get("resourceData") or {}
+            self.queue.put(
+                {
+                    "subscription_id": notification.get("subscriptionId"),
+                    "change_type": notification.get("changeType"),
+                    "resource": notification.get("resource"),
+                    "message_id": resource_data.get("id"),
+                    "received_at": time.time(),
+                }
+            )
+            accepted += 1
+        self.accepted += accepted
+        return accepted
+
+
+class SubscriptionManager:
+    """
+    Creates, renews and deletes Graph subscriptions.
+
+    Args:
+        client: Returns the authenticated Graph client to use for each call.
+        base_url: The Graph endpoint, e.g. https://graph.microsoft.com/v1.0.
+        lifetime: Requested lifetime of new and renewed subscriptions.
+        renew_before: Renew subscriptions expiring within this window.
+    """
+
+    def __init__(
+        self,
+        client: Callable[[], Any],
+        base_url: str,
+        lifetime: timedelta = SUBSCRIPTION_LIFETIME,
+        renew_before: timedelta = RENEW_BEFORE,
+    ) -> None:
+        self._client = client
+        self.base_url = base_url
+        self.lifetime = lifetime
+        self.renew_before = renew_before
+        self.client_state = secrets.token_urlsafe(24)
+        self.subscriptions: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._renewer: Optional[threading.Thread] = None
+
+    def create(self, resource: str, notification_url: str, change_type: str = "created") -> dict[str, Any]:
+        response = self._client().post(
+            f"{self.base_url}/subscriptions",
+            json={
+                "changeType": change_type,
+                "notificationUrl": notification_url,
+                "resource": resource,
+                "expirationDateTime": _graph_time(datetime.now(timezone.utc) + self.lifetime),
+                "clientState": self.client_state,
+            },
+        )
+        response.raise_for_status()
+        subscription = response.json()
+        with self._lock:
+            self.subscriptions[subscription["id"]] = subscription
+        return subscription
+
+    def renew(self, subscription_id: str) -> dict[str, Any]:
+        response = self._client().patch(
+            f"{self.base_url}/subscriptions/{subscription_id}",
+            json={"expirationDateTime": _graph_time(datetime.now(timezone.utc) + self.lifetime)},
+        )
+        response.raise_for_status()
+        subscription = response.json()
+        with self._lock:
+            self.subscriptions[subscription_id] = {**self.subscriptions.get(subscription_id, {}), **subscription}
+        return subscription
+
+    def delete(self, subscription_id: str) -> None:
+        response = self._client().delete(f"{self.base_url}/subscriptions/{subscription_id}")
+        if response.status_code != 404:
+            response.raise_for_status()
+        with self._lock:
+            self.subscriptions.pop(subscription_id, None)
+
+    def renew_due(self) -> list[str]:
+        """
+        Renews every subscription expiring within renew_before. Subscriptions Graph no
+        longer knows about are forgotten. Returns the ids renewed.
+        """
+        cutoff = datetime.now(timezone.utc) + self.renew_before
+        with self._lock:
+            due = [
+                subscription_id
+                for subscription_id, subscription in self.subscriptions.items()
+                if _parse_graph_time(subscription["expirationDateTime"]) <= cutoff
+            ]
+        renewed = []
+        for subscription_id in due:
+            try:
+                self.renew(subscription_id)
+                renewed.append(subscription_id)
+            except Exception as e:
+                status = getattr(getattr(e, "response", None), "status_code", None)
+                if status == 404:
+                    with self._lock:
+                        self.subscriptions.pop(subscription_id, None)
+                logger.warning(f"Failed to renew subscription {subscription_id}: {e}")
+        return renewed
+
+    def start_auto_renew(self, interval: float = RENEW_INTERVAL) -> None:
+        if self._renewer is not None:
+            return
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.renew_due()
+
+        self._renewer = threading.Thread(target=run, name="outlook-subscription-renewer", daemon=True)
+        self._renewer.start()
+
+    def stop_auto_renew(self) -> None:
+        self._stop.set()
+        if self._renewer is not None:
+            self._renewer.join(timeout=5)
+            self._renewer = None
@@ -0,0 +1,385 @@
+"""
+Retry and client-side rate limiting for Microsoft Graph requests.
+
+Graph answers throttled requests with 429 (and overloaded ones with 503/504), usually
+with a Retry-After header. The transports in this module sit underneath OutlookApp's
+HTTP clients. They keep each mailbox within Exchange's limits (10,000 requests per
+10 minutes and 4 concurrent requests) and retry throttled requests with exponential
+backoff and jitter. Non-idempotent requests such as sendMail or reply are only retried
+on 429, which Graph returns before doing any work. Exchange counts each sub-request of
+a $batch against its own mailbox, so a batch is charged per sub-request too.
+"""
+
+import asyncio
+import contextlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import httpx
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+
+
+@dataclass
+class ThrottlingConfig:
+    """
+    Per-app retry and rate-limit settings.
+
+    Attributes:
+        max_retries: Retries after the first attempt before the response is returned as-is.
+        backoff_base: Delay in seconds before the first retry when there is no Retry-After.
+        backoff_max: Upper bound for a single backoff or Retry-After delay.
+        jitter: Fraction of the backoff delay that is randomised.
+        retry_statuses: Statuses retried for idempotent requests.
+        requests_per_window: Requests allowed per mailbox within window_seconds.
+        window_seconds: Length of the rate-limit window.
+        max_concurrent_per_mailbox: Requests allowed in flight per mailbox.
+        max_slots_per_request: Concurrency slots a single request may hold in one mailbox.
+            A $batch holds min(sub-requests, this) slots per mailbox, so with the default
+            of 1 several batches to one mailbox run side by side and Graph's 429s for
+            sub-requests beyond the mailbox limit are retried per sub-request.
+    """
+
+    max_retries: int = 5
+    backoff_base: float = 1.0
+    backoff_max: float = 60.0
+    jitter: float = 0.5
+    retry_statuses: frozenset[int] = frozenset({429, 503, 504})
+    requests_per_window: int = 10_000
+    window_seconds: float = 600.0
+    max_concurrent_per_mailbox: int = 4
+    max_slots_per_request: int = 1
+
+
+@dataclass
+class ThrottlingStats:
+    """
+    Counters describing how much retrying and waiting the transports have done.
+    """
+
+    requests: int = 0
+    retries: int = 0
+    throttled_responses: int = 0
+    retry_wait_seconds: float = 0.0
+    rate_limit_wait_seconds: float = 0.0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    def add(self, **deltas: float) -> None:
+        with self._lock:
+            for name, delta in deltas.items():
+                setattr(self, name, getattr(self, name) + delta)
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "throttled_responses": self.throttled_responses,
+                "retry_wait_seconds": round(self.retry_wait_seconds, 3),
+                "rate_limit_wait_seconds": round(self.rate_limit_wait_seconds, 3),
+            }
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. reserve() takes a token immediately and returns how long
+    the caller must wait before using it, so sync and async callers can share a bucket.
+    """
+
+    def __init__(self, capacity: int, window_seconds: float) -> None:
+        self.capacity = capacity
+        self.rate = capacity / window_seconds
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: int = 1) -> float:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class MailboxLimiter:
+    """
+    Holds one token bucket and one concurrency gate per mailbox.
+    """
+
+    def __init__(self, config: ThrottlingConfig) -> None:
+        self.config = config
+        self._buckets: dict[str, TokenBucket] = {}
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._async_semaphores: dict[tuple[int, str], asyncio.Semaphore] = {}
+        self._acquire_locks: dict[str, threading.Lock] = {}
+        self._async_acquire_locks: dict[tuple[int, str], asyncio.Lock] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, mailbox: str) -> TokenBucket:
+        with self._lock:
+            if mailbox not in self._buckets:
+                self._buckets[mailbox] = TokenBucket(
+                    self.config.requests_per_window, self.config.window_seconds
+                )
+            return self._buckets[mailbox]
+
+    def semaphore(self, mailbox: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if mailbox not in self._semaphores:
+                self._semaphores[mailbox] = threading.BoundedSemaphore(
+                    self.config.max_concurrent_per_mailbox
+                )
+            return self._semaphores[mailbox]
+
+    def async_semaphore(self, mailbox: str) -> asyncio.Semaphore:
+        # asyncio primitives belong to one event loop, so they are keyed by it.
+        key = (id(asyncio.get_running_loop()), mailbox)
+        with self._lock:
+            if key not in self._async_semaphores:
+                self._async_semaphores[key] = asyncio.Semaphore(
+                    self.config.max_concurrent_per_mailbox
+                )
+            return self._async_semaphores[key]
+
+    def _acquire_lock(self, mailbox: str) -> threading.Lock:
+        with self._lock:
+            if mailbox not in self._acquire_locks:
+                self._acquire_locks[mailbox] = threading.Lock()
+            return self._acquire_locks[mailbox]
+
+    def _async_acquire_lock(self, mailbox: str) -> asyncio.Lock:
+        key = (id(asyncio.get_running_loop()), mailbox)
+        with self._lock:
+            if key not in self._async_acquire_locks:
+                self._async_acquire_locks[key] = asyncio.Lock()
+            return self._async_acquire_locks[key]
+
+    def reserve(self, charges: dict[str, int]) -> float:
+        """
+        Takes each mailbox's tokens for a request and returns how long to wait before
+        sending it.
+        """
+        return max(self.bucket(mailbox).reserve(count) for mailbox, count in charges.items())
+
+    def _slots(self, charges: dict[str, int]) -> list[tuple[str, int]]:
+        limit = max(1, min(self.config.max_slots_per_request, self.config.max_concurrent_per_mailbox))
+        return [(mailbox, min(count, limit)) for mailbox, count in sorted(charges.items())]
+
+    @contextlib.contextmanager
+    def hold(self, charges: dict[str, int]) -> Iterator[None]:
+        """
+        Holds concurrency slots in each charged mailbox, one per charged request up to
+        max_slots_per_request. Mailboxes are taken in sorted order, and several slots in
+        one mailbox are taken under that mailbox's own lock, so two batches never each
+        hold part of an allowance while waiting for the rest, and a batch waiting on a
+        busy mailbox never holds up requests to other mailboxes.
+        """
+        acquired: list[threading.BoundedSemaphore] = []
+        try:
+            for mailbox, count in self._slots(charges):
+                semaphore = self.semaphore(mailbox)
+                with self._acquire_lock(mailbox) if count > 1 else contextlib.nullcontext():
+                    for _ in range(count):
+                        semaphore.acquire()
+                        acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+
+    @contextlib.asynccontextmanager
+    async def hold_async(self, charges: dict[str, int]) -> AsyncIterator[None]:
+        """
+        Async counterpart of hold.
+        """
+        acquired: list[asyncio.Semaphore] = []
+        try:
+            for mailbox, count in self._slots(charges):
+                semaphore = self.async_semaphore(mailbox)
+                async with self._async_acquire_lock(mailbox) if count > 1 else contextlib.nullcontext():
+                    for _ in range(count):
+                        await semaphore.acquire()
+                        acquired.append(semaphore)
+            yield
+        finally:
+            for semaphore in acquired:
+                semaphore.release()
+
+
+def _path_mailbox(segments: list[str]) -> str:
+    # segments follow the API version: ['users', '{id}', ...] or ['me', ...].
+    if len(segments) >= 2 and segments[0] == "users":
+        return segments[1].lower()
+    if segments and segments[0] == "me":
+        return "me"
+    return ""
+
+
+def mailbox_key(url: httpx.URL) -> str:
+    """
+    Returns the mailbox a Graph URL addresses: the user segment of /users/{id}/...,
+    'me' for /me/..., or '' for requests that are not mailbox-scoped such as $batch.
+    """
+    return _path_mailbox(url.path.strip("/").split("/")[1:])
+
+
+def request_charges(request: httpx.Request) -> dict[str, int]:
+    """
+    Returns how many requests to charge to each mailbox: one to the mailbox the URL
+    addresses, or for a $batch one per sub-request to the mailbox its 'url' addresses.
+    """
+    if request.method != "POST" or not request.url.path.endswith("/$batch"):
+        return {mailbox_key(request.url): 1}
+    try:
+        subrequests = json.loads(request.content).get("requests", [])
+    except (ValueError, AttributeError, httpx.RequestNotRead):
+        return {"": 1}
+    charges: dict[str, int] = {}
+    for subrequest in subrequests:
+        mailbox = _path_mailbox(httpx.URL(str(subrequest.get("url", ""))).path.strip("/").split("/"))
+        charges[mailbox] = charges.get(mailbox, 0) + 1
+    return charges or {"": 1}
+
+
+def parse_retry_after(response: httpx.Response) -> Optional[float]:
+    value = response.headers.get("Retry-After")
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class _RetryPolicy:
+    def __init__(self, config: ThrottlingConfig, stats: ThrottlingStats) -> None:
+        self.config = config
+        self.stats = stats
+
+    def should_retry(self, request: httpx.Request, status: Optional[int], attempt: int) -> bool:
+        """
+        status is None when the request failed at the transport level. Non-idempotent
+        requests are retried only on 429, never after a connection error or 5xx where
+        the server may already have acted on them.
+        """
+        if attempt >= self.config.max_retries:
+            return False
+        if request.method in IDEMPOTENT_METHODS:
+            return status is None or status in self.config.retry_statuses
+        return status == 429
+
+    def delay(self, attempt: int, response: Optional[httpx.Response]) -> float:
+        backoff = min(self.config.backoff_max, self.config.backoff_base * 2**attempt)
+        backoff *= 1 - self.config.jitter * random.random()
+        retry_after = parse_retry_after(response) if response is not None else None
+        if retry_after is not None:
+            backoff = max(backoff, min(retry_after, self.config.backoff_max))
+        return backoff
+
+
+class ThrottlingTransport(httpx.BaseTransport):
+    """
+    Sync transport wrapper adding per-mailbox rate limiting and throttling retries.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.BaseTransport,
+        limiter: MailboxLimiter,
+        stats: ThrottlingStats,
+    ) -> None:
+        self._transport = transport
+        self._limiter = limiter
+        self._stats = stats
+        self._policy = _RetryPolicy(limiter.config, stats)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        charges = request_charges(request)
+        attempt = 0
+        while True:
+            wait = self._limiter.reserve(charges)
+            if wait:
+                self._stats.add(rate_limit_wait_seconds=wait)
+                time.sleep(wait)
+            self._stats.add(requests=1)
+            response = None
+            with self._limiter.hold(charges):
+                try:
+                    response = self._transport.handle_request(request)
+                except httpx.TransportError:
+                    if not self._policy.should_retry(request, None, attempt):
+                        raise
+            if response is not None:
+                if response.status_code == 429:
+                    self._stats.add(throttled_responses=1)
+                if not self._policy.should_retry(request, response.status_code, attempt):
+                    return response
+                response.read()
+                response.close()
+            delay = self._policy.delay(attempt, response)
+            self._stats.add(retries=1, retry_wait_seconds=delay)
+            time.sleep(delay)
+            attempt += 1
+
+    def close(self) -> None:
+        self._transport.close()
+
+
+class AsyncThrottlingTransport(httpx.AsyncBaseTransport):
+    """
+    Async counterpart of ThrottlingTransport sharing the same limiter and stats.
+    """
+
+    def __init__(
+        self,
+        transport: httpx.AsyncBaseTransport,
+        limiter: MailboxLimiter,
+        stats: ThrottlingStats,
+    ) -> None:
+        self._transport = transport
+        self._limiter = limiter
+        self._stats = stats
+        self._policy = _RetryPolicy(limiter.config, stats)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        charges = request_charges(request)
+        attempt = 0
+        while True:
+            wait = self._limiter.reserve(charges)
+            if wait:
+                self._stats.add(rate_limit_wait_seconds=wait)
+                await asyncio.sleep(wait)
+            self._stats.add(requests=1)
+            response = None
+            async with self._limiter.hold_async(charges):
+                try:
+                    response = await self._transport.handle_async_request(request)
+                except httpx.TransportError:
+                    if not self._policy.should_retry(request, None, attempt):
+                        raise
+            if response is not None:
+                if response.status_code == 429:
+                    self._stats.add(throttled_responses=1)
+                if not self._policy.should_retry(request, response.status_code, attempt):
+                    return response
+                await response.aread()
+                await response.aclose()
+            delay = self._policy.delay(attempt, response)
+            self._stats.add(retries=1, retry_wait_seconds=delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
@@ -0,0 +1,165 @@
+"""
+Precomputed tool metadata for fast MCP server registration.
+
+Registering a tool normally parses its docstring and builds a pydantic model of its
+arguments to derive the JSON schema, which costs about 100 ms for this app's tools at
+every server start. tool_manifest.json stores that metadata; ManifestToolManager
+registers tools from it and only builds a tool's argument model on its first call.
+
+Entries are keyed by a fingerprint of the tool's name, signature and docstring, and
+cover both the sync and async tool sets. A tool changed since the manifest was
+generated finds no entry and is registered the slow way rather than with a wrong
+schema. Regenerate the manifest after changing a tool with
+
+    python -m universal_mcp_outlook.tool_manifest
+"""
+
+import hashlib
+import inspect
+import json
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from loguru import logger
+from universal_mcp.applications import BaseApplication
+from universal_mcp.tools.func_metadata import FuncMetadata
+from universal_mcp.tools.manager import (
+    DEFAULT_IMPORTANT_TAG,
+    TOOL_NAME_SEPARATOR,
+    ToolManager,
+    _filter_by_name,
+    _filter_by_tags,
+)
+from universal_mcp.tools.tools import Tool
+from universal_mcp.utils.docstring_parser import parse_docstring
+
+MANIFEST_PATH = Path(__file__).with_name("tool_manifest.json")
+
+# Tool fields stored in the manifest; fn, fn_metadata and is_async come from the function.
+MANIFEST_FIELDS = (
+    "description",
+    "args_description",
+    "returns_description",
+    "raises_description",
+    "tags",
+    "parameters",
+)
+
+
+def fingerprint(fn: Callable[..., Any]) -> str:
+    """
+    Hashes what a tool's metadata is derived from: its name, signature and docstring.
+    """
+    source = f"{fn.__name__}{inspect.signature(fn)}\n{inspect.getdoc(fn) or ''}"
+    return hashlib.sha256(source.encode()).hexdigest()[:16]
+
+
+def build_manifest(tools: list[Callable[..., Any]]) -> dict[str, Any]:
+    """
+    Computes the manifest entries for tools the same way Tool.from_function does.
+    """
+    entries = {}
+    for fn in tools:
+        tool = Tool.from_function(fn)
+        entries[fingerprint(fn)] = {
+            "name": tool.name,
+            **{field: getattr(tool, field) for field in MANIFEST_FIELDS},
+        }
+    return {"tools": entries}
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> dict[str, Any]:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        logger.warning(f"Could not read tool manifest {path}: {e}")
+        return {"tools": {}}
+
+
+class ManifestTool(Tool):
+    """
+    A Tool registered from the manifest; its argument model is built on the first call.
+    """
+
+    fn_metadata: Optional[FuncMetadata] = None
+
+    async def run(self, arguments: dict[str, Any], context: Optional[dict[str, Any]] = None) -> Any:
+        if self.fn_metadata is None:
+            parsed = parse_docstring(inspect.getdoc(self.fn))
+            self.fn_metadata = FuncMetadata.func_metadata(self.fn, arg_description=parsed["args"])
+        return await super().run(arguments, context)
+
+
+class ManifestToolManager(ToolManager):
+    """
+    ToolManager that registers an app's tools from precomputed metadata, falling back
+    to Tool.from_function for tools missing from the manifest or changed since it was
+    generated.
+
+    ToolManager.register_tools_from_app has no hook for building the Tool, so the
+    override mirrors its body and filtering from universal-mcp 0.1.23, which
+    pyproject.toml pins exactly. tests/test_tool_manifest.py fails when the upstream
+    method or its filters change, so the copy is re-synced when the pin is bumped.
+    """
+
+    def __init__(self, manifest: Optional[dict[str, Any]] = None, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.manifest = load_manifest() if manifest is None else manifest
+        # Names of tools registered the slow way, for spotting a stale manifest.
+        self.manifest_misses: list[str] = []
+
+    def tool_from_function(self, fn: Callable[..., Any]) -> Tool:
+        entry = self.manifest.get("tools", {}).get(fingerprint(fn))
+        if entry is None:
+            self.manifest_misses.append(fn.__name__)
+            return Tool.from_function(fn)
+        return ManifestTool(
+            fn=fn,
+            name=fn.__name__,
+            is_async=inspect.iscoroutinefunction(fn),
+            **{field: entry[field] for field in MANIFEST_FIELDS},
+        )
+
+    def register_tools_from_app(
+        self,
+        app: BaseApplication,
+        tool_names: Optional[list[str]] = None,
+        tags: Optional[list[str]] = None,
+    ) -> None:
+        tools = []
+        for function in app.list_tools():
+            try:
+                tool = self.tool_from_function(function)
+            except Exception as e:
+                name = getattr(function, "__name__", "unknown")
+                logger.error(f"Failed to create Tool from '{name}' in {app.name}: {e}")
+                continue
+            tool.name = f"{app.name}{TOOL_NAME_SEPARATOR}{tool.name}"
+            if app.name not in tool.tags:
+                tool.tags.append(app.name)
+            tools.append(tool)
+        if self.manifest_misses:
+            logger.info(
+                f"Tool manifest is stale for {self.manifest_misses}; regenerate it with "
+                "`python -m universal_mcp_outlook.tool_manifest`"
+            )
+
+        if tags:
+            tools = _filter_by_tags(tools, tags)
+        if tool_names:
+            tools = _filter_by_name(tools, tool_names)
+        if not tool_names and not tags:
+            tools = _filter_by_tags(tools, [DEFAULT_IMPORTANT_TAG])
+        self.register_tools(tools, app_name=app.name)
+
+
+def main() -> None:
+    from universal_mcp_outlook.app import OutlookApp
+
+    manifest = build_manifest(OutlookApp().list_tools() + OutlookApp(async_tools=True).list_tools())
+    MANIFEST_PATH.write_text(json.dumps(manifest, indent=2) + "\n", encoding="utf-8")
+    print(f"Wrote {len(manifest['tools'])} tool variants to {MANIFEST_PATH}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""
+Attachment sources and resumable chunked uploads to Graph upload sessions.
+
+Graph accepts attachments inline (base64 in the message JSON) only up to 3 MB. Anything
+larger has to go through /attachments/createUploadSession, which returns a pre-authorised
+URL that takes the file in byte ranges. Files are read through mmap and uploaded one
+range at a time, so the full payload is never held in memory.
+"""
+
+import io
+import mimetypes
+import mmap
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, BinaryIO, Callable, Iterator, Optional
+
+import httpx
+from loguru import logger
+
+# Graph's limit for attachments sent inline in a message or attachment POST.
+INLINE_ATTACHMENT_LIMIT = 3 * 1024 * 1024
+
+# Upload ranges must be multiples of 320 KiB; 10 of them keeps each PUT around 3 MiB.
+UPLOAD_CHUNK_SIZE = 10 * 320 * 1024
+
+UPLOAD_MAX_RETRIES = 5
+UPLOAD_RETRY_BACKOFF = 1.0
+
+ProgressCallback = Callable[[str, int, int], None]
+
+
+class AttachmentSource:
+    """
+    A file attachment that can be read either whole or by byte range.
+
+    Build one with from_path, from_bytes or from_stream.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        size: int,
+        content_type: Optional[str],
+        opener: Callable[[], Any],
+    ) -> None:
+        self.name = name
+        self.size = size
+        self.content_type = content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+        self._opener = opener
+
+    @classmethod
+    def from_path(cls, path: str | os.PathLike, name: Optional[str] = None, content_type: Optional[str] = None) -> "AttachmentSource":
+        path = os.fspath(path)
+        if not os.path.isfile(path):
+            raise ValueError(f"Attachment file '{path}' does not exist.")
+
+        @contextmanager
+        def opener() -> Iterator[Any]:
+            with open(path, "rb") as file:
+                if os.fstat(file.fileno()).st_size == 0:
+                    yield memoryview(b"")
+                    return
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                    view = memoryview(mapped)
+                    try:
+                        yield view
+                    finally:
+                        view.release()
+
+        return cls(name or os.path.basename(path), os.path.getsize(path), content_type, opener)
+
+    @classmethod
+    def from_bytes(cls, name: str, data: bytes, content_type: Optional[str] = None) -> "AttachmentSource":
+        @contextmanager
+        def opener() -> Iterator[Any]:
+            yield memoryview(data)
+
+        return cls(name, len(data), content_type, opener)
+
+    @classmethod
+    def from_stream(
+        cls,
+        name: str,
+        stream: BinaryIO,
+        size: Optional[int] = None,
+        content_type: Optional[str] = None,
+    ) -> "AttachmentSource":
+        """
+        Wraps a binary file object. Seekable streams can be resumed at any offset;
+        for unseekable ones the size must be given and ranges must be read in order.
+        """
+        if size is None:
+            if not stream.seekable():
+                raise ValueError(f"Size is required for unseekable attachment stream '{name}'.")
+            start = stream.tell()
+            size = stream.seek(0, io.SEEK_END) - start
+            stream.seek(start)
+        origin = stream.tell() if stream.seekable() else 0
+
+        @contextmanager
+        def opener() -> Iterator[Any]:
+            yield _StreamRanges(stream, origin)
+
+        return cls(name, size, content_type, opener)
+
+    @contextmanager
+    def open(self) -> Iterator[Any]:
+        """
+        Yields an object supporting slicing by byte range, e.g. view[start:end].
+        """
+        with self._opener() as ranges:
+            yield ranges
+
+    def read_all(self) -> bytes:
+        with self.open() as ranges:
+            return bytes(ranges[0 : self.size])
+
+
+class _StreamRanges:
+    def __init__(self, stream: BinaryIO, origin: int) -> None:
+        self._stream = stream
+        self._origin = origin
+        self._position = 0
+
+    def __getitem__(self, key: slice) -> bytes:
+        start, stop = key.start or 0, key.stop
+        if start != self._position:
+            if not self._stream.seekable():
+                raise ValueError("Cannot rewind an unseekable attachment stream.")
+            self._stream.seek(self._origin + start)
+        data = self._stream.read(stop - start)
+        self._position = start + len(data)
+        return data
+
+
+def _next_offset(session_state: dict[str, Any], default: int) -> int:
+    ranges = session_state.get("nextExpectedRanges") or []
+    if not ranges:
+        return default
+    return int(str(ranges[0]).split("-")[0])
+
+
+def upload_in_chunks(
+    client: httpx.Client,
+    upload_url: str,
+    source: AttachmentSource,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    progress: Optional[ProgressCallback] = None,
+) -> dict[str, Any]:
+    """
+    Uploads a source to a Graph upload session in byte ranges.
+
+    After a connection error or 5xx the session is queried for nextExpectedRanges and
+    the upload resumes from the first missing byte, up to UPLOAD_MAX_RETRIES times in
+    a row. The upload URL is pre-authorised, so the client must not send the Graph
+    bearer token.
+
+    Returns:
+        dict[str, Any]: The final response body from the upload session, if any.
+    """
+    if chunk_size % (320 * 1024):
+        raise ValueError("chunk_size must be a multiple of 320 KiB.")
+    offset = 0
+    failures = 0
+    with source.open() as ranges:
+        while offset < source.size:
+            end = min(offset + chunk_size, source.size)
+            try:
+                response = client.put(
+                    upload_url,
+                    content=bytes(ranges[offset:end]),
+                    headers={
+                        "Content-Type": "application/octet-stream",
+                        "Content-Range": f"bytes {offset}-{end - 1}/{source.size}",
+                    },
+                )
+                if response.status_code >= 500:
+                    response.raise_for_status()
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                failures += 1
+                if failures > UPLOAD_MAX_RETRIES:
+                    raise
+                logger.warning(f"Upload of '{source.name}' failed at byte {offset}, resuming: {e}")
+                time.sleep(UPLOAD_RETRY_BACKOFF * 2 ** (failures - 1))
+                state = client.get(upload_url)
+                state.raise_for_status()
+                offset = _next_offset(state.json(), offset)
+                continue
+            response.raise_for_status()
+            failures = 0
+            body = response.json() if response.content else {}
+            offset = _next_offset(body, end) if response.status_code == 202 else end
+            if progress:
+                progress(source.name, offset, source.size)
+            if response.status_code in (200, 201):
+                return body
+    return {}
@@ -1,11 +1,18 @@
+import asyncio
+import inspect
+import json
+import threading
 from unittest.mock import MagicMock
 
+import httpx
 import pytest
 from universal_mcp.utils.testing import (
     check_application_instance,
 )
 
 from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.stores import SQLiteStore
+from universal_mcp_outlook.throttling import ThrottlingConfig
 
 @pytest.fixture
 def app_instance():
@@ -13,5 +20,398 @@ def app_instance():
     mock_integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
     return OutlookApp(integration=mock_integration)
 
+
+def make_app(handler, token="dummy_access_token", **kwargs):
+    client = httpx.Client(
+        transport=httpx.MockTransport(handler),
+        headers={"Authorization": f"Bearer {token}"},
+    )
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": token}
+    return OutlookApp(integration=integration, client=client, **kwargs)
+
+
 def test_application(app_instance):
     check_application_instance(app_instance, app_name="outlook")
+
+
+def test_user_id_is_resolved_once_per_ttl():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/me"):
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        return httpx.Response(200, json={"value": []})
+
+    app = make_app(handler)
+    app.user_list_message()
+    app.user_list_message()
+    assert calls.count("/v1.0/me") == 1
+    assert "/v1.0/users/alice@contoso.com/messages" in calls
+    assert (app.user_id_cache_hits, app.user_id_cache_misses) == (1, 1)
+
+
+def test_user_id_cache_is_single_flight_and_keyed_by_token():
+    calls = []
+    lock = threading.Lock()
+
+    def handler(request):
+        if request.url.path.endswith("/me"):
+            with lock:
+                calls.append(request.headers["Authorization"])
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        return httpx.Response(200, json={})
+
+    app = make_app(handler)
+    threads = [threading.Thread(target=app._resolve_user_id) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+
+    app.integration.get_credentials.return_value = {"access_token": "rotated"}
+    app._resolve_user_id()
+    app._resolve_user_id()
+    assert calls == ["Bearer dummy_access_token", "Bearer rotated"]
+
+
+def paged_handler(total, page_size):
+    """Serves `total` messages in pages of `page_size` linked by @odata.nextLink."""
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        if request.url.path.endswith("/me"):
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        start = int(request.url.params.get("$skiptoken", 0))
+        end = min(start + page_size, total)
+        body = {"value": [{"id": str(i)} for i in range(start, end)]}
+        if end < total:
+            body["@odata.nextLink"] = (
+                "https://graph.microsoft.com/v1.0/users/alice@contoso.com/messages"
+                f"?%24top={page_size}&%24skiptoken={end}"
+            )
+        return httpx.Response(200, json=body)
+
+    handler.requests = requests
+    return handler
+
+
+@pytest.mark.parametrize("prefetch", [False, True])
+def test_iter_messages_follows_next_links(prefetch):
+    handler = paged_handler(total=25, page_size=10)
+    app = make_app(handler)
+    ids = [m["id"] for m in app.iter_messages(page_size=10, prefetch=prefetch)]
+    assert ids == [str(i) for i in range(25)]
+
+
+def test_iter_messages_respects_bounds():
+    handler = paged_handler(total=100, page_size=10)
+    app = make_app(handler)
+    assert len(list(app.iter_messages(page_size=10, max_pages=2))) == 20
+    assert len(list(app.iter_messages(page_size=10, max_items=15))) == 15
+    with pytest.raises(ValueError):
+        list(app.iter_messages(page_size=1001))
+
+
+def test_list_messages_page_returns_compact_cursor():
+    handler = paged_handler(total=15, page_size=10)
+    app = make_app(handler)
+    first = app.list_messages_page(top=10)
+    assert len(first["value"]) == 10
+    assert len(first["cursor"]) < 16
+    second = app.list_messages_page(cursor=first["cursor"])
+    assert [m["id"] for m in second["value"]] == [str(i) for i in range(10, 15)]
+    assert second["cursor"] is None
+    with pytest.raises(ValueError):
+        app.list_messages_page(cursor=first["cursor"])
+
+
+def test_list_messages_page_keeps_the_cursor_when_the_fetch_fails():
+    handler = paged_handler(total=15, page_size=10)
+    failures = [1]
+
+    def flaky(request):
+        if "$skiptoken" in request.url.params and failures:
+            failures.pop()
+            return httpx.Response(429, json={"error": {"code": "TooManyRequests"}})
+        return handler(request)
+
+    app = make_app(flaky, throttling=ThrottlingConfig(max_retries=0))
+    first = app.list_messages_page(top=10)
+    with pytest.raises(httpx.HTTPStatusError):
+        app.list_messages_page(cursor=first["cursor"])
+    second = app.list_messages_page(cursor=first["cursor"])
+    assert [m["id"] for m in second["value"]] == [str(i) for i in range(10, 15)]
+    with pytest.raises(ValueError):
+        app.list_messages_page(cursor=first["cursor"])
+
+
+def test_batch_delete_chunks_and_retries_only_failed(monkeypatch):
+    monkeypatch.setattr("universal_mcp_outlook.app.BATCH_RETRY_BACKOFF", 0)
+    batches = []
+    throttled = {"3"}
+
+    def handler(request):
+        body = json.loads(request.content)
+        batches.append([r["id"] for r in body["requests"]])
+        responses = []
+        for sub in body["requests"]:
+            if sub["id"] in throttled:
+                throttled.discard(sub["id"])
+                responses.append({"id": sub["id"], "status": 429, "headers": {"Retry-After": "0"}})
+            elif sub["id"] == "7":
+                responses.append(
+                    {"id": sub["id"], "status": 404, "body": {"error": {"code": "ErrorItemNotFound"}}}
+                )
+            else:
+                responses.append({"id": sub["id"], "status": 204})
+        return httpx.Response(200, json={"responses": responses})
+
+    app = make_app(handler)
+    ids = [f"m{i}" for i in range(45)]
+    result = app.batch_delete_messages(ids, user_id="alice@contoso.com")
+    assert [len(b) for b in batches] == [20, 1, 20, 5]
+    assert batches[1] == ["3"]
+    assert result["deleted"] == [m for m in ids if m != "m7"]
+    assert result["errors"] == {"m7": {"status": 404, "code": "ErrorItemNotFound", "message": None}}
+
+
+def test_batch_moves_are_not_retried_after_a_server_error(monkeypatch):
+    monkeypatch.setattr("universal_mcp_outlook.app.BATCH_RETRY_BACKOFF", 0)
+    sent = []
+
+    def handler(request):
+        body = json.loads(request.content)
+        sent.extend(r["id"] for r in body["requests"])
+        responses = []
+        for sub in body["requests"]:
+            if sub["id"] == "0" and sent.count("0") == 1:
+                responses.append({"id": sub["id"], "status": 503})
+            elif sub["id"] == "1" and sent.count("1") == 1:
+                responses.append({"id": sub["id"], "status": 429, "headers": {"Retry-After": "0"}})
+            else:
+                responses.append({"id": sub["id"], "status": 201, "body": {"id": f"moved-{sub['id']}"}})
+        return httpx.Response(200, json={"responses": responses})
+
+    app = make_app(handler)
+    result = app.batch_move_messages(["m0", "m1", "m2"], "archive", user_id="alice@contoso.com")
+    assert sent == ["0", "1", "2", "1"]
+    assert set(result["moved"]) == {"m1", "m2"}
+    assert result["errors"]["m0"]["status"] == 503
+
+
+def test_bulk_update_collects_ids_then_patches_in_parallel_batches():
+    patched = []
+    lock = threading.Lock()
+
+    def handler(request):
+        if request.url.path.endswith("/$batch"):
+            body = json.loads(request.content)
+            with lock:
+                patched.extend(body["requests"])
+            return httpx.Response(
+                200,
+                json={"responses": [{"id": r["id"], "status": 200, "body": {}} for r in body["requests"]]},
+            )
+        assert request.url.params["$filter"] == "isRead eq false"
+        assert request.url.params["$select"] == "id"
+        return httpx.Response(200, json={"value": [{"id": f"m{i}"} for i in range(50)]})
+
+    app = make_app(handler)
+    result = app.bulk_update_messages(
+        "isRead eq false", is_read=True, flag_status="complete", user_id="alice@contoso.com"
+    )
+    assert result == {"matched": 50, "succeeded": 50, "failed": 0, "errors": {}, "more_may_match": False}
+    assert len(patched) == 50
+    assert {r["method"] for r in patched} == {"PATCH"}
+    assert patched[0]["body"] == {"isRead": True, "flag": {"flagStatus": "complete"}}
+    with pytest.raises(ValueError):
+        app.bulk_update_messages("isRead eq false", user_id="alice@contoso.com")
+
+
+def test_bulk_delete_requires_filter_and_reports_errors():
+    def handler(request):
+        if request.url.path.endswith("/$batch"):
+            body = json.loads(request.content)
+            return httpx.Response(
+                200,
+                json={
+                    "responses": [
+                        {"id": r["id"], "status": 404 if r["id"] == "1" else 204} for r in body["requests"]
+                    ]
+                },
+            )
+        return httpx.Response(200, json={"value": [{"id": "a"}, {"id": "b"}, {"id": "c"}]})
+
+    events = []
+    app = make_app(handler)
+    app.message_hooks.append(lambda event, user, ids: events.append((event, ids)))
+    with pytest.raises(ValueError):
+        app.bulk_delete_messages("", user_id="alice@contoso.com")
+    result = app.bulk_delete_messages("isRead eq true", max_messages=3, user_id="alice@contoso.com")
+    assert (result["matched"], result["succeeded"], result["failed"]) == (3, 2, 1)
+    assert list(result["errors"]) == ["b"]
+    assert result["more_may_match"] is True
+    assert events == [("deleted", ["a", "c"])]
+
+
+def fanout_handler(request):
+    mailbox = request.url.path.split("/")[3]
+    if mailbox == "broken@contoso.com":
+        return httpx.Response(403, json={"error": {"code": "ErrorAccessDenied", "message": "Access is denied."}})
+    offset = {"a@contoso.com": 0, "b@contoso.com": 1}[mailbox]
+    return httpx.Response(
+        200,
+        json={
+            "value": [
+                {"id": f"{mailbox}-{day}", "receivedDateTime": f"2024-01-{day:02d}T00:00:00Z"}
+                for day in range(offset + 1, 10, 2)
+            ]
+        },
+    )
+
+
+def test_list_messages_across_merges_by_received_and_isolates_errors():
+    app = make_app(fanout_handler)
+    result = app.list_messages_across(
+        ["a@contoso.com", "b@contoso.com", "broken@contoso.com"], filter="isRead eq false", top=4
+    )
+    assert [m["receivedDateTime"][8:10] for m in result["value"]] == ["09", "08", "07", "06"]
+    assert [m["mailbox"] for m in result["value"]] == ["a@contoso.com", "b@contoso.com"] * 2
+    assert result["errors"] == {
+        "broken@contoso.com": {"status": 403, "code": "ErrorAccessDenied", "message": "Access is denied."}
+    }
+
+
+def test_search_across_async_quotes_query():
+    searches = []
+
+    async def handler(request):
+        searches.append(request.url.params["$search"])
+        assert "$orderby" not in request.url.params
+        return fanout_handler(request)
+
+    async def run():
+        integration = MagicMock()
+        integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
+        app = OutlookApp(
+            integration=integration,
+            async_client=httpx.AsyncClient(transport=httpx.MockTransport(handler)),
+        )
+        result = await app.search_across_async(["a@contoso.com", "b@contoso.com"], "overdue invoice", top=3)
+        await app.aclose()
+        return result
+
+    result = asyncio.run(run())
+    assert searches == ['"overdue invoice"'] * 2
+    assert [m["id"] for m in result["value"]] == ["a@contoso.com-9", "b@contoso.com-8", "a@contoso.com-7"]
+    assert result["errors"] == {}
+
+
+def test_chunk_batch_keeps_dependency_chains_together():
+    requests = [{"id": str(i), "method": "GET", "url": "/me"} for i in range(25)]
+    requests[19]["dependsOn"] = ["24"]
+    chunks = OutlookApp._chunk_batch(requests)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    chunk_of = {r["id"]: n for n, chunk in enumerate(chunks) for r in chunk}
+    assert chunk_of["19"] == chunk_of["24"]
+
+
+def test_async_tools_share_user_id_lookup():
+    calls = []
+
+    async def handler(request):
+        calls.append(request.url.path)
+        if request.url.path.endswith("/me"):
+            await asyncio.sleep(0.01)
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        return httpx.Response(200, json={"value": [{"id": "1"}]})
+
+    async def run():
+        integration = MagicMock()
+        integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
+        app = OutlookApp(
+            integration=integration,
+            async_client=httpx.AsyncClient(
+                transport=httpx.MockTransport(handler),
+                headers={"Authorization": "Bearer dummy_access_token"},
+            ),
+        )
+        results = await asyncio.gather(*(app.user_list_message_async(top=1) for _ in range(10)))
+        await app.aclose()
+        return results
+
+    results = asyncio.run(run())
+    assert all(r == {"value": [{"id": "1"}]} for r in results)
+    assert calls.count("/v1.0/me") == 1
+
+
+def test_async_tools_keep_original_names():
+    app = OutlookApp(integration=MagicMock(), async_tools=True)
+    tools = app.list_tools()
+    assert [t.__name__ for t in tools] == [t.__name__ for t in OutlookApp(integration=MagicMock()).list_tools()]
+    assert all(inspect.iscoroutinefunction(t) for t in tools)
+    check_application_instance(app, app_name="outlook")
+
+
+def test_sync_mail_folder_resumes_and_reports_changes():
+    base = "https://graph.microsoft.com/v1.0/users/alice@contoso.com/mailFolders/inbox/messages/delta"
+    pages = {
+        "initial": {"value": [{"id": "1"}], "@odata.nextLink": f"{base}?%24skiptoken=page2"},
+        "page2": {"value": [{"id": "2"}], "@odata.deltaLink": f"{base}?%24deltatoken=d1"},
+        "d1": {"value": [{"id": "1", "@removed": {"reason": "deleted"}}, {"id": "3"}],
+               "@odata.deltaLink": f"{base}?%24deltatoken=d2"},
+        "d2": {"value": [], "@odata.deltaLink": f"{base}?%24deltatoken=d2"},
+    }
+    requested = []
+
+    def handler(request):
+        token = request.url.params.get("$skiptoken") or request.url.params.get("$deltatoken") or "initial"
+        requested.append(token)
+        return httpx.Response(200, json=pages[token])
+
+    app = make_app(handler, sync_store=SQLiteStore(":memory:"))
+    first = app.sync_mail_folder(user_id="alice@contoso.com", max_pages=1)
+    assert ([m["id"] for m in first["changed"]], first["complete"]) == (["1"], False)
+
+    resumed = app.sync_mail_folder(user_id="alice@contoso.com")
+    assert ([m["id"] for m in resumed["changed"]], resumed["complete"]) == (["2"], True)
+
+    delta = app.sync_mail_folder(user_id="alice@contoso.com")
+    assert [m["id"] for m in delta["changed"]] == ["3"]
+    assert delta["removed"] == ["1"]
+
+    idle = app.sync_mail_folder(user_id="alice@contoso.com")
+    assert idle == {"folder_id": "inbox", "changed": [], "removed": [], "complete": True}
+    assert requested == ["initial", "page2", "d1", "d2"]
+
+
+def test_sync_mail_folder_keeps_its_link_until_a_round_is_returned():
+    base = "https://graph.microsoft.com/v1.0/users/alice@contoso.com/mailFolders/inbox/messages/delta"
+    pages = {
+        "initial": {"value": [{"id": "m1"}], "@odata.nextLink": f"{base}?%24skiptoken=p2"},
+        "p2": {"value": [{"id": "m2"}], "@odata.nextLink": f"{base}?%24skiptoken=p3"},
+        "p3": {"value": [{"id": "m3"}], "@odata.deltaLink": f"{base}?%24deltatoken=d1"},
+    }
+    failures = {"p3": 1}
+
+    def handler(request):
+        token = request.url.params.get("$skiptoken") or request.url.params.get("$deltatoken") or "initial"
+        if failures.get(token):
+            failures[token] -= 1
+            return httpx.Response(400, json={"error": {"code": "BadRequest"}})
+        return httpx.Response(200, json=pages[token])
+
+    app = make_app(handler, sync_store=SQLiteStore(":memory:"))
+    with pytest.raises(httpx.HTTPStatusError):
+        app.sync_mail_folder(user_id="alice@contoso.com")
+    retried = app.sync_mail_folder(user_id="alice@contoso.com")
+    assert [m["id"] for m in retried["changed"]] == ["m1", "m2", "m3"] and retried["complete"]
+
+    failures["p3"] = 1
+    with pytest.raises(httpx.HTTPStatusError):
+        app.index_mail_folder(user_id="alice@contoso.com")
+    assert app.index_mail_folder(user_id="alice@contoso.com")["indexed"] == 3
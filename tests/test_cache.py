@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import httpx
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.cache import ReadCache, cache_key
+
+
+def etag_handler():
+    seen = []
+
+    def handler(request):
+        seen.append((request.method, request.url.path, request.headers.get("If-None-Match")))
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        if request.headers.get("If-None-Match") == 'W/"v1"':
+            return httpx.Response(304)
+        return httpx.Response(200, json={"@odata.etag": 'W/"v1"', "id": "m1", "subject": "Hello"})
+
+    handler.seen = seen
+    return handler
+
+
+def make_app(handler, **kwargs):
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return OutlookApp(integration=MagicMock(), client=client, **kwargs)
+
+
+def test_repeated_reads_revalidate_with_etag():
+    handler = etag_handler()
+    app = make_app(handler)
+    first = app.user_get_message("m1", user_id="alice@contoso.com", select=["subject", "id"])
+    second = app.user_get_message("m1", user_id="alice@contoso.com", select=["id", "subject"])
+    assert first == second
+    assert [h[2] for h in handler.seen] == [None, 'W/"v1"']
+    metrics = app.read_cache_metrics()
+    assert (metrics["misses"], metrics["revalidated"], metrics["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_fresh_entries_skip_the_request():
+    handler = etag_handler()
+    app = make_app(handler, read_cache_fresh_seconds=60)
+    app.user_get_message("m1", user_id="alice@contoso.com")
+    app.user_get_message("m1", user_id="alice@contoso.com")
+    assert len(handler.seen) == 1
+    assert app.read_cache_metrics()["hits"] == 1
+
+
+def test_delete_invalidates_cached_reads():
+    handler = etag_handler()
+    app = make_app(handler, read_cache_fresh_seconds=60)
+    app.user_get_message("m1", user_id="alice@contoso.com")
+    app.user_delete_message("m1", user_id="alice@contoso.com")
+    app.user_get_message("m1", user_id="alice@contoso.com")
+    assert [h[0] for h in handler.seen] == ["GET", "DELETE", "GET"]
+    assert handler.seen[-1][2] is None
+
+
+def test_cache_is_bounded_by_entries_and_bytes():
+    cache = ReadCache(max_entries=2, max_bytes=100)
+    for i in range(3):
+        cache.put(cache_key("u", f"/messages/{i}"), None, {}, 10)
+    assert cache.snapshot()["entries"] == 2
+    cache.put(cache_key("u", "/messages/big"), None, {}, 95)
+    snapshot = cache.snapshot()
+    assert (snapshot["entries"], snapshot["bytes"], snapshot["evictions"]) == (1, 95, 3)
+    cache.put(cache_key("u", "/messages/huge"), None, {}, 101)
+    assert cache.get(cache_key("u", "/messages/huge")) is None
+
+
+def test_invalidation_matches_exact_message_and_sub_resources():
+    cache = ReadCache()
+    for path in ("/users/u/messages/AB", "/users/u/messages/ABC", "/users/u/messages/AB/attachments"):
+        cache.put(cache_key("u", path), None, {}, 1)
+    assert cache.invalidate("u", "/messages/AB") == 2
+    assert cache.get(cache_key("u", "/users/u/messages/ABC")) is not None
@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock
+
+import httpx
+
+from universal_mcp_outlook.app import OutlookApp
+
+ATTACHMENTS = {
+    "m1": [
+        {"id": "a1", "name": "report.pdf", "size": 2_000_000, "contentType": "application/pdf"},
+        {"id": "a2", "name": "logo.png", "size": 10, "contentType": "image/png"},
+    ],
+    "m2": [{"id": "a3", "name": "report.pdf", "size": 5, "contentType": "application/pdf"}],
+}
+CONTENT = {"a1": b"%PDF" * 500_000, "a2": b"png", "a3": b"other"}
+
+
+def handler(request):
+    parts = request.url.path.split("/")
+    if parts[-1] == "$value":
+        return httpx.Response(200, content=CONTENT[parts[-2]], headers={"Content-Type": "application/octet-stream"})
+    if parts[-1] == "attachments":
+        assert request.url.params["$select"].startswith("id,name,size,contentType")
+        return httpx.Response(200, json={"value": ATTACHMENTS[parts[-2]]})
+    if parts[-2] == "attachments":
+        attachment = next(a for items in ATTACHMENTS.values() for a in items if a["id"] == parts[-1])
+        return httpx.Response(200, json={"name": attachment["name"]})
+    if parts[-1] == "messages":
+        assert request.url.params["$filter"] == "hasAttachments eq true and (isRead eq false)"
+        return httpx.Response(200, json={"value": [{"id": "m1"}, {"id": "m2"}]})
+    return httpx.Response(404)
+
+
+def make_app():
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    return OutlookApp(integration=MagicMock(), client=client)
+
+
+def test_list_attachments_selects_metadata_by_default():
+    assert make_app().user_message_list_attachment("m1", user_id="alice@contoso.com")["value"]
+
+
+def test_download_attachment_streams_to_directory(tmp_path):
+    result = make_app().download_attachment("m1", "a1", str(tmp_path), user_id="alice@contoso.com")
+    assert result["path"] == str(tmp_path / "report.pdf")
+    assert result["size"] == len(CONTENT["a1"])
+    assert (tmp_path / "report.pdf").read_bytes() == CONTENT["a1"]
+    assert not list(tmp_path.glob("*.part"))
+
+
+def test_download_attachments_filters_and_deduplicates_names(tmp_path):
+    result = make_app().download_attachments(
+        str(tmp_path), filter="isRead eq false", name_pattern="*.PDF", user_id="alice@contoso.com"
+    )
+    assert result["errors"] == []
+    assert sorted(d["attachment_id"] for d in result["downloaded"]) == ["a1", "a3"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["report (1).pdf", "report.pdf"]
@@ -0,0 +1,180 @@
+import json
+import os
+import threading
+import time
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.export import ExportPipeline
+from universal_mcp_outlook.stores import SQLiteStore
+
+PAGE = 4
+TOTAL = 10
+BASE = "https://graph.microsoft.com/v1.0/users/alice@contoso.com/messages"
+
+
+class Mailbox:
+    """
+    Pages of PAGE messages with ids 'a/b+i'. fail_page makes one page fetch fail once,
+    missing messages were deleted, and flaky maps ids to how many MIME fetches fail.
+    """
+
+    def __init__(self, fail_page=None, missing=(), flaky=None):
+        self.fail_page = fail_page
+        self.missing = set(missing)
+        self.flaky = dict(flaky or {})
+        self.requests = []
+        self.lock = threading.Lock()
+
+    def __call__(self, request):
+        with self.lock:
+            self.requests.append(request)
+        if request.url.path.endswith("/$value"):
+            message_id = request.url.path.removeprefix(httpx.URL(BASE).path + "/").removesuffix("/$value")
+            if message_id in self.missing:
+                return httpx.Response(404, json={"error": {"code": "ErrorItemNotFound"}})
+            with self.lock:
+                if self.flaky.get(message_id):
+                    self.flaky[message_id] -= 1
+                    return httpx.Response(500, json={"error": {"code": "InternalServerError"}})
+            return httpx.Response(200, content=f"Subject: {message_id}\r\n\r\nbody".encode())
+        start = int(request.url.params.get("$skiptoken", 0))
+        if start == self.fail_page:
+            self.fail_page = None
+            return httpx.Response(500, json={"error": {"code": "InternalServerError"}})
+        end = min(start + PAGE, TOTAL)
+        page = {"value": [{"id": f"a/b+{i}", "subject": f"Message {i}"} for i in range(start, end)]}
+        if end < TOTAL:
+            page["@odata.nextLink"] = f"{BASE}?$skiptoken={end}"
+        return httpx.Response(200, json=page)
+
+
+def make_app(mailbox, store):
+    return OutlookApp(integration=MagicMock(), transport=httpx.MockTransport(mailbox), sync_store=store)
+
+
+def lines(path):
+    with open(path, encoding="utf-8") as file:
+        return [json.loads(line)["id"] for line in file]
+
+
+def test_jsonl_export_resumes_after_a_failed_page_without_duplicates(tmp_path):
+    store = SQLiteStore(":memory:")
+    dest = str(tmp_path / "mail.jsonl")
+    mailbox = Mailbox(fail_page=8)
+    app = make_app(mailbox, store)
+    with pytest.raises(httpx.HTTPStatusError):
+        app.export_messages(dest, user_id="alice@contoso.com", filter="isRead eq true")
+    assert lines(dest) == [f"a/b+{i}" for i in range(8)]
+
+    result = app.export_messages(dest, user_id="alice@contoso.com", filter="isRead eq true")
+    assert (result["exported"], result["total_exported"], result["complete"]) == (2, TOTAL, True)
+    assert lines(dest) == [f"a/b+{i}" for i in range(TOTAL)]
+
+    sent = len(mailbox.requests)
+    assert app.export_messages(dest, user_id="alice@contoso.com", filter="isRead eq true")["complete"]
+    assert len(mailbox.requests) == sent
+
+
+def test_jsonl_export_in_slices_stops_on_page_boundaries(tmp_path):
+    app = make_app(Mailbox(), SQLiteStore(":memory:"))
+    dest = str(tmp_path / "mail.jsonl")
+    first = app.export_messages(dest, user_id="alice@contoso.com", max_messages=6)
+    assert (first["exported"], first["total_exported"], first["complete"]) == (8, 8, False)
+    second = app.export_messages(dest, user_id="alice@contoso.com", max_messages=1)
+    assert (second["exported"], second["total_exported"], second["complete"]) == (2, TOTAL, True)
+    assert lines(dest) == [f"a/b+{i}" for i in range(TOTAL)]
+
+    restarted = app.export_messages(dest, user_id="alice@contoso.com", restart=True)
+    assert restarted["exported"] == TOTAL and lines(dest) == [f"a/b+{i}" for i in range(TOTAL)]
+
+
+def test_eml_export_retries_failed_messages_before_reporting_complete(tmp_path):
+    mailbox = Mailbox(missing={"a/b+3"}, flaky={"a/b+5": 2})
+    app = make_app(mailbox, SQLiteStore(":memory:"))
+    dest = tmp_path / "eml"
+    first = app.export_messages(str(dest), format="eml", user_id="alice@contoso.com", max_messages=6)
+    assert (first["exported"], first["missing"], first["failed"]) == (6, 1, 1)
+    assert (first["pending_retries"], first["complete"]) == (1, False)
+    assert first["errors"][0]["id"] == "a/b+5"
+    assert (dest / "a_b-0.eml").read_bytes() == b"Subject: a/b+0\r\n\r\nbody"
+    assert not any(name.endswith(".part") for name in os.listdir(dest))
+
+    second = app.export_messages(str(dest), format="eml", user_id="alice@contoso.com")
+    assert (second["exported"], second["failed"], second["pending_retries"], second["complete"]) == (2, 1, 1, False)
+
+    listed = len([r for r in mailbox.requests if r.url.path.endswith("/messages")])
+    third = app.export_messages(str(dest), format="eml", user_id="alice@contoso.com")
+    assert (third["exported"], third["pending_retries"], third["complete"]) == (1, 0, True)
+    assert third["total_exported"] == TOTAL - 1 and len(os.listdir(dest)) == TOTAL - 1
+    assert len([r for r in mailbox.requests if r.url.path.endswith("/messages")]) == listed
+
+    again = app.export_messages(str(dest), format="eml", user_id="alice@contoso.com", restart=True)
+    assert (again["skipped"], again["missing"], again["exported"], again["complete"]) == (TOTAL - 1, 1, 0, True)
+    listing = [r for r in mailbox.requests if r.url.path.endswith("/messages")]
+    assert all(r.url.params.get("$select", "id") == "id" for r in listing)
+
+
+def test_export_rejects_unknown_format(tmp_path):
+    with pytest.raises(ValueError):
+        make_app(Mailbox(), SQLiteStore(":memory:")).export_messages(str(tmp_path), format="pst", user_id="a")
+
+
+def test_pipeline_keeps_memory_bounded_and_checkpoints_in_page_order():
+    in_flight, peak, lock = [0], [0], threading.Lock()
+    checkpoints = []
+
+    def handle(item):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.001 * (item % 3))
+        with lock:
+            in_flight[0] -= 1
+        return 1
+
+    pages = ((list(range(n * 10, n * 10 + 10)), f"page-{n + 1}" if n < 4 else None) for n in range(5))
+    pipeline = ExportPipeline(
+        handle, lambda link, done, failed: checkpoints.append((link, done)), concurrency=4, queue_size=3
+    )
+    stats = pipeline.run(pages)
+    assert stats.exported == 50 and peak[0] <= 4
+    assert checkpoints == [("page-1", 10), ("page-2", 20), ("page-3", 30), ("page-4", 40), (None, 50)]
+
+
+def test_pipeline_rate_limit_and_fatal_errors():
+    started = time.monotonic()
+    ExportPipeline(lambda item: 1, lambda *args: None, items_per_second=200).run(iter([(list(range(220)), None)]))
+    assert time.monotonic() - started >= 0.08
+
+    def handle(item):
+        if item == 5:
+            raise OSError("disk full")
+        return 1
+
+    checkpoints = []
+    pipeline = ExportPipeline(handle, lambda link, done, failed: checkpoints.append(link), concurrency=2, queue_size=2)
+    with pytest.raises(OSError):
+        pipeline.run(iter([([0, 1, 2], "next"), ([3, 4, 5, 6], "last"), ([7], None)]))
+    assert checkpoints == ["next"]
+
+
+def test_pipeline_finishes_queued_items_when_listing_fails():
+    def pages():
+        yield list(range(6)), "next"
+        raise RuntimeError("listing failed")
+
+    def handle(item):
+        time.sleep(0.01)
+        return 1
+
+    checkpoints = []
+    pipeline = ExportPipeline(
+        handle, lambda link, done, failed: checkpoints.append((link, done)), concurrency=2, queue_size=10
+    )
+    with pytest.raises(RuntimeError):
+        pipeline.run(pages())
+    assert pipeline.stats.exported == 6 and checkpoints == [("next", 6)]
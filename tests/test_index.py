@@ -0,0 +1,155 @@
+import sqlite3
+import time
+from unittest.mock import MagicMock
+
+import httpx
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.index import MessageIndex
+from universal_mcp_outlook.stores import SQLiteStore
+
+
+def message(id, subject, received, preview="", sender="bob@contoso.com"):
+    return {
+        "id": id,
+        "subject": subject,
+        "bodyPreview": preview,
+        "receivedDateTime": received,
+        "from": {"emailAddress": {"name": "Bob", "address": sender}},
+        "toRecipients": [{"emailAddress": {"address": "alice@contoso.com"}}],
+        "isRead": False,
+    }
+
+
+def test_search_matches_all_terms_newest_first():
+    index = MessageIndex()
+    index.upsert(
+        [
+            message("1", "March invoice", "2024-03-02T00:00:00Z", "Please pay"),
+            message("2", "Invoice for April", "2024-04-02T00:00:00Z"),
+            message("3", "Lunch?", "2024-04-03T00:00:00Z", 'contains "quotes" AND OR'),
+        ],
+        user_id="Alice@contoso.com",
+        folder_id="inbox",
+    )
+    assert [m["id"] for m in index.search("invoice")] == ["2", "1"]
+    assert [m["id"] for m in index.search("invoice march")] == ["1"]
+    assert [m["id"] for m in index.search('"quotes" AND')] == ["3"]
+    assert [m["id"] for m in index.search("invoice", since="2024-04-01")] == ["2"]
+    assert index.search(user_id="alice@contoso.com", folder_id="archive") == []
+    assert index.search("bob")[0]["sender"] == "Bob <bob@contoso.com>"
+
+
+def test_eviction_by_size_and_age():
+    index = MessageIndex(max_messages=2)
+    index.upsert(
+        [message(str(i), "m", f"2024-01-0{i}T00:00:00Z") for i in range(1, 5)],
+        user_id="alice@contoso.com",
+    )
+    assert index.evict() == 2
+    assert [m["id"] for m in index.search()] == ["4", "3"]
+
+    index = MessageIndex(max_age_days=30)
+    index.upsert([message("old", "m", "2000-01-01T00:00:00Z")], user_id="alice@contoso.com")
+    assert index.evict() == 1
+
+
+def test_app_indexes_folder_and_tracks_mutations():
+    base = "https://graph.microsoft.com/v1.0/users/alice@contoso.com/mailFolders/inbox/messages/delta"
+
+    def handler(request):
+        if request.method == "DELETE":
+            return httpx.Response(204)
+        if request.url.path.endswith("/sendMail"):
+            return httpx.Response(202)
+        return httpx.Response(
+            200,
+            json={
+                "value": [
+                    message("1", "Quarterly report", "2024-03-02T00:00:00Z"),
+                    message("2", "Team lunch", "2024-03-03T00:00:00Z"),
+                ],
+                "@odata.deltaLink": f"{base}?%24deltatoken=d1",
+            },
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    app = OutlookApp(integration=MagicMock(), client=client, sync_store=SQLiteStore(":memory:"))
+    result = app.index_mail_folder(user_id="alice@contoso.com")
+    assert (result["indexed"], result["total"], result["complete"]) == (2, 2, True)
+    assert [m["id"] for m in app.search_local_messages("report")["value"]] == ["1"]
+
+    app.user_delete_message("1", user_id="alice@contoso.com")
+    assert app.search_local_messages("report")["value"] == []
+
+    app.user_send_mail({"subject": "hi"}, user_id="alice@contoso.com")
+    assert app.search_local_messages()["stale_folders"] == ["sentitems"]
+
+
+def test_upserts_replace_text_by_rowid_and_old_indexes_are_migrated(tmp_path):
+    path = str(tmp_path / "index.db")
+    legacy = sqlite3.connect(path)
+    legacy.executescript(
+        "CREATE VIRTUAL TABLE messages_fts USING fts5(id UNINDEXED, subject, sender, recipients, body_preview);"
+    )
+    legacy.close()
+    index = MessageIndex(path)
+    index.upsert([message("1", "Quarterly report", "2024-01-01T00:00:00Z")], user_id="alice@contoso.com")
+    index.upsert([message("1", "Annual report", "2024-01-01T00:00:00Z")], user_id="alice@contoso.com")
+    assert [m["id"] for m in index.search("annual")] == ["1"]
+    assert index.search("quarterly") == []
+    index.remove(["1"])
+    assert index.search("report") == [] and index.count() == 0
+
+    index.upsert([message("2", "Budget", "2024-01-01T00:00:00Z")], user_id="alice@contoso.com")
+    reopened = MessageIndex(path)
+    assert [m["id"] for m in reopened.search("budget")] == ["2"]
+
+
+def test_refilling_a_large_index_stays_linear():
+    index = MessageIndex()
+    batch = [message(str(i), f"subject {i}", "2024-01-01T00:00:00Z") for i in range(5000)]
+    index.upsert(batch, user_id="alice@contoso.com")
+    started = time.perf_counter()
+    index.upsert(batch, user_id="alice@contoso.com")
+    assert time.perf_counter() - started < 2.0
+    assert [m["id"] for m in index.search("4999")] == ["4999"]
+
+
+def test_updated_messages_mark_their_folders_stale():
+    index = MessageIndex()
+    index.upsert([message("1", "m", "2024-01-01T00:00:00Z")], user_id="alice@contoso.com", folder_id="inbox")
+    index.handle_event("updated", "Alice@contoso.com", ["1", "unknown"])
+    assert index.stale_folders == {("alice@contoso.com", "inbox")}
+
+
+def test_a_restarted_in_memory_index_crawls_again_despite_a_shared_store(tmp_path):
+    base = "https://graph.microsoft.com/v1.0/users/alice@contoso.com/mailFolders/inbox/messages/delta"
+
+    def handler(request):
+        if "$deltatoken" in request.url.params:
+            return httpx.Response(200, json={"value": [], "@odata.deltaLink": str(request.url)})
+        return httpx.Response(
+            200,
+            json={
+                "value": [message("1", "Quarterly report", "2024-03-02T00:00:00Z")],
+                "@odata.deltaLink": f"{base}?%24deltatoken=d1",
+            },
+        )
+
+    store = SQLiteStore(str(tmp_path / "state.db"))
+    for _ in range(2):
+        app = OutlookApp(integration=MagicMock(), transport=httpx.MockTransport(handler), sync_store=store)
+        result = app.index_mail_folder(user_id="alice@contoso.com")
+        assert (result["indexed"], result["total"], result["complete"]) == (1, 1, True)
+        assert [m["id"] for m in app.search_local_messages("report")["value"]] == ["1"]
+    assert app.index_mail_folder(user_id="alice@contoso.com")["indexed"] == 0
+
+    path = str(tmp_path / "index.db")
+    apps = [
+        OutlookApp(integration=MagicMock(), transport=httpx.MockTransport(handler), sync_store=store, index_path=path)
+        for _ in range(2)
+    ]
+    apps[0].index_mail_folder(user_id="alice@contoso.com")
+    result = apps[1].index_mail_folder(user_id="alice@contoso.com")
+    assert (result["indexed"], result["total"]) == (0, 1)
@@ -0,0 +1,142 @@
+import asyncio
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import httpx
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.instrumentation import TOOL_REQUEST_LOG_SIZE
+from universal_mcp_outlook.throttling import ThrottlingConfig
+
+NO_BACKOFF = ThrottlingConfig(backoff_base=0.0, jitter=0.0)
+
+
+def tool(app, name):
+    return next(t for t in app.list_tools() if t.__name__ == name)
+
+
+def integration():
+    mock = MagicMock()
+    mock.get_credentials.return_value = {"access_token": "dummy_access_token"}
+    return mock
+
+
+def graph_handler(request):
+    headers = {"request-id": f"req-{request.url.path.rsplit('/', 1)[-1]}"}
+    if request.url.path.endswith("/me"):
+        return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"}, headers=headers)
+    return httpx.Response(200, json={"value": [{"id": "1"}]}, headers=headers)
+
+
+def test_tool_calls_record_hidden_requests_retries_and_request_ids():
+    throttled = []
+
+    def handler(request):
+        if request.url.path.endswith("/messages") and not throttled:
+            throttled.append(request)
+            return httpx.Response(429, headers={"Retry-After": "0"})
+        return graph_handler(request)
+
+    sink = []
+    app = OutlookApp(
+        integration=integration(),
+        transport=httpx.MockTransport(handler),
+        throttling=NO_BACKOFF,
+        instrumentation_sinks=[sink.append],
+    )
+    tool(app, "user_list_message")(top=1)
+    record = sink[0].to_dict(include_requests=True)
+    assert record["tool"] == "user_list_message"
+    assert [(r["path"], r["status"], r["attempt"]) for r in record["request_log"]] == [
+        ("/v1.0/me", 200, 0),
+        ("/v1.0/users/alice@contoso.com/messages", 429, 0),
+        ("/v1.0/users/alice@contoso.com/messages", 200, 1),
+    ]
+    assert (record["requests"], record["retries"]) == (3, 1)
+    assert record["request_ids"] == ["req-me", "req-messages"]
+    assert record["bytes_received"] == sum(r["bytes_received"] for r in record["request_log"]) > 0
+
+    stats = tool(app, "get_performance_stats")(tool="user_list_message")
+    assert stats["tools"]["user_list_message"]["calls"] == 1
+    assert stats["tools"]["user_list_message"]["requests_per_call"] == 3
+    assert stats["throttling"]["retries"] == 1
+
+
+def test_batch_worker_threads_are_attributed_to_the_tool():
+    def handler(request):
+        body = json.loads(request.content)
+        return httpx.Response(
+            200, json={"responses": [{"id": r["id"], "status": 204} for r in body["requests"]]}
+        )
+
+    app = OutlookApp(integration=MagicMock(), transport=httpx.MockTransport(handler))
+    ids = [f"m{i}" for i in range(60)]
+    with app.instrumentation.track("bulk"):
+        app._batch_by_message(ids, lambda rid, mid: {"id": rid, "method": "DELETE", "url": f"/x/{mid}"}, 3)
+    assert app.get_performance_stats()["tools"]["bulk"]["requests_per_call"] == 3
+
+
+def test_socket_requests_report_latency_phases():
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            payload = b'{"userPrincipalName": "alice@contoso.com"}'
+            self.send_response(200)
+            self.send_header("Content-Length", str(len(payload)))
+            self.send_header("request-id", "abc")
+            self.end_headers()
+            self.wfile.write(payload)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        app = OutlookApp(integration=MagicMock())
+        app.base_url = f"http://127.0.0.1:{server.server_address[1]}/v1.0"
+        tool(app, "get_user_id")()
+        (record,) = app.performance_buffer.records("get_user_id")
+        phases = record.requests[0].phases
+        assert {"connect", "send", "server_wait", "receive"} <= set(phases)
+        assert record.requests[0].request_id == "abc"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_async_tools_are_tracked():
+    async def handler(request):
+        return graph_handler(request)
+
+    async def run():
+        app = OutlookApp(
+            integration=integration(),
+            async_tools=True,
+            async_transport=httpx.MockTransport(handler),
+        )
+        await asyncio.gather(*(tool(app, "user_list_message")(top=1) for _ in range(3)))
+        await app.aclose()
+        return app.get_performance_stats(recent=0)
+
+    stats = asyncio.run(run())
+    assert stats["tools"]["user_list_message"]["calls"] == 3
+    assert stats["recent"] == []
+
+
+def test_long_calls_keep_totals_but_only_the_latest_requests():
+    sink = []
+    app = OutlookApp(
+        integration=MagicMock(), transport=httpx.MockTransport(graph_handler), instrumentation_sinks=[sink.append]
+    )
+    with app.instrumentation.track("scan"):
+        for n in range(200):
+            app.user_get_message(f"m{n}", user_id="alice@contoso.com")
+    record = sink[0].to_dict(include_requests=True)
+    assert record["requests"] == 200
+    assert len(record["request_log"]) == TOOL_REQUEST_LOG_SIZE
+    assert record["request_log"][-1]["path"].endswith("/m199")
+    assert record["bytes_received"] > sum(r["bytes_received"] for r in record["request_log"])
@@ -0,0 +1,113 @@
+import json
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.projection import (
+    dumps,
+    html_to_text,
+    profile_select,
+    project,
+    project_conversation,
+)
+
+FIXTURE = json.loads((Path(__file__).parent / "fixtures" / "messages.json").read_text())
+
+
+def test_project_collection():
+    projected = project(FIXTURE, body_limit=20)
+    assert set(projected) == {"@odata.nextLink", "value"}
+    first = projected["value"][0]
+    assert "@odata.etag" not in first
+    assert first["from"] == "Megan Bowen <meganb@contoso.com>"
+    assert first["toRecipients"] == ["Alice <alice@contoso.com>", "bob@contoso.com"]
+    assert first["flag"] == "flagged"
+    assert first["body"] == "Hi team,\nThe numbers…"
+    assert projected["value"][1]["body"] == "Pizza?"
+    assert len(dumps(projected)) < len(dumps(FIXTURE))
+
+
+def test_html_to_text_drops_markup_scripts_and_entities():
+    text = html_to_text(FIXTURE["value"][0]["body"]["content"])
+    assert text == "Hi team,\nThe numbers are in & look good."
+
+
+def test_profile_select():
+    assert profile_select("summary", ["subject", "webLink"])[-1] == "webLink"
+    assert profile_select("full", ["body"]) == ["body"]
+    with pytest.raises(ValueError):
+        profile_select("tiny")
+
+
+def test_list_tool_requests_profile_fields_and_records_savings():
+    seen = {}
+
+    def handler(request):
+        seen["select"] = request.url.params["$select"]
+        return httpx.Response(200, json=FIXTURE)
+
+    app = OutlookApp(integration=MagicMock(), client=httpx.Client(transport=httpx.MockTransport(handler)))
+    result = app.user_list_message(user_id="alice@contoso.com", profile="triage")
+    assert seen["select"].startswith("id,subject,from,toRecipients")
+    assert result["value"][0]["from"] == "Megan Bowen <meganb@contoso.com>"
+    metrics = app.projection_metrics()
+    assert (metrics["calls"], metrics["measured"], metrics["bytes_before"]) == (1, 0, 0)
+
+    raw = app.user_list_message(user_id="alice@contoso.com")
+    assert raw == FIXTURE
+
+    app.measure_projection = True
+    assert app.user_list_message(user_id="alice@contoso.com", profile="triage") == result
+    metrics = app.projection_metrics()
+    assert (metrics["calls"], metrics["measured"]) == (2, 1) and metrics["bytes_saved"] > 0
+
+
+def conversation_message(index, sender, body):
+    return {
+        "@odata.etag": f'W/"{index}"',
+        "id": f"m{index}",
+        "subject": "Re: Q3 numbers" if index else "Q3 numbers",
+        "from": {"emailAddress": {"name": sender, "address": f"{sender.lower()}@contoso.com"}},
+        "toRecipients": [{"emailAddress": {"address": "team@contoso.com"}}],
+        "receivedDateTime": f"2024-01-0{index + 1}T00:00:00Z",
+        "uniqueBody": {"contentType": "html", "content": f"<p>{body}</p>"},
+    }
+
+
+def test_get_conversation_resolves_message_and_memoizes():
+    calls = []
+
+    def handler(request):
+        calls.append(request.url.path)
+        if request.method == "POST":
+            return httpx.Response(202)
+        if request.url.path.endswith("/messages/m1"):
+            return httpx.Response(200, json={"conversationId": "conv'1"})
+        assert request.url.params["$filter"].endswith("conversationId eq 'conv''1'")
+        assert request.url.params["$orderby"] == "receivedDateTime asc"
+        return httpx.Response(
+            200,
+            json={"value": [conversation_message(0, "Megan", "Numbers attached."), conversation_message(1, "Bob", "Thanks!")]},
+        )
+
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    app = OutlookApp(integration=MagicMock(), client=client)
+    thread = app.get_conversation(message_id="m1", user_id="alice@contoso.com")
+    assert thread["subject"] == "Q3 numbers"
+    assert thread["participants"] == ["Megan <megan@contoso.com>", "team@contoso.com", "Bob <bob@contoso.com>"]
+    assert [m["body"] for m in thread["messages"]] == ["Numbers attached.", "Thanks!"]
+    assert thread["message_count"] == 2
+    assert app.get_conversation(conversation_id="conv'1", user_id="alice@contoso.com") is thread
+    assert len(calls) == 2
+    app.users_message_reply("m1", user_id="alice@contoso.com", comment="+1")
+    app.get_conversation(conversation_id="conv'1", user_id="alice@contoso.com")
+    assert calls.count("/v1.0/users/alice@contoso.com/messages") == 2
+
+
+def test_project_conversation_prefers_unique_body():
+    message = conversation_message(0, "Megan", "New text")
+    message["body"] = {"contentType": "html", "content": "<p>New text</p><blockquote>old</blockquote>"}
+    assert project_conversation([message])["messages"][0]["body"] == "New text"
@@ -0,0 +1,132 @@
+import json
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.query import Condition, build_query, compile_query, filter_fields
+
+
+def test_typed_conditions_compile_to_odata_literals():
+    params = build_query(
+        select=["id", "subject"],
+        where=[
+            {"field": "from", "op": "eq", "value": "o'brien@contoso.com"},
+            {"field": "categories", "op": "eq", "value": "Red"},
+            {"field": "flag", "op": "eq", "value": "flagged"},
+            {"field": "subject", "op": "startswith", "value": "Re:"},
+            {"field": "isRead", "op": "eq", "value": "false"},
+        ],
+        received_after="2024-05-01T10:00:00+02:00",
+        received_before="2024-06-01",
+        count=True,
+    )
+    assert params == {
+        "$filter": "from/emailAddress/address eq 'o''brien@contoso.com'"
+        " and categories/any(c:c eq 'Red')"
+        " and flag/flagStatus eq 'flagged'"
+        " and startswith(subject,'Re:')"
+        " and isRead eq false"
+        " and receivedDateTime ge 2024-05-01T08:00:00Z"
+        " and receivedDateTime lt 2024-06-01T00:00:00Z",
+        "$count": "true",
+        "$select": "id,subject",
+    }
+
+
+def test_orderby_properties_are_moved_to_the_front_of_the_filter():
+    typed = build_query(
+        where=[Condition("isRead", "eq", False), Condition("receivedDateTime", "ge", "2024-01-01")],
+        orderby=["receivedDateTime desc"],
+    )
+    assert typed["$filter"] == "receivedDateTime ge 2024-01-01T00:00:00Z and isRead eq false"
+
+    raw = build_query(filter="isRead eq false or importance eq 'high'", orderby="receivedDateTime desc")
+    assert raw["$filter"] == "receivedDateTime ge 1900-01-01T00:00:00Z and (isRead eq false or importance eq 'high')"
+
+    leading = "receivedDateTime ge 2024-01-01T00:00:00Z and isRead eq false"
+    assert build_query(filter=leading, orderby=["receivedDateTime"])["$filter"] == leading
+
+    with pytest.raises(ValueError, match="subject"):
+        build_query(filter="isRead eq false", orderby=["subject asc"])
+
+
+@pytest.mark.parametrize(
+    "kwargs, message",
+    [
+        ({"search": "invoice", "orderby": ["receivedDateTime desc"]}, "orderby with search"),
+        ({"search": "invoice", "skip": 10}, "skip with search"),
+        ({"select": ["recievedDateTime"]}, "Did you mean 'receivedDateTime'"),
+        ({"expand": ["attachment"]}, "Did you mean 'attachments'"),
+        ({"where": [{"field": "subject", "op": "contains", "value": "x"}]}, "Use search"),
+        ({"where": [{"field": "importance", "op": "eq", "value": "urgent"}]}, "low, normal, high"),
+        ({"where": [{"field": "body", "op": "eq", "value": "x"}]}, "cannot filter"),
+        ({"filter": "subject eq 'unterminated"}, "Unbalanced quote"),
+        ({"filter": "(isRead eq false"}, "Unbalanced parentheses"),
+        ({"filter": "isread eq false"}, "Did you mean 'isRead'"),
+        ({"top": 5000}, "at most 1000"),
+        ({"received_after": "2024-06-01", "received_before": "2024-05-01"}, "earlier than"),
+        ({"received_after": "last week"}, "ISO 8601"),
+    ],
+)
+def test_queries_graph_would_reject_raise_value_error(kwargs, message):
+    with pytest.raises(ValueError, match=message):
+        build_query(**kwargs)
+
+
+def test_raw_filter_fields_skip_lambda_variables_and_literals():
+    fields = filter_fields("toRecipients/any(r:r/emailAddress/address eq 'x eq y') and isRead eq false")
+    assert fields == ["toRecipients", "isRead"]
+    assert build_query("attachment", filter="size gt 1000", search="x")["$search"] == '"x"'
+
+
+def test_tools_join_list_options_and_fail_before_sending_invalid_queries():
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        return httpx.Response(200, json={"id": "m1", "value": []})
+
+    app = OutlookApp(integration=MagicMock(), client=httpx.Client(transport=httpx.MockTransport(handler)))
+    compile_query.cache_clear()
+    for _ in range(2):
+        app.user_get_message("m1", user_id="alice@contoso.com", select=["id", "subject"], expand=["attachments"])
+    app.user_message_list_attachment("m1", user_id="alice@contoso.com", orderby=["size desc", "name"])
+    app.user_get_mail_folder("inbox", user_id="alice@contoso.com", select=["displayName", "unreadItemCount"])
+    params = [dict(request.url.params.multi_items()) for request in requests]
+    assert params[0] == {"$select": "id,subject", "$expand": "attachments"}
+    assert params[2]["$orderby"] == "size desc,name"
+    assert params[3] == {"$select": "displayName,unreadItemCount"}
+    assert app.query_metrics()["hits"] >= 1
+
+    sent = len(requests)
+    with pytest.raises(ValueError):
+        app.user_list_message(user_id="alice@contoso.com", search="invoice", orderby=["receivedDateTime desc"])
+    with pytest.raises(ValueError):
+        app.list_messages_page(user_id="alice@contoso.com", where=[{"field": "subjet", "op": "eq", "value": "x"}])
+    assert len(requests) == sent
+
+    app.list_messages_page(user_id="alice@contoso.com", received_after="2024-05-01", orderby=["receivedDateTime desc"])
+    assert requests[-1].url.params["$filter"] == "receivedDateTime ge 2024-05-01T00:00:00Z"
+
+
+def test_batch_tools_compile_select_through_the_query_builder():
+    urls = []
+
+    def handler(request):
+        subrequests = json.loads(request.content)["requests"]
+        urls.extend(r["url"] for r in subrequests)
+        responses = [{"id": r["id"], "status": 200, "body": {"value": []}} for r in subrequests]
+        return httpx.Response(200, json={"responses": responses})
+
+    app = OutlookApp(integration=MagicMock(), client=httpx.Client(transport=httpx.MockTransport(handler)))
+    app.batch_get_messages(["m1"], user_id="alice@contoso.com", select=["id", "subject"])
+    app.batch_list_attachments(["m1"], user_id="alice@contoso.com", select=["name", "size"])
+    assert urls == [
+        "/users/alice@contoso.com/messages/m1?$select=id,subject",
+        "/users/alice@contoso.com/messages/m1/attachments?$select=name,size",
+    ]
+    with pytest.raises(ValueError, match="Did you mean 'subject'"):
+        app.batch_get_messages(["m1"], user_id="alice@contoso.com", select=["subjct"])
+    assert len(urls) == 2
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.subscriptions import (
+    NotificationQueue,
+    NotificationReceiver,
+    SubscriptionManager,
+    _graph_time,
+)
+
+
+def graph_handler(created, renewed):
+    def handler(request):
+        if request.url.path.endswith("/me"):
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        body = json.loads(request.content) if request.content else {}
+        if request.method == "POST":
+            created.append(body)
+            return httpx.Response(201, json={"id": f"sub-{len(created)}", **body})
+        if request.method == "PATCH":
+            renewed.append(request.url.path.rsplit("/", 1)[-1])
+            return httpx.Response(200, json=body)
+        return httpx.Response(204)
+
+    return handler
+
+
+PUBLIC_URL = "https://mail-hooks.contoso.com/notifications"
+
+
+def make_app(handler, notification_url=PUBLIC_URL):
+    client = httpx.Client(transport=httpx.MockTransport(handler))
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
+    return OutlookApp(integration=integration, client=client, notification_url=notification_url)
+
+
+def notify(url, client_state, message_id="m1"):
+    return httpx.post(
+        url,
+        json={
+            "value": [
+                {
+                    "subscriptionId": "sub-1",
+                    "clientState": client_state,
+                    "changeType": "created",
+                    "resource": f"Users/u1/Messages/{message_id}",
+                    "resourceData": {"id": message_id},
+                }
+            ]
+        },
+    )
+
+
+def test_subscribe_validates_and_queues_notifications():
+    created, renewed = [], []
+    app = make_app(graph_handler(created, renewed))
+    try:
+        subscription = app.subscribe_to_mail(folder_id="inbox")
+        assert subscription["resource"] == "users/alice@contoso.com/mailFolders('inbox')/messages"
+        assert created[0]["notificationUrl"] == PUBLIC_URL
+        url = app._receiver.url
+        client_state = created[0]["clientState"]
+
+        handshake = httpx.post(url, params={"validationToken": "token with spaces"})
+        assert (handshake.status_code, handshake.text) == (200, "token with spaces")
+        assert handshake.headers["content-type"] == "text/plain"
+
+        assert notify(url, "forged").status_code == 202
+        assert notify(url, client_state, "m2").status_code == 202
+        result = app.wait_for_new_mail(timeout=1)
+        assert [n["message_id"] for n in result["value"]] == ["m2"]
+        assert result["pending"] == 0
+        assert app._receiver.rejected == 1
+        assert app.wait_for_new_mail(timeout=0.01)["value"] == []
+    finally:
+        app.stop_notifications()
+
+
+def test_wait_for_new_mail_async_wakes_on_notification():
+    created, renewed = [], []
+    app = make_app(graph_handler(created, renewed))
+
+    async def run():
+        receiver = app.start_notifications()
+        timer = threading.Timer(0.05, notify, (receiver.url, app.subscriptions.client_state))
+        timer.start()
+        result = await app.wait_for_new_mail_async(timeout=5)
+        timer.join()
+        return result
+
+    try:
+        result = asyncio.run(run())
+        assert [n["message_id"] for n in result["value"]] == ["m1"]
+    finally:
+        app.stop_notifications()
+
+
+def test_renew_due_only_renews_expiring_subscriptions():
+    created, renewed = [], []
+    client = httpx.Client(transport=httpx.MockTransport(graph_handler(created, renewed)))
+    manager = SubscriptionManager(lambda: client, "https://graph.microsoft.com/v1.0")
+    now = datetime.now(timezone.utc)
+    manager.subscriptions = {
+        "soon": {"id": "soon", "expirationDateTime": _graph_time(now + timedelta(hours=1))},
+        "later": {"id": "later", "expirationDateTime": _graph_time(now + timedelta(days=2))},
+    }
+    assert manager.renew_due() == ["soon"]
+    assert renewed == ["soon"]
+
+
+def test_receiver_rejects_unknown_paths_and_bad_payloads():
+    queue = NotificationQueue(maxsize=1)
+    receiver = NotificationReceiver("secret", queue).start()
+    try:
+        assert httpx.post(receiver.url + "/other", json={}).status_code == 404
+        assert httpx.post(receiver.url, content=b"not json").status_code == 400
+        notify(receiver.url, "secret", "a")
+        notify(receiver.url, "secret", "b")
+        assert [n["message_id"] for n in queue.drain()] == ["b"]
+        assert queue.dropped == 1
+    finally:
+        receiver.stop()
+
+
+def test_subscribe_needs_a_public_url_and_cleans_up_after_rejection():
+    created, renewed = [], []
+    for url in (None, "http://127.0.0.1:8080/notifications"):
+        app = make_app(graph_handler(created, renewed), notification_url=url)
+        with pytest.raises(ValueError, match="notification_url"):
+            app.subscribe_to_mail(user_id="alice@contoso.com")
+        assert app._receiver is None and created == []
+
+    def rejecting(request):
+        return httpx.Response(400, json={"error": {"code": "ValidationError"}})
+
+    app = make_app(rejecting)
+    with pytest.raises(httpx.HTTPStatusError):
+        app.subscribe_to_mail(user_id="alice@contoso.com")
+    assert app._receiver is None
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import threading
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.throttling import (
+    MailboxLimiter,
+    ThrottlingConfig,
+    TokenBucket,
+    mailbox_key,
+    request_charges,
+)
+
+FAST = ThrottlingConfig(backoff_base=0.001, backoff_max=0.01)
+
+
+def throttling_stub(failures, status=429):
+    """Answers the first `failures` non-/me requests with `status`, then succeeds."""
+    seen = []
+
+    def handler(request):
+        if request.url.path.endswith("/me"):
+            return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+        seen.append(request.method)
+        if len(seen) <= failures:
+            return httpx.Response(status, headers={"Retry-After": "0"}, json={"error": {"code": "TooManyRequests"}})
+        return httpx.Response(202 if request.method == "POST" else 200, json={})
+
+    handler.seen = seen
+    return handler
+
+
+def make_app(handler, **kwargs):
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
+    return OutlookApp(integration=integration, transport=httpx.MockTransport(handler), **kwargs)
+
+
+def test_get_is_retried_after_429():
+    handler = throttling_stub(failures=2)
+    app = make_app(handler, throttling=FAST)
+    assert app.user_get_message("m1") == {}
+    assert handler.seen == ["GET"] * 3
+    metrics = app.throttling_metrics()
+    assert metrics["retries"] == 2
+    assert metrics["throttled_responses"] == 2
+
+
+def test_retries_are_bounded():
+    handler = throttling_stub(failures=10, status=503)
+    app = make_app(handler, throttling=ThrottlingConfig(max_retries=2, backoff_base=0.001))
+    with pytest.raises(httpx.HTTPStatusError):
+        app.user_get_message("m1")
+    assert len(handler.seen) == 3
+
+
+def test_send_mail_is_not_retried_on_503_but_is_on_429():
+    handler = throttling_stub(failures=1, status=503)
+    app = make_app(handler, throttling=FAST)
+    with pytest.raises(httpx.HTTPStatusError):
+        app.user_send_mail({"subject": "hi"})
+    assert handler.seen == ["POST"]
+
+    handler = throttling_stub(failures=1, status=429)
+    app = make_app(handler, throttling=FAST)
+    app.user_send_mail({"subject": "hi"})
+    assert handler.seen == ["POST", "POST"]
+
+
+def test_async_requests_share_the_retry_layer():
+    handler = throttling_stub(failures=1)
+
+    async def run():
+        app = OutlookApp(
+            integration=MagicMock(),
+            throttling=FAST,
+            async_transport=httpx.MockTransport(handler),
+        )
+        try:
+            return await app.user_get_message_async("m1", user_id="alice@contoso.com"), app
+        finally:
+            await app.aclose()
+
+    result, app = asyncio.run(run())
+    assert result == {}
+    assert app.throttling_metrics()["retries"] == 1
+
+
+def test_per_mailbox_concurrency_is_capped():
+    limiter = MailboxLimiter(ThrottlingConfig(max_concurrent_per_mailbox=4))
+    semaphore = limiter.semaphore("alice@contoso.com")
+    assert all(semaphore.acquire(blocking=False) for _ in range(4))
+    assert not semaphore.acquire(blocking=False)
+    assert limiter.semaphore("bob@contoso.com").acquire(blocking=False)
+
+
+def test_token_bucket_delays_once_exhausted():
+    bucket = TokenBucket(capacity=2, window_seconds=1.0)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert 0.0 < bucket.reserve() <= 0.5
+
+
+def test_mailbox_key():
+    assert mailbox_key(httpx.URL("https://graph.microsoft.com/v1.0/users/Alice@Contoso.com/messages")) == "alice@contoso.com"
+    assert mailbox_key(httpx.URL("https://graph.microsoft.com/v1.0/me/messages")) == "me"
+    assert mailbox_key(httpx.URL("https://graph.microsoft.com/v1.0/$batch")) == ""
+
+
+def test_batch_sub_requests_are_charged_to_their_own_mailboxes():
+    subrequests = [{"id": str(i), "method": "GET", "url": f"/users/Alice@Contoso.com/messages/m{i}"} for i in range(18)]
+    subrequests += [{"id": "18", "method": "GET", "url": "/me/messages/m1"}, {"id": "19", "method": "GET", "url": "/users/bob/messages"}]
+    batch = httpx.Request("POST", "https://graph.microsoft.com/v1.0/$batch", json={"requests": subrequests})
+    assert request_charges(batch) == {"alice@contoso.com": 18, "me": 1, "bob": 1}
+
+    limiter = MailboxLimiter(ThrottlingConfig(requests_per_window=20, window_seconds=1.0))
+    assert limiter.reserve({"alice@contoso.com": 18}) == 0.0
+    assert limiter.reserve({"alice@contoso.com": 4, "bob": 1}) > 0.0
+    with limiter.hold(request_charges(batch)):
+        assert sum(limiter.semaphore("alice@contoso.com").acquire(blocking=False) for _ in range(4)) == 3
+        assert sum(limiter.semaphore("bob").acquire(blocking=False) for _ in range(4)) == 3
+
+    limiter = MailboxLimiter(ThrottlingConfig(max_slots_per_request=4))
+    with limiter.hold(request_charges(batch)):
+        assert not limiter.semaphore("alice@contoso.com").acquire(blocking=False)
+        assert limiter.semaphore("bob").acquire(blocking=False)
+    assert all(limiter.semaphore("alice@contoso.com").acquire(blocking=False) for _ in range(4))
+
+
+def test_a_batch_waiting_on_a_busy_mailbox_does_not_block_other_mailboxes():
+    limiter = MailboxLimiter(ThrottlingConfig(max_slots_per_request=4))
+    busy = limiter.semaphore("alice")
+    busy.acquire()
+
+    def wait_for_alice():
+        with limiter.hold({"alice": 4}):
+            pass
+
+    waiting = threading.Thread(target=wait_for_alice, daemon=True)
+    waiting.start()
+    waiting.join(0.05)
+    assert waiting.is_alive()
+
+    held = threading.Event()
+
+    def other():
+        with limiter.hold({"bob": 4}):
+            held.set()
+
+    threading.Thread(target=other, daemon=True).start()
+    assert held.wait(1.0)
+    busy.release()
+    waiting.join(1.0)
+    assert not waiting.is_alive()
+
+
+def test_bulk_tools_consume_the_per_mailbox_budget():
+    def handler(request):
+        requests = json.loads(request.content)["requests"]
+        return httpx.Response(200, json={"responses": [{"id": r["id"], "status": 200, "body": {"id": r["id"]}} for r in requests]})
+
+    app = make_app(handler, throttling=ThrottlingConfig(requests_per_window=10_000, window_seconds=10**9))
+    app.batch_get_messages([f"m{i}" for i in range(45)], user_id="alice@contoso.com")
+    bucket = app._limiter.bucket("alice@contoso.com")
+    assert bucket.capacity - bucket._tokens == pytest.approx(45, abs=0.1)
@@ -0,0 +1,130 @@
+import asyncio
+import hashlib
+import inspect
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+from universal_mcp.tools.manager import ToolManager
+from universal_mcp.tools.tools import Tool
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.tool_manifest import (
+    MANIFEST_FIELDS,
+    ManifestTool,
+    ManifestToolManager,
+    fingerprint,
+    load_manifest,
+)
+
+
+@pytest.mark.parametrize("async_tools", [False, True])
+def test_checked_in_manifest_matches_tool_from_function(async_tools):
+    manifest = load_manifest()["tools"]
+    for fn in OutlookApp(async_tools=async_tools).list_tools():
+        entry = manifest.get(fingerprint(fn))
+        assert entry is not None, f"{fn.__name__} changed; run python -m universal_mcp_outlook.tool_manifest"
+        tool = Tool.from_function(fn)
+        assert entry["name"] == tool.name
+        assert {field: entry[field] for field in MANIFEST_FIELDS} == {
+            field: getattr(tool, field) for field in MANIFEST_FIELDS
+        }
+
+
+def test_registered_tools_build_argument_models_on_first_call():
+    def handler(request):
+        return httpx.Response(200, json={"userPrincipalName": "alice@contoso.com"})
+
+    async def run():
+        app = OutlookApp(
+            integration=MagicMock(), async_tools=True, async_transport=httpx.MockTransport(handler)
+        )
+        manager = ManifestToolManager()
+        manager.register_tools_from_app(app, tags=["all"])
+        tool = manager.get_tool("outlook_get_user_id")
+        assert isinstance(tool, ManifestTool) and tool.is_async and tool.fn_metadata is None
+        assert "outlook" in tool.tags
+        result = await tool.run({})
+        await app.aclose()
+        return manager, tool, result
+
+    manager, tool, result = asyncio.run(run())
+    assert result == {"userPrincipalName": "alice@contoso.com"}
+    assert tool.fn_metadata is not None
+    assert manager.manifest_misses == []
+    assert len(manager.list_tools()) == len(OutlookApp().list_tools())
+
+
+def test_tools_missing_from_manifest_fall_back_to_tool_from_function():
+    manager = ManifestToolManager(manifest={"tools": {}})
+    manager.register_tools_from_app(OutlookApp(), tags=["all"])
+    tool = manager.get_tool("outlook_user_list_message")
+    assert type(tool) is Tool
+    assert tool.parameters == Tool.from_function(OutlookApp().user_list_message).parameters
+    assert "user_list_message" in manager.manifest_misses
+
+
+def test_integration_factory_runs_on_first_request_only():
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "token"}
+    factory = MagicMock(return_value=integration)
+    app = OutlookApp(
+        integration_factory=factory,
+        transport=httpx.MockTransport(lambda request: httpx.Response(200, json={"userPrincipalName": "a@b.c"})),
+    )
+    app.list_tools()
+    factory.assert_not_called()
+    app.get_user_id()
+    app.get_user_id()
+    factory.assert_called_once_with()
+    assert app.integration is integration
+
+
+def test_server_advertises_the_sync_tool_docs_for_async_tools():
+    from universal_mcp_outlook.server import mcp
+
+    expected = {f"outlook_{fn.__name__}": Tool.from_function(fn) for fn in OutlookApp().list_tools()}
+    advertised = asyncio.run(mcp.list_tools())
+    assert sorted(tool.name for tool in advertised) == sorted(expected)
+    for tool in advertised:
+        assert tool.description == expected[tool.name].description
+        assert tool.inputSchema == expected[tool.name].parameters
+    send_mail = mcp._tool_manager.get_tool("outlook_user_send_mail")
+    assert send_mail.is_async and "important" in send_mail.tags and "Async" not in send_mail.description
+
+
+# sha256 of ToolManager.register_tools_from_app, _filter_by_tags and _filter_by_name in
+# universal-mcp 0.1.23, which ManifestToolManager.register_tools_from_app mirrors.
+MIRRORED_UPSTREAM_SHA256 = "75df764defcbf07a872a2bcf8b7c5206a1ddbebc7d2258019a21654cfb3fb00f"
+
+
+def test_mirrored_upstream_registration_is_unchanged():
+    from universal_mcp.tools import manager
+
+    source = "".join(
+        inspect.getsource(fn)
+        for fn in (manager.ToolManager.register_tools_from_app, manager._filter_by_tags, manager._filter_by_name)
+    )
+    assert hashlib.sha256(source.encode()).hexdigest() == MIRRORED_UPSTREAM_SHA256, (
+        "universal_mcp's register_tools_from_app changed; re-sync ManifestToolManager.register_tools_from_app"
+    )
+
+
+@pytest.mark.parametrize(
+    "tool_names, tags",
+    [
+        (None, None),
+        (None, ["all"]),
+        (None, ["export"]),
+        (["user_get_message", "outlook_get_user_id"], None),
+        (["user_get_message"], ["important"]),
+    ],
+)
+def test_manifest_registration_matches_upstream(tool_names, tags):
+    app = OutlookApp(async_tools=True)
+    upstream, manifest = ToolManager(), ManifestToolManager()
+    upstream.register_tools_from_app(app, tool_names=tool_names, tags=tags)
+    manifest.register_tools_from_app(app, tool_names=tool_names, tags=tags)
+    names = [tool.name for tool in upstream.list_tools()]
+    assert [tool.name for tool in manifest.list_tools()] == names
+    assert [manifest.get_tool(name).tags for name in names] == [upstream.get_tool(name).tags for name in names]
@@ -0,0 +1,107 @@
+import io
+from unittest.mock import MagicMock
+
+import httpx
+import pytest
+
+from universal_mcp_outlook.app import OutlookApp
+from universal_mcp_outlook.uploads import UPLOAD_CHUNK_SIZE, AttachmentSource
+
+UPLOAD_URL = "https://outlook.office.com/api/gv1.0/users('alice')/messages('d1')/AttachmentSessions('s1')?authtoken=x"
+
+
+class FakeGraph:
+    """Records Graph calls and accepts upload session ranges, failing one PUT once."""
+
+    def __init__(self, fail_at=None):
+        self.calls = []
+        self.received = bytearray()
+        self.fail_at = fail_at
+
+    def __call__(self, request):
+        path = request.url.path
+        self.calls.append((request.method, path))
+        if request.url.host == "outlook.office.com":
+            assert "Authorization" not in request.headers
+            if request.method == "GET":
+                return httpx.Response(200, json={"nextExpectedRanges": [f"{len(self.received)}-"]})
+            start, end, total = self._range(request.headers["Content-Range"])
+            if self.fail_at is not None and start >= self.fail_at:
+                self.fail_at = None
+                self.received += request.content[: len(request.content) // 2]
+                return httpx.Response(500)
+            assert start == len(self.received)
+            self.received += request.content
+            if end + 1 == total:
+                return httpx.Response(201, json={})
+            return httpx.Response(202, json={"nextExpectedRanges": [f"{end + 1}-"]})
+        if path.endswith("/createUploadSession"):
+            return httpx.Response(201, json={"uploadUrl": UPLOAD_URL})
+        if path.endswith("/users/alice@contoso.com/messages") and request.method == "POST":
+            return httpx.Response(201, json={"id": "d1"})
+        if path.endswith("/createReply"):
+            return httpx.Response(201, json={"id": "d1"})
+        if path.endswith("/attachments"):
+            return httpx.Response(201, json={"id": "a1"})
+        return httpx.Response(202)
+
+    @staticmethod
+    def _range(header):
+        span, total = header.split(" ")[1].split("/")
+        start, end = span.split("-")
+        return int(start), int(end), int(total)
+
+
+def make_app(graph):
+    integration = MagicMock()
+    integration.get_credentials.return_value = {"access_token": "dummy_access_token"}
+    return OutlookApp(integration=integration, transport=httpx.MockTransport(graph))
+
+
+def test_small_attachments_are_sent_inline(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_bytes(b"hello")
+    graph = FakeGraph()
+    make_app(graph).user_send_mail_with_attachments({"subject": "hi"}, [str(path)], user_id="alice@contoso.com")
+    assert graph.calls == [("POST", "/v1.0/users/alice@contoso.com/sendMail")]
+
+
+def test_large_attachment_uses_resumable_upload_session(tmp_path, monkeypatch):
+    monkeypatch.setattr("universal_mcp_outlook.uploads.UPLOAD_RETRY_BACKOFF", 0)
+    data = bytes(range(256)) * (4 * 1024 * 1024 // 256 + 7)
+    path = tmp_path / "big.bin"
+    path.write_bytes(data)
+    small = AttachmentSource.from_bytes("small.txt", b"tiny")
+    graph = FakeGraph(fail_at=UPLOAD_CHUNK_SIZE)
+    progress = []
+
+    make_app(graph).send_mail_with_files(
+        {"subject": "big"},
+        [str(path), small],
+        user_id="alice@contoso.com",
+        progress=lambda name, sent, total: progress.append((name, sent, total)),
+    )
+
+    assert bytes(graph.received) == data
+    assert ("GET", UPLOAD_URL.split("?")[0].split("outlook.office.com")[1]) in graph.calls
+    assert graph.calls[-1] == ("POST", "/v1.0/users/alice@contoso.com/messages/d1/send")
+    assert progress[-2] == ("big.bin", len(data), len(data))
+    assert progress[-1] == ("small.txt", 4, 4)
+
+
+def test_failed_upload_deletes_draft(tmp_path, monkeypatch):
+    monkeypatch.setattr("universal_mcp_outlook.uploads.UPLOAD_MAX_RETRIES", 0)
+    path = tmp_path / "big.bin"
+    path.write_bytes(b"x" * (4 * 1024 * 1024))
+    graph = FakeGraph(fail_at=0)
+    with pytest.raises(httpx.HTTPStatusError):
+        make_app(graph).reply_with_files("m1", [str(path)], user_id="alice@contoso.com")
+    assert graph.calls[-1] == ("DELETE", "/v1.0/users/alice@contoso.com/messages/d1")
+
+
+def test_stream_source_reads_ranges():
+    source = AttachmentSource.from_stream("data.bin", io.BytesIO(b"0123456789"))
+    assert source.size == 10
+    with source.open() as ranges:
+        assert ranges[3:6] == b"345"
+        assert ranges[0:2] == b"01"